@@ -0,0 +1,134 @@
+"""Compara el runtime bloqueante (pika) con el de asyncio (aio-pika).
+
+Publicador de query-svc: se publican queries a una tasa objetivo (open
+loop) desde ``--threads`` threads, como lo harían los handlers de Flask,
+y se reporta la tasa alcanzada y la latencia de publicación medida desde
+el instante programado (incluye la espera si el publicador se atrasa).
+
+Worker (``--worker``): un ``Worker`` de prueba consume los queries
+publicados con el mismo runtime y se cuentan los resultados recibidos en
+'results'. Como el worker no se detiene, se mide un runtime por ejecución.
+
+Requiere un RabbitMQ accesible en RABBITMQ_HOST (por defecto localhost)
+y aio-pika instalado:
+
+    RABBITMQ_HOST=localhost python bench/bench_async.py --rates 1000 10000
+    RABBITMQ_HOST=localhost python bench/bench_async.py --runtime asyncio --worker
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("RABBITMQ_HOST", "localhost")
+
+import pika  # noqa: E402
+
+from common import load_service, report  # noqa: E402
+from rabbitlab_common import RESULTS_EXCHANGE, Worker, connect  # noqa: E402
+from rabbitlab_common.aio import AsyncPublisher  # noqa: E402
+
+BODY = json.dumps({"name": "Juan Perez", "id": "12345", "phone": "555-1234"}).encode("utf-8")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def open_loop(publish, rate, duration, threads):
+    """Publica ``rate`` mensajes/s durante ``duration`` s repartidos en ``threads`` threads.
+
+    Retorna ``(publicados, segundos, latencias)``.
+    """
+    total = int(rate * duration)
+    latencies = [[] for _ in range(threads)]
+    start = time.perf_counter() + 0.1
+
+    def loop(slot):
+        properties = pika.BasicProperties(content_type="application/json")
+        for i in range(slot, total, threads):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            publish("looking-for", BODY, properties=properties)
+            latencies[slot].append(time.perf_counter() - scheduled)
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return total, time.perf_counter() - start, [v for slot in latencies for v in slot]
+
+
+class ResultCounter:
+    """Cuenta los mensajes publicados en 'results' desde un thread propio."""
+
+    def __init__(self):
+        self.count = 0
+        self.connection = connect()
+        channel = self.connection.channel()
+        channel.exchange_declare(exchange=RESULTS_EXCHANGE, exchange_type="fanout", durable=True)
+        queue = channel.queue_declare(queue="", exclusive=True).method.queue
+        channel.queue_bind(exchange=RESULTS_EXCHANGE, queue=queue)
+        channel.basic_consume(queue=queue, on_message_callback=self._on_result, auto_ack=True)
+        self.thread = threading.Thread(target=channel.start_consuming, daemon=True)
+        self.thread.start()
+
+    def _on_result(self, ch, method, properties, body):
+        self.count += 1
+
+
+def start_worker(runtime):
+    worker = Worker("bench", lambda query: {"id": query.get("id"), "status": "found"},
+                    runtime=runtime, prefetch_count=100, stats_interval=0, queue="")
+    threading.Thread(target=worker.run, daemon=True).start()
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rates", type=int, nargs="+", default=[1000, 10000],
+                        help="tasas objetivo en queries/s")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--runtime", nargs="+", choices=["blocking", "asyncio"],
+                        default=["blocking", "asyncio"])
+    parser.add_argument("--worker", action="store_true",
+                        help="mide también un Worker de prueba (un solo --runtime)")
+    args = parser.parse_args()
+    if args.worker and len(args.runtime) > 1:
+        parser.error("--worker requiere un solo --runtime")
+
+    query_svc = load_service("query-svc")
+    query_svc.logging.disable(query_svc.logging.INFO)
+    factories = {
+        "blocking": lambda: query_svc.ChannelPool(max_size=args.threads),
+        "asyncio": lambda: AsyncPublisher(host=os.environ["RABBITMQ_HOST"]),
+    }
+    publishers = [(runtime, factories[runtime]()) for runtime in args.runtime]
+    counter = ResultCounter() if args.worker else None
+
+    for runtime, publisher in publishers:
+        publisher.start()
+        worker = start_worker(runtime) if args.worker else None
+        time.sleep(1)
+        for rate in args.rates:
+            received = counter.count if counter else 0
+            count, elapsed, latencies = open_loop(publisher.publish, rate, args.duration, args.threads)
+            report(f"{runtime} @ {rate}/s", count, elapsed, unit="pub")
+            print(f"{'':<40} latencia p50={1000 * percentile(latencies, 0.5):.2f}ms "
+                  f"p99={1000 * percentile(latencies, 0.99):.2f}ms")
+            if counter:
+                time.sleep(2)
+                print(f"{'':<40} resultados recibidos: {counter.count - received}/{count}")
+        if worker:
+            print(f"{'':<40} worker: {worker.stats.snapshot()}")
+        print(publisher.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Personas/s: consultas individuales vs. /query/batch.
+
+Mide, sin broker, el costo por persona de los dos extremos del flujo:
+query-svc (HTTP + serialización + publicación) y un worker (decodificar,
+buscar y publicar el resultado). El costo del broker por mensaje se ahorra
+además en proporción al tamaño del lote.
+
+    python bench/bench_batch.py --persons 20000 --batch-size 100
+"""
+import argparse
+import logging
+import os
+import time
+
+# Cada mensaje se busca de nuevo: el cache de resultados se mide en bench_cache.py
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+import pika  # noqa: E402
+
+from common import Delivery, NullChannel, load_service, report  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--persons", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--service", default="travel-svc")
+    args = parser.parse_args()
+
+    query_svc = load_service("query-svc")
+    worker = load_service(args.service).worker
+    logging.disable(logging.INFO)
+    worker.ack_batch = 1
+
+    published = []
+    query_svc.pool.publish = lambda exchange, body, routing_key='', properties=None: \
+        published.append((body, properties))
+    query_svc.BATCH_SIZE = args.batch_size
+    client = query_svc.app.test_client()
+    persons = [{"name": f"Persona {i}", "id": str(10000 + i), "phone": None} for i in range(args.persons)]
+
+    print("--- query-svc")
+    start = time.perf_counter()
+    for person in persons:
+        client.post("/query", json=person)
+    report("POST /query", args.persons, time.perf_counter() - start, unit="personas")
+    single_messages = published[:]
+    published.clear()
+
+    start = time.perf_counter()
+    for i in range(0, args.persons, 1000):
+        client.post("/query/batch", json=persons[i:i + 1000])
+    report(f"POST /query/batch (lotes de {args.batch_size})", args.persons,
+           time.perf_counter() - start, unit="personas")
+    batch_messages = published[:]
+
+    print(f"--- {args.service}")
+    for label, messages in (("mensajes individuales", single_messages),
+                            ("mensajes en lote", batch_messages)):
+        channel = NullChannel()
+        start = time.perf_counter()
+        for body, properties in messages:
+            worker.on_message(channel, Delivery(), properties or pika.BasicProperties(), body)
+        report(f"{label} ({len(messages)} msg, {channel.published} pub)", args.persons,
+               time.perf_counter() - start, unit="personas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Mensajes/s de un worker con y sin cache de resultados, con queries repetidos.
+
+Los ids siguen una distribución Zipf (unos pocos ids concentran la mayoría
+de las consultas), como el tráfico real con consultas repetidas:
+
+    python bench/bench_cache.py --messages 100000 --distinct 5000 --cache-size 1000
+"""
+import argparse
+import json
+import logging
+import random
+import time
+
+import pika
+
+from common import Delivery, NullChannel, load_service, report
+
+from rabbitlab_common import ResultCache
+
+
+def zipf_ids(messages, distinct, skew, seed=7):
+    weights = [1 / (rank ** skew) for rank in range(1, distinct + 1)]
+    rng = random.Random(seed)
+    return rng.choices(range(distinct), weights=weights, k=messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--cache-size", type=int, default=1000)
+    parser.add_argument("--service", default="travel-svc")
+    args = parser.parse_args()
+
+    worker = load_service(args.service).worker
+    logging.disable(logging.INFO)
+    bodies = [json.dumps({"name": None, "id": str(10000 + i), "phone": None}).encode("utf-8")
+              for i in zipf_ids(args.messages, args.distinct, args.skew)]
+    properties = pika.BasicProperties(content_type="application/json")
+
+    for label, cache in (("sin cache", ResultCache(max_entries=0)),
+                         (f"cache LRU de {args.cache_size}", ResultCache(max_entries=args.cache_size))):
+        worker.cache = cache if cache.max_entries > 0 else None
+        channel = NullChannel()
+        start = time.perf_counter()
+        for body in bodies:
+            worker.on_message(channel, Delivery(), properties, body)
+        report(label, args.messages, time.perf_counter() - start, unit="msg")
+        if worker.cache is not None:
+            print(f"{'':<40} {worker.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Bytes en el cable y tiempo de codificar/decodificar por formato y servicio.
+
+Para cada servicio de búsqueda arma sus resultados reales (``lookup`` con
+personas que están en su BD y con ids que no, cuyos resultados llevan los
+campos en ``None``) y los codifica con cada formato de
+``rabbitlab_common.codec``: bytes promedio por resultado, µs por encode
+(worker) y por decode (dashboard). También mide el query de query-svc y un
+lote de ``--batch`` resultados armado con ``encode_batch``:
+
+    python bench/bench_codec.py --iterations 20000
+"""
+import argparse
+import logging
+import time
+
+from common import load_service
+from rabbitlab_common import codec
+
+SERVICES = (
+    ("commercialinfo", "comercialinfo-scv"),
+    ("socialmedia", "socialmedia-svc"),
+    ("officialrecords", "officialrecords-svc"),
+    ("financial", "financial-svc"),
+    ("travel", "travel-svc"),
+    ("creditbank", "creditbank-scv"),
+    ("rh", "rh-svc"),
+    ("education", "education-svc"),
+)
+
+QUERIES = [
+    {"name": "Juan Perez", "id": "12345", "phone": "555-1234"},
+    {"name": "Maria Garcia", "id": "67890", "phone": None},
+    {"name": None, "id": "11111", "phone": None},
+    {"name": None, "id": "22222", "phone": None},
+    {"name": None, "id": "987654321", "phone": None},
+    {"name": "Persona Desconocida", "id": "555555555", "phone": "555-0000"},
+]
+
+
+def timed(func, items, iterations):
+    """µs por llamada de ``func`` sobre ``items`` en ronda."""
+    count = len(items)
+    start = time.perf_counter()
+    for position in range(iterations):
+        func(items[position % count])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def measure(samples, formats, iterations):
+    row = {}
+    for content_type in formats:
+        encoded = [codec.encode(sample, content_type) for sample in samples]
+        assert [codec.decode(body, content_type) for body in encoded] == samples
+        row[content_type] = (
+            sum(map(len, encoded)) / len(encoded),
+            timed(lambda sample: codec.encode(sample, content_type), samples, iterations),
+            timed(lambda body: codec.decode(body, content_type), encoded, iterations),
+        )
+    return row
+
+
+def print_row(label, row, formats):
+    cells = []
+    baseline = row[codec.JSON][0]
+    for content_type in formats:
+        size, encode_us, decode_us = row[content_type]
+        ratio = f" ({size / baseline:.0%})" if content_type != codec.JSON else ""
+        cells.append(f"{size:>7.0f} B{ratio:<7} {encode_us:>6.2f} {decode_us:>6.2f}")
+    print(f"{label:<18} " + "   ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    formats = [content_type for content_type in (codec.JSON, codec.MSGPACK) if codec.supported(content_type)]
+    if len(formats) == 1:
+        print("msgpack no está instalado (pip install msgpack): solo se mide JSON\n")
+    logging.disable(logging.INFO)
+
+    header = "   ".join(f"{content_type.split('/')[1]:<16} {'enc µs':>6} {'dec µs':>6}" for content_type in formats)
+    print(f"{'mensaje':<18} {header}")
+    print_row("query", measure(QUERIES, formats, args.iterations), formats)
+
+    totals = {content_type: [0.0, 0.0, 0.0] for content_type in formats}
+    for service, directory in SERVICES:
+        module = load_service(directory)
+        samples = []
+        for query in QUERIES:
+            result = module.lookup(dict(query))
+            if result is not None:
+                result["service"] = service
+                samples.append(result)
+        row = measure(samples, formats, args.iterations)
+        print_row(service, row, formats)
+        for content_type, values in row.items():
+            for position, value in enumerate(values):
+                totals[content_type][position] += value / len(SERVICES)
+    print_row("promedio", totals, formats)
+
+    # Lote de resultados de /query/batch armado desde resultados ya codificados
+    print()
+    samples = [dict(result, service="travel") for result in
+               (load_service("travel-svc").lookup(dict(query)) for query in QUERIES)]
+    for content_type in formats:
+        encoded = [codec.encode(samples[position % len(samples)], content_type) for position in range(args.batch)]
+        ids = [f"{position:032x}" for position in range(args.batch)]
+        body = codec.encode_batch(ids, encoded, content_type)
+        iterations = max(1, args.iterations // args.batch)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            codec.encode_batch(ids, encoded, content_type)
+        joined = (time.perf_counter() - start) / iterations * 1e6
+        start = time.perf_counter()
+        for _ in range(iterations):
+            codec.decode(body, content_type)
+        decoded = (time.perf_counter() - start) / iterations * 1e6
+        print(f"lote de {args.batch:<10} {content_type:<20} {len(body):>7} B  armar {joined:>8.1f} µs  "
+              f"decodificar {decoded:>8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Throughput de un worker según prefetch y concurrencia, con búsquedas de latencia simulada.
+
+Simula la entrega del broker respetando el prefetch (nunca hay más de
+``prefetch`` mensajes sin ack) y ejecuta en el thread principal los
+callbacks que el pool de threads devuelve con ``add_callback_threadsafe``.
+
+    python bench/bench_concurrency.py --lookup-ms 5 --settings 1:1 4:8 16:32 64:128
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import time
+
+# Cada mensaje se busca de nuevo: el cache de resultados se mide en bench_cache.py
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+import pika  # noqa: E402
+
+from common import Delivery, NullChannel, load_service, report  # noqa: E402
+
+from rabbitlab_common import Worker  # noqa: E402
+
+
+class SimConnection:
+    def __init__(self):
+        self.callbacks = queue.Queue()
+
+    def add_callback_threadsafe(self, callback):
+        self.callbacks.put(callback)
+
+    def call_later(self, delay, callback):
+        pass
+
+
+class SimChannel(NullChannel):
+    def __init__(self):
+        super().__init__()
+        self.acked = 0
+
+    def basic_ack(self, **kwargs):
+        self.acked += 1
+
+
+def run(worker, messages, body):
+    connection, channel = SimConnection(), SimChannel()
+    worker._connection = connection
+    properties = pika.BasicProperties(correlation_id="bench")
+    sent = 0
+    start = time.perf_counter()
+    while channel.acked < messages:
+        while sent < messages and sent - channel.acked < worker.prefetch_count:
+            sent += 1
+            worker.on_message(channel, Delivery(sent), properties, body)
+        if channel.acked < messages and worker.concurrency > 1:
+            connection.callbacks.get()()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--service", default="travel-svc")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--lookup-ms", type=float, default=5.0,
+                        help="latencia de I/O simulada por búsqueda")
+    parser.add_argument("--settings", nargs="+", default=["1:1", "4:8", "16:32", "64:128"],
+                        help="pares concurrencia:prefetch")
+    args = parser.parse_args()
+
+    service = load_service(args.service)
+    logging.disable(logging.INFO)
+
+    def slow_lookup(query):
+        time.sleep(args.lookup_ms / 1000)
+        return service.lookup(query)
+
+    body = json.dumps({"name": "Juan Perez", "id": "12345", "phone": "555-1234"}).encode('utf-8')
+    for setting in args.settings:
+        concurrency, prefetch = (int(value) for value in setting.split(":"))
+        worker = Worker(service.worker.service, slow_lookup, concurrency=concurrency,
+                        prefetch_count=prefetch, stats_interval=0)
+        elapsed = run(worker, args.messages, body)
+        report(f"concurrency={concurrency} prefetch={prefetch}", args.messages, elapsed, unit="msg")
+
+
+if __name__ == "__main__":
+    main()
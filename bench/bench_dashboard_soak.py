@@ -0,0 +1,59 @@
+"""Soak del dashboard: un millón de resultados por ``process_result`` con RSS estable.
+
+Cada consulta es distinta, así que sin límites el almacén crecería sin
+fin; con ``ResultStore`` la ocupación se estabiliza en ``--max-queries``
+(o ``--max-bytes``) y el RSS deja de crecer:
+
+    python bench/bench_dashboard_soak.py --results 1000000 --max-queries 10000
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import pika
+
+from common import Delivery, NullChannel, load_service, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=1000000)
+    parser.add_argument("--max-queries", type=int, default=10000)
+    parser.add_argument("--max-bytes", type=int, default=64 * 2**20)
+    parser.add_argument("--report-every", type=int, default=100000)
+    args = parser.parse_args()
+
+    os.environ["RESULTS_MAX_QUERIES"] = str(args.max_queries)
+    os.environ["RESULTS_MAX_BYTES"] = str(args.max_bytes)
+    dashboard = load_service("dashboard-svc")
+    logging.disable(logging.INFO)
+    store = dashboard.results_store
+
+    channel = NullChannel()
+    delivery = Delivery()
+    services = ["travel", "financial", "rh", "education"]
+    start = time.perf_counter()
+    checkpoints = []
+    for i in range(args.results):
+        result = {"id": str(i), "status": "found", "service": services[i % len(services)],
+                  "detail": "x" * (i % 200)}
+        properties = pika.BasicProperties(correlation_id=f"q{i // len(services)}",
+                                          headers={"x-sent-at": time.time()})
+        dashboard.process_result(channel, delivery, properties, json.dumps(result).encode("utf-8"))
+        if (i + 1) % args.report_every == 0:
+            stats = store.stats()
+            checkpoints.append(stats["rss_bytes"])
+            print(f"{i + 1:>10} resultados  consultas={stats['queries']:>7}  "
+                  f"bytes={stats['bytes'] / 2**20:7.1f} MB  RSS={stats['rss_bytes'] / 2**20:7.1f} MB  "
+                  f"descartadas={stats['evicted']}")
+    report("process_result", args.results, time.perf_counter() - start, unit="resultados")
+    if len(checkpoints) >= 2:
+        # El crecimiento después del primer tramo (cuando el almacén ya se llenó) debe ser ~0
+        growth = (checkpoints[-1] - checkpoints[1 if len(checkpoints) > 2 else 0]) / 2**20
+        print(f"crecimiento de RSS tras llenarse el almacén: {growth:+.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Arranque, búsquedas/s y RSS: lista de diccionarios + RecordIndex vs. archivo RLDS1 (mmap).
+
+    python bench/bench_dataset.py --rows 10000000
+
+Cada variante se mide en un subproceso nuevo para que el RSS sea comparable.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT
+
+from rabbitlab_common import RecordIndex, write_dataset
+from rabbitlab_common.dataset import MappedDataset
+
+VISAS = ["Activa", "Vigente", "Expirada", "N/A"]
+
+
+def make_records(rows):
+    for i in range(rows):
+        yield {
+            "id": str(i),
+            "name": f"Persona {i}",
+            "phone": f"555-{i:08d}",
+            "destination": "Estados Unidos",
+            "visa_type": "Turista B2",
+            "visa_status": VISAS[i % len(VISAS)],
+            "last_travel_date": "2024-08-15",
+            "entry_count": i % 10,
+        }
+
+
+def measure(mode, rows, path, lookups):
+    start = time.perf_counter()
+    if mode == "mmap":
+        index = MappedDataset(path)
+    else:
+        index = RecordIndex(list(make_records(rows)))
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        assert index.lookup(id=str(i * 7919 % rows))
+    elapsed = time.perf_counter() - start
+    print(f"{mode:<6} arranque {startup:8.3f}s  {lookups / elapsed:>10.0f} búsquedas/s  "
+          f"RSS {rss_mb():8.1f} MB")
+
+
+def rss_mb():
+    """RSS actual del proceso (Linux)."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--measure", choices=["mmap", "memory"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.rows, args.path, args.lookups)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "travel.rlds")
+        start = time.perf_counter()
+        write_dataset(path, make_records(args.rows))
+        print(f"archivo generado en {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 2**20:.1f} MB)")
+        for mode in ("memory", "mmap"):
+            subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--rows", str(args.rows),
+                 "--lookups", str(args.lookups), "--path", path],
+                check=True, cwd=ROOT,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Microbenchmark de búsqueda: recorrido lineal vs. RecordIndex a 1k/100k/1M registros.
+
+    python bench/bench_index.py --sizes 1000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from common import report
+
+from rabbitlab_common import RecordIndex
+
+
+def make_records(size):
+    return [
+        {"id": str(i), "name": f"Persona Número {i}", "phone": f"555-{i:07d}", "workplace": "Google"}
+        for i in range(size)
+    ]
+
+
+def scan(records, name=None, person_id=None, phone=None):
+    """Búsqueda original de los servicios (recorrido lineal)."""
+    for record in records:
+        if (person_id and record.get("id") == person_id) or \
+           (name and record.get("name").lower() == name.lower()) or \
+           (phone and record.get("phone") == phone):
+            return record
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=10000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        records = make_records(size)
+        rng = random.Random(size)
+        # Mezcla de búsquedas por id, phone y nombre (la mitad sin coincidencia)
+        queries = []
+        for _ in range(args.queries):
+            i = rng.randrange(size * 2)
+            kind = rng.randrange(3)
+            queries.append({"person_id": str(i)} if kind == 0 else
+                           {"phone": f"555-{i:07d}"} if kind == 1 else
+                           {"name": f"persona número {i}"})
+
+        print(f"--- {size} registros")
+        start = time.perf_counter()
+        index = RecordIndex(records)
+        print(f"construcción del índice: {time.perf_counter() - start:.3f}s")
+
+        # El recorrido lineal es demasiado lento para todas las queries en BD grandes
+        scan_queries = queries[:max(10, min(args.queries, 10_000_000 // size))]
+        start = time.perf_counter()
+        for query in scan_queries:
+            scan(records, **query)
+        report("recorrido lineal", len(scan_queries), time.perf_counter() - start, unit="búsquedas")
+
+        start = time.perf_counter()
+        for query in queries:
+            index.lookup(id=query.get("person_id"), name=query.get("name"), phone=query.get("phone"))
+        report("RecordIndex", len(queries), time.perf_counter() - start, unit="búsquedas")
+
+
+if __name__ == "__main__":
+    main()
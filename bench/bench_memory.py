@@ -0,0 +1,56 @@
+"""Bytes por registro: lista de diccionarios vs. RecordStore (esquema de travel-svc).
+
+    python bench/bench_memory.py --rows 1000000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from common import ROOT  # noqa: F401  (agrega la raíz del repo al sys.path)
+
+from rabbitlab_common import RecordStore
+
+DESTINATIONS = ["Estados Unidos", "España", "Canadá", "México", "Francia"]
+VISA_TYPES = ["Turista B2", "Schengen", "Visitante", "No requerida"]
+VISA_STATUS = ["Activa", "Vigente", "Expirada", "N/A"]
+
+
+def make_records(rows):
+    # Los valores se construyen como strings nuevos por fila, igual que al
+    # deserializar un JSON, para no medir los literales compartidos.
+    for i in range(rows):
+        yield {
+            "id": str(i),
+            "name": f"Persona {i}",
+            "phone": f"555-{i:08d}",
+            "destination": DESTINATIONS[i % 5].encode().decode(),
+            "visa_type": VISA_TYPES[i % 4].encode().decode(),
+            "visa_status": VISA_STATUS[i % 4].encode().decode(),
+            "last_travel_date": f"2024-{i % 12 + 1:02d}-15",
+            "entry_count": i % 10,
+        }
+
+
+def measure(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    data = build(make_records(rows))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current / rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    before = measure(list, args.rows)
+    after = measure(RecordStore, args.rows)
+    print(f"lista de dicts: {before:8.1f} bytes/registro")
+    print(f"RecordStore:    {after:8.1f} bytes/registro  ({after / before:.0%})")
+
+
+if __name__ == "__main__":
+    main()
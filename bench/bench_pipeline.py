@@ -0,0 +1,103 @@
+"""Throughput del pipeline completo en un proceso, sobre el broker en memoria.
+
+Envía ``--queries`` consultas distintas a ``POST /query`` de query-svc desde
+``--clients`` threads (o a ``/query/batch`` con ``--batch``) y mide hasta que
+el dashboard recibió los resultados de todos los servicios. Sin RabbitMQ ni
+red, los resultados son repetibles: con ``--min-rate`` termina con código 1
+si el throughput queda por debajo, para detectar regresiones en CI:
+
+    python bench/bench_pipeline.py --queries 5000 --min-rate 200
+    python bench/bench_pipeline.py --queries 20000 --batch 100
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from inprocess import Pipeline
+
+from common import report
+
+
+def send_queries(pipeline, queries, clients, batch):
+    """Envía las consultas repartidas entre ``clients`` threads; retorna las respuestas con error."""
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(chunk):
+        http = pipeline.client()
+        step = batch or 1
+        for start in range(0, len(chunk), step):
+            if batch:
+                response = http.post("/query/batch", json=chunk[start:start + step])
+            else:
+                response = http.post("/query", json=chunk[start])
+            if response.status_code != 200:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(queries[slot::clients],)) for slot in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors[0]
+
+
+def wait_results(pipeline, queries, timeout):
+    """Espera a que cada worker procese todas las consultas y el dashboard reciba sus resultados."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        stats = [worker.stats.snapshot() for worker in pipeline.workers]
+        published = sum(snapshot["published"] for snapshot in stats)
+        if (all(snapshot["received"] >= queries for snapshot in stats)
+                and pipeline.dashboard.result_stream.stats()["published"] >= published):
+            return published
+        time.sleep(0.005)
+    raise SystemExit(f"Timeout esperando resultados: {pipeline.broker.stats()['queues']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=4, help="threads enviando a query-svc")
+    parser.add_argument("--batch", type=int, default=0, help="consultas por POST /query/batch (0: /query)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--min-rate", type=float, default=0.0, help="consultas/s mínimas (código 1 si no se alcanzan)")
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    args = parser.parse_args()
+
+    pipeline = Pipeline().start()
+    services = len(pipeline.workers)
+    # Ids distintos: ni el coalescing de query-svc ni el cache de los workers acortan el camino
+    queries = [{"name": None, "id": f"9{position:08d}", "phone": None} for position in range(args.queries)]
+
+    start = time.perf_counter()
+    errors = send_queries(pipeline, queries, args.clients, args.batch)
+    sent = time.perf_counter() - start
+    results = wait_results(pipeline, args.queries, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    mode = f"/query/batch de {args.batch}" if args.batch else "/query"
+    print(f"{services} servicios, {args.clients} clientes, {mode}, errores={errors}")
+    report("envío a query-svc", args.queries, sent, unit="consultas")
+    report("pipeline completo", args.queries, elapsed, unit="consultas")
+    report("resultados en el dashboard", results, elapsed, unit="resultados")
+    slowest = pipeline.dashboard.latency_tracker.summary()["slowest"]
+    if slowest:
+        print(f"{'servicio más lento (p95 total)':<40} {slowest}")
+    rate = args.queries / elapsed
+    pipeline.stop()
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"queries": args.queries, "results": results, "errors": errors,
+                       "elapsed_s": round(elapsed, 3), "queries_per_s": round(rate, 1)}, output, indent=2)
+    if errors or rate < args.min_rate:
+        print(f"REGRESIÓN: {rate:.1f} consultas/s (mínimo {args.min_rate}), errores={errors}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Escalamiento de ``WORKER_PROCESSES``: mensajes/s de 1 a N procesos sin broker.
+
+Cada proceso se crea con ``fork`` después de cargar la BD, igual que el
+supervisor del ``Worker``, y procesa su parte de los mensajes con
+``worker.process``. Además del throughput se reporta el PSS promedio por
+proceso (la memoria compartida se reparte entre los procesos que la usan),
+que muestra si la BD quedó compartida o se copió en cada proceso:
+
+    python bench/bench_processes.py --rows 1000000 --processes 1 2 4 8
+    python bench/bench_processes.py --rows 1000000 --mmap
+
+Con ``--fuzzy`` la búsqueda recorre los nombres con ``difflib`` para simular
+un lookup que consume CPU (limitado por el GIL dentro de un proceso).
+"""
+import argparse
+import difflib
+import gc
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+# Cada mensaje se busca de nuevo: el cache de resultados se mide en bench_cache.py
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+from common import report  # noqa: E402
+
+from rabbitlab_common import RecordIndex, RecordStore, Worker, write_dataset  # noqa: E402
+from rabbitlab_common.dataset import MappedDataset  # noqa: E402
+
+from bench_dataset import make_records  # noqa: E402
+
+
+def memory_kb(field):
+    """Valor de ``field`` en /proc/self/smaps_rollup (Linux), en kB."""
+    with open("/proc/self/smaps_rollup") as rollup:
+        for line in rollup:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    return 0
+
+
+def make_lookup(index, rows, fuzzy):
+    def lookup(query):
+        record = index.lookup(id=query.get("id"))
+        if fuzzy and record is not None:
+            # Compara el nombre contra una ventana de la BD, como un matching aproximado
+            start = int(query["id"])
+            candidates = [index[i]["name"] for i in range(start, min(rows, start + 50))]
+            difflib.get_close_matches(query.get("name") or "", candidates, n=1)
+        return None if record is None else {"id": record["id"], "status": "found"}
+    return lookup
+
+
+def consume(worker, bodies, results):
+    start = time.perf_counter()
+    for body in bodies:
+        worker.process(body)
+    results.put((len(bodies), time.perf_counter() - start, memory_kb("Pss")))
+
+
+def run(worker, bodies, processes):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    gc.freeze()
+    children = [context.Process(target=consume, args=(worker, bodies[slot::processes], results))
+                for slot in range(processes)]
+    start = time.perf_counter()
+    for child in children:
+        child.start()
+    outcomes = [results.get() for _ in children]
+    elapsed = time.perf_counter() - start
+    for child in children:
+        child.join()
+    gc.unfreeze()
+    count = sum(outcome[0] for outcome in outcomes)
+    pss = sum(outcome[2] for outcome in outcomes) / len(outcomes) / 1024
+    return count, elapsed, pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--mmap", action="store_true", help="BD en un archivo RLDS1 (DATA_FILE)")
+    parser.add_argument("--fuzzy", action="store_true", help="lookup con matching aproximado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.mmap:
+            path = os.path.join(tmp, "travel.rlds")
+            write_dataset(path, make_records(args.rows))
+            index = MappedDataset(path)
+        else:
+            index = RecordIndex(RecordStore(make_records(args.rows)))
+        print(f"BD de {args.rows} registros, PSS del proceso padre {memory_kb('Pss') / 1024:.1f} MB")
+
+        worker = Worker("bench", make_lookup(index, args.rows, args.fuzzy), stats_interval=0)
+        bodies = [json.dumps({"id": str(i * 7919 % args.rows), "name": f"Persona {i}"}).encode("utf-8")
+                  for i in range(args.messages)]
+        base = None
+        for processes in args.processes:
+            count, elapsed, pss = run(worker, bodies, processes)
+            base = base or count / elapsed
+            report(f"{processes} proceso(s)", count, elapsed, unit="msg")
+            print(f"{'':<40} speedup x{count / elapsed / base:.2f}  PSS/proceso {pss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
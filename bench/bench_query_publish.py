@@ -0,0 +1,66 @@
+"""Compara requests/s de ``POST /query`` con conexión por request vs. pool.
+
+Contra un RabbitMQ en RABBITMQ_HOST (por defecto localhost):
+
+    RABBITMQ_HOST=localhost python bench/bench_query_publish.py --threads 8
+
+o sin broker, sobre el transporte en memoria (mide el costo de query-svc
+sin la red):
+
+    RABBITLAB_TRANSPORT=memory python bench/bench_query_publish.py --threads 8
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("RABBITMQ_HOST", "localhost")
+# PAYLOAD es siempre el mismo: sin esto se uniría a la consulta en curso y no
+# se publicaría (loadgen.py reporta las consultas unidas)
+os.environ.setdefault("COALESCE_WINDOW", "0")
+
+from common import load_service, report, run_threads  # noqa: E402
+
+PAYLOAD = {"name": "Juan Perez", "id": "12345", "phone": "555-1234"}
+
+
+def legacy_publish(query_svc):
+    """Reproduce el comportamiento anterior: una conexión por publicación."""
+    def publish(exchange, body, routing_key='', properties=None):
+        connection = query_svc.connect()
+        try:
+            channel = connection.channel()
+            channel.exchange_declare(exchange=exchange, exchange_type='fanout', durable=True)
+            channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body)
+        finally:
+            connection.close()
+    return publish
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    query_svc = load_service("query-svc")
+    query_svc.app.logger.disabled = True
+    query_svc.logging.disable(query_svc.logging.INFO)
+    client = query_svc.app.test_client()
+
+    def post():
+        response = client.post("/query", json=PAYLOAD)
+        assert response.status_code == 200, response.get_json()
+
+    pooled_publish = query_svc.pool.publish
+    query_svc.pool.start()
+    for label, publish in (("conexión por request", legacy_publish(query_svc)),
+                           ("pool de canales", pooled_publish)):
+        query_svc.pool.publish = publish
+        start = time.perf_counter()
+        count = run_threads(post, args.threads, args.duration)
+        report(label, count, time.perf_counter() - start, unit="req")
+    print(query_svc.pool.stats())
+
+
+if __name__ == "__main__":
+    main()
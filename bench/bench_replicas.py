@@ -0,0 +1,135 @@
+"""Escalamiento horizontal: queries distintos procesados/s con 1..N réplicas.
+
+Cada réplica es un proceso con su propio ``Worker`` (como un pod más del
+deployment) consumiendo de la cola durable compartida del servicio. Se
+publican ``--messages`` queries con ``correlation_id`` distintos y se
+cuentan los resultados en 'results': con la cola compartida cada query se
+procesa una sola vez y el throughput crece con las réplicas. Con
+``--exclusive`` cada réplica usa su propia cola (comportamiento anterior) y
+cada query se procesa una vez por réplica.
+
+La búsqueda simula ``--work-ms`` de trabajo por query. Requiere un RabbitMQ
+accesible en RABBITMQ_HOST (por defecto localhost):
+
+    RABBITMQ_HOST=localhost python bench/bench_replicas.py --replicas 1 2 4 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+os.environ.setdefault("RABBITMQ_HOST", "localhost")
+
+import pika  # noqa: E402
+
+from common import report  # noqa: E402
+from rabbitlab_common import QUERIES_EXCHANGE, RESULTS_EXCHANGE, Worker, connect  # noqa: E402
+
+SERVICE = "bench-replicas"
+QUEUE = f"{QUERIES_EXCHANGE}.{SERVICE}"
+
+
+def replica(work_ms, queue):
+    def lookup(query):
+        time.sleep(work_ms / 1000)
+        return {"id": query.get("id"), "status": "found"}
+
+    Worker(SERVICE, lookup, queue=queue, prefetch_count=10, stats_interval=0).run()
+
+
+class ResultCounter:
+    """Cuenta resultados totales y queries distintos (por ``correlation_id``)."""
+
+    def __init__(self):
+        self.total = 0
+        self.distinct = set()
+        connection = connect()
+        channel = connection.channel()
+        channel.exchange_declare(exchange=RESULTS_EXCHANGE, exchange_type="fanout", durable=True)
+        queue = channel.queue_declare(queue="", exclusive=True).method.queue
+        channel.queue_bind(exchange=RESULTS_EXCHANGE, queue=queue)
+        channel.basic_consume(queue=queue, on_message_callback=self._on_result, auto_ack=True)
+        threading.Thread(target=channel.start_consuming, daemon=True).start()
+
+    def _on_result(self, ch, method, properties, body):
+        self.total += 1
+        self.distinct.add(properties.correlation_id)
+
+    def reset(self):
+        self.total = 0
+        self.distinct = set()
+
+
+def wait_consumers(channel, replicas, exclusive, timeout=30):
+    """Espera a que las réplicas estén consumiendo antes de publicar."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if exclusive:
+            time.sleep(2)
+            return
+        declared = channel.queue_declare(queue=QUEUE, durable=True, passive=True)
+        if declared.method.consumer_count >= replicas:
+            return
+        time.sleep(0.2)
+    raise RuntimeError("Las réplicas no se conectaron a tiempo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--work-ms", type=float, default=5.0)
+    parser.add_argument("--exclusive", action="store_true",
+                        help="cada réplica con su propia cola exclusiva (sin competir)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    counter = ResultCounter()
+    connection = connect()
+    channel = connection.channel()
+    channel.exchange_declare(exchange=QUERIES_EXCHANGE, exchange_type="fanout", durable=True)
+
+    base = None
+    for replicas in args.replicas:
+        channel.queue_delete(queue=QUEUE)
+        queue = "" if args.exclusive else QUEUE
+        processes = [context.Process(target=replica, args=(args.work_ms, queue), daemon=True)
+                     for _ in range(replicas)]
+        for process in processes:
+            process.start()
+        wait_consumers(channel, replicas, args.exclusive)
+
+        counter.reset()
+        start = time.perf_counter()
+        for i in range(args.messages):
+            channel.basic_publish(
+                exchange=QUERIES_EXCHANGE, routing_key="",
+                body=json.dumps({"id": str(i)}).encode("utf-8"),
+                properties=pika.BasicProperties(content_type="application/json", correlation_id=f"q{i}"),
+            )
+        expected = args.messages * (replicas if args.exclusive else 1)
+        deadline = start + args.timeout
+        while counter.total < expected and time.perf_counter() < deadline:
+            connection.process_data_events(time_limit=0.05)
+        elapsed = time.perf_counter() - start
+
+        distinct = len(counter.distinct)
+        base = base or distinct / elapsed
+        report(f"{replicas} réplica(s)", distinct, elapsed, unit="queries")
+        print(f"{'':<40} speedup x{distinct / elapsed / base:.2f}  "
+              f"procesados {counter.total} (duplicados {counter.total - distinct})")
+
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+    channel.queue_delete(queue=QUEUE)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Registro durable del dashboard: escritura, reinicio y consultas con millones de resultados.
+
+Escribe ``--results`` resultados en lotes (como el consumidor), y luego mide
+un reinicio: abrir el registro, continuar el ``seq`` y recargar en memoria
+las ``--max-queries`` consultas más recientes. El reinicio no depende del
+tamaño del registro:
+
+    python bench/bench_result_log.py --results 10000000 --path /tmp/results.db
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard-svc"))
+
+from result_log import ResultLog  # noqa: E402
+from result_store import ResultStore  # noqa: E402
+
+from common import report  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=10000000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--max-queries", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--path", default=None, help="archivo SQLite (por defecto uno temporal)")
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), "results.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    services = ["travel", "financial", "rh", "education"]
+    log = ResultLog(path, batch_size=args.batch)
+    start = time.perf_counter()
+    now = time.time()
+    for seq in range(1, args.results + 1):
+        query = seq // len(services)
+        result = {"id": str(query), "status": "found", "service": services[seq % len(services)]}
+        if log.append(seq, f"q{query}", result["service"], now, 80, result):
+            log.flush()
+    log.flush()
+    report(f"escritura (lotes de {args.batch})", args.results, time.perf_counter() - start, unit="resultados")
+    size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+    print(f"{'':<40} tamaño en disco={size / 2**20:.0f} MB")
+    del log
+
+    start = time.perf_counter()
+    log = ResultLog(path)
+    last = log.last_seq()
+    store = ResultStore(max_entries=args.max_queries, ttl=0, seq=last)
+    opened = time.perf_counter() - start
+    restored = store.restore(log.recent(args.max_queries, last))
+    elapsed = time.perf_counter() - start
+    print(f"reinicio: abrir y continuar seq={last} en {opened * 1000:.1f} ms; "
+          f"{restored} consultas recargadas en {elapsed:.2f}s")
+
+    queries = args.results // len(services)
+    ids = [f"q{random.randrange(queries)}" for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for query_id in ids:
+        log.get(query_id)
+    report("consultas por query_id en disco", args.lookups, time.perf_counter() - start, unit="consultas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Ingesta del almacén del dashboard con lectores concurrentes.
+
+Un thread hace ``put`` (como el consumidor de RabbitMQ) mientras N threads
+piden páginas y consultas sueltas (como clientes de /api/results). Compara
+las lecturas sin lock de ``ResultStore`` con lectores que toman el lock del
+escritor (el comportamiento anterior):
+
+    python bench/bench_store_readers.py --results 200000 --readers 0 1 2 4 8
+
+Por defecto cada lector pide páginas sin pausa: en una sola CPU se reparte
+el GIL con el consumidor y la ingesta cae aunque nunca espere el lock. Con
+``--reader-rate`` cada lector pide a lo sumo esa cantidad de páginas por
+segundo, como clientes HTTP reales, y la ingesta depende de cuánta CPU
+cuesta cada página.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard-svc"))
+
+from result_store import ResultStore  # noqa: E402
+
+from common import report  # noqa: E402
+
+
+class LockedReads(ResultStore):
+    """Lectores que toman el lock del escritor durante toda la lectura."""
+
+    def page(self, *args, **kwargs):
+        with self._lock:
+            return super().page(*args, **kwargs)
+
+    def get(self, query_id):
+        with self._lock:
+            return super().get(query_id)
+
+
+def read(store, page_size, stop, counter, rate):
+    interval = 1 / rate if rate else 0
+    next_page = time.perf_counter()
+    while not stop.is_set():
+        page = store.page(limit=page_size)
+        for query in page["queries"][:10]:
+            store.get(query["query_id"])
+        counter[0] += 1
+        if interval:
+            next_page += interval
+            stop.wait(max(0.0, next_page - time.perf_counter()))
+
+
+def run(store_class, results, readers, page_size, max_queries, rate=0):
+    store = store_class(max_entries=max_queries, max_bytes=2**40, ttl=0)
+    for i in range(max_queries):
+        store.put(f"q{i}", "travel", {"status": "found"}, 100)
+    stop = threading.Event()
+    counters = [[0] for _ in range(readers)]
+    threads = [threading.Thread(target=read, args=(store, page_size, stop, counter, rate), daemon=True)
+               for counter in counters]
+    for thread in threads:
+        thread.start()
+    services = ["travel", "financial", "rh", "education"]
+    latencies = []
+    start = time.perf_counter()
+    for i in range(results):
+        began = time.perf_counter()
+        store.put(f"q{max_queries + i // len(services)}", services[i % len(services)], {"status": "found"}, 100)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    pages = sum(counter[0] for counter in counters)
+    return elapsed, latencies[int(len(latencies) * 0.99)], latencies[-1], pages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=200000)
+    parser.add_argument("--readers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--max-queries", type=int, default=10000)
+    parser.add_argument("--reader-rate", type=float, default=0,
+                        help="páginas/s máximas por lector (0: sin pausa)")
+    args = parser.parse_args()
+
+    for label, store_class in (("lectores con lock", LockedReads), ("lectores sin lock", ResultStore)):
+        for readers in args.readers:
+            elapsed, p99, worst, pages = run(store_class, args.results, readers, args.page_size, args.max_queries,
+                                             args.reader_rate)
+            report(f"{label}, {readers} lectores", args.results, elapsed, unit="puts")
+            print(f"{'':<40} put p99={p99 * 1e6:8.1f} us  max={worst * 1e3:6.1f} ms  páginas/s={pages:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
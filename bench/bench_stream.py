@@ -0,0 +1,74 @@
+"""Costo de empujar resultados a clientes de /api/stream desde ``process_result``.
+
+Mide resultados/s del consumidor del dashboard con ``--clients`` clientes
+suscritos, de los cuales ``--slow`` nunca leen: sus colas se llenan y pasan
+a ``resync`` sin frenar al consumidor ni a los clientes que sí leen.
+
+    python bench/bench_stream.py --results 200000 --clients 50 --slow 10
+"""
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+
+import pika
+
+from common import Delivery, NullChannel, load_service, report
+
+
+def drain(subscriber, stop, received):
+    while not stop.is_set():
+        try:
+            subscriber.events.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        received[0] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=10)
+    args = parser.parse_args()
+
+    dashboard = load_service("dashboard-svc")
+    logging.disable(logging.INFO)
+    stream = dashboard.result_stream
+    stream.max_clients = max(stream.max_clients, args.clients)
+
+    bodies = [json.dumps({"id": str(i), "status": "found", "service": "travel"}).encode("utf-8")
+              for i in range(1000)]
+    channel = NullChannel()
+    delivery = Delivery()
+    for clients in (0, args.clients):
+        stop = threading.Event()
+        subscribers = [stream.subscribe() for _ in range(clients)]
+        counters = []
+        threads = []
+        for subscriber in subscribers[min(args.slow, clients):]:
+            counters.append([0])
+            threads.append(threading.Thread(target=drain, args=(subscriber, stop, counters[-1]), daemon=True))
+        for thread in threads:
+            thread.start()
+        start = time.perf_counter()
+        for i in range(args.results):
+            properties = pika.BasicProperties(correlation_id=f"q{i}")
+            dashboard.process_result(channel, delivery, properties, bodies[i % len(bodies)])
+        elapsed = time.perf_counter() - start
+        time.sleep(0.5)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for subscriber in subscribers:
+            stream.unsubscribe(subscriber)
+        report(f"{clients} clientes ({min(args.slow, clients)} lentos)", args.results, elapsed, unit="resultados")
+        if counters:
+            delivered = sum(counter[0] for counter in counters) / len(counters)
+            print(f"{'':<40} eventos por cliente que lee={delivered:.0f}  {stream.stats()}")
+
+
+if __name__ == "__main__":
+    main()
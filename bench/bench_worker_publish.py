@@ -0,0 +1,114 @@
+"""Mensajes/s de un ``Worker`` real: consumir, buscar, publicar el resultado y ackear.
+
+Cada caso arranca un ``Worker`` de travel con su configuración (acks
+agrupados, prefetch, confirms, concurrencia), publica ``--messages`` queries
+en 'looking-for' y mide hasta recibir todos los resultados en 'results'.
+Pasa por ``Worker.deliver`` y el agrupamiento de acks, así que detecta
+regresiones en el camino de publicación del runtime.
+
+Por defecto usa el broker en memoria (sin RabbitMQ); contra un RabbitMQ:
+
+    RABBITLAB_TRANSPORT=amqp RABBITMQ_HOST=localhost python bench/bench_worker_publish.py --messages 20000
+"""
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault("RABBITLAB_TRANSPORT", "memory")
+os.environ.setdefault("RABBITMQ_HOST", "localhost")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("STATS_INTERVAL", "0")
+# Cada query se busca y se serializa de nuevo: el cache se mide en bench_cache.py
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+import logging  # noqa: E402
+
+import pika  # noqa: E402
+
+from common import load_service, report  # noqa: E402
+
+from rabbitlab_common import QUERIES_EXCHANGE, RESULTS_EXCHANGE, Worker, close_quietly, connect  # noqa: E402
+from rabbitlab_common.worker import ACK_FLUSH_SECONDS  # noqa: E402
+
+# Ids que existen y que no: resultados found y not_found
+IDS = ("12345", "67890", "99999")
+
+CASES = (
+    ("ack por mensaje", {"ack_batch": 1, "prefetch_count": 1}),
+    ("acks agrupados (50, prefetch 100)", {"ack_batch": 50, "prefetch_count": 100}),
+    ("acks agrupados + confirms", {"ack_batch": 50, "prefetch_count": 100, "publish_confirms": True}),
+    ("WORKER_CONCURRENCY=4", {"concurrency": 4}),
+)
+
+
+def run_case(lookup, messages, options, timeout=120):
+    """Consume ``messages`` queries con un ``Worker`` configurado con ``options``; retorna los segundos."""
+    # Cola exclusiva: se borra al cerrar la conexión del worker
+    worker = Worker("travel", lookup, queue="", **options)
+    worker_connection = connect()
+    consumer = threading.Thread(target=worker.consume, args=(worker_connection,), daemon=True)
+
+    connection = connect()
+    channel = connection.channel()
+    channel.exchange_declare(exchange=QUERIES_EXCHANGE, exchange_type='fanout', durable=True)
+    channel.exchange_declare(exchange=RESULTS_EXCHANGE, exchange_type='fanout', durable=True)
+    results = channel.queue_declare(queue='', exclusive=True).method.queue
+    channel.queue_bind(exchange=RESULTS_EXCHANGE, queue=results)
+    received = [0]
+
+    def on_result(ch, method, properties, body):
+        received[0] += 1
+
+    channel.basic_consume(queue=results, on_message_callback=on_result, auto_ack=True)
+
+    def publish(count):
+        for i in range(count):
+            body = ('{"name": null, "id": "%s", "phone": null}' % IDS[i % len(IDS)]).encode("utf-8")
+            channel.basic_publish(exchange=QUERIES_EXCHANGE, routing_key='', body=body, properties=properties)
+
+    def wait_for(count):
+        deadline = time.monotonic() + timeout
+        while received[0] < count:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Solo llegaron {received[0]}/{count} resultados en {timeout}s")
+            connection.process_data_events(time_limit=0.05)
+
+    properties = pika.BasicProperties(content_type="application/json")
+    consumer.start()
+    # Queries de calentamiento hasta que vuelve uno: el worker ya consume (los
+    # publicados antes de que bindee su cola se descartan). Se drenan los
+    # resultados rezagados antes de medir.
+    while received[0] == 0:
+        publish(1)
+        connection.process_data_events(time_limit=0.1)
+    connection.process_data_events(time_limit=ACK_FLUSH_SECONDS * 4)
+    received[0] = 0
+
+    start = time.perf_counter()
+    publish(messages)
+    wait_for(messages)
+    elapsed = time.perf_counter() - start
+
+    worker_connection.add_callback_threadsafe(worker_connection.close)
+    consumer.join(timeout=5)
+    if worker.executor is not None:
+        worker.executor.shutdown(wait=False)
+    close_quietly(connection)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    travel = load_service("travel-svc")
+    logging.disable(logging.INFO)
+    for label, options in CASES:
+        elapsed = run_case(travel.worker.lookup, args.messages, options)
+        report(label, args.messages, elapsed, unit="msg")
+
+
+if __name__ == "__main__":
+    main()
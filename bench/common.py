@@ -0,0 +1,80 @@
+"""Utilidades compartidas por los benchmarks de RabbitLab."""
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def load_service(directory, name=None):
+    """Importa el ``app.py`` de un servicio (los directorios llevan guiones).
+
+    El directorio del servicio se agrega a ``sys.path``, como al ejecutar
+    ``python app.py``, para que encuentre sus módulos propios.
+    """
+    path = os.path.join(ROOT, directory, "app.py")
+    if os.path.dirname(path) not in sys.path:
+        sys.path.insert(1, os.path.dirname(path))
+    name = name or directory.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_threads(func, threads, duration):
+    """Ejecuta ``func`` en bucle desde ``threads`` threads durante ``duration`` s.
+
+    Retorna el número total de llamadas completadas.
+    """
+    counts = [0] * threads
+    deadline = time.perf_counter() + duration
+
+    def loop(slot):
+        while time.perf_counter() < deadline:
+            func()
+            counts[slot] += 1
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts)
+
+
+def report(label, count, elapsed, unit="ops"):
+    print(f"{label:<40} {count:>10} {unit} en {elapsed:6.2f}s  ->  {count / elapsed:>12.1f} {unit}/s")
+
+
+class NullChannel:
+    """Canal que descarta lo publicado; mide el costo de un worker sin broker."""
+
+    is_open = True
+
+    def __init__(self):
+        self.published = 0
+
+    def basic_publish(self, **kwargs):
+        self.published += 1
+
+    def basic_ack(self, **kwargs):
+        pass
+
+    def basic_nack(self, **kwargs):
+        pass
+
+
+class Delivery:
+    """``method`` mínimo de una entrega de pika."""
+
+    redelivered = False
+
+    def __init__(self, delivery_tag=1):
+        self.delivery_tag = delivery_tag
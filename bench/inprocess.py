@@ -0,0 +1,84 @@
+"""Pipeline completo de RabbitLab en un proceso, sobre el broker en memoria.
+
+query-svc (por su cliente de prueba de Flask), los ocho servicios de
+búsqueda y el consumidor del dashboard se conectan a
+``rabbitlab_common.memory.BROKER``: sin RabbitMQ, red ni contenedores. Lo
+usan ``bench_pipeline.py`` y ``loadgen.py --inprocess``.
+
+Debe importarse antes que cualquier módulo de ``rabbitlab_common``: el
+transporte se elige al importarlo.
+"""
+import os
+
+os.environ["RABBITLAB_TRANSPORT"] = "memory"
+# Sin listeners de métricas ni logs periódicos por cada worker del proceso
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("STATS_INTERVAL", "0")
+
+import logging  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+
+from common import load_service  # noqa: E402
+from rabbitlab_common.memory import BROKER  # noqa: E402
+
+WORKER_SERVICES = (
+    "comercialinfo-scv",
+    "socialmedia-svc",
+    "officialrecords-svc",
+    "financial-svc",
+    "travel-svc",
+    "creditbank-scv",
+    "rh-svc",
+    "education-svc",
+)
+
+
+class Pipeline:
+    """query-svc, los workers y el dashboard cargados en este proceso y conectados al broker en memoria."""
+
+    def __init__(self, services=WORKER_SERVICES, quiet=True):
+        self.services = services
+        self.quiet = quiet
+        self.query_svc = None
+        self.dashboard = None
+        self.workers = []
+        self.broker = BROKER
+
+    def start(self, timeout=10):
+        """Carga los servicios, arranca sus consumidores y espera a que estén suscritos."""
+        self.query_svc = load_service("query-svc")
+        self.dashboard = load_service("dashboard-svc")
+        self.workers = [load_service(directory).worker for directory in self.services]
+        if self.quiet:
+            # Los servicios registran cada mensaje en INFO
+            logging.disable(logging.INFO)
+
+        threading.Thread(target=self.dashboard.consumer_thread, name="dashboard-consumer", daemon=True).start()
+        for worker in self.workers:
+            threading.Thread(target=worker.run, name=f"{worker.service}-consumer", daemon=True).start()
+
+        deadline = time.monotonic() + timeout
+        while not self.ready():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Los consumidores no se suscribieron en {timeout}s: {self.broker.stats()}")
+            time.sleep(0.01)
+        return self
+
+    def ready(self):
+        """True cuando cada worker consume su cola y el dashboard la de 'results'."""
+        stats = self.broker.stats()
+        queues, exchanges = stats["queues"], stats["exchanges"]
+
+        def consumed(exchange):
+            return sum(1 for name in exchanges.get(exchange, ()) if queues[name]["consumers"])
+
+        return consumed("looking-for") >= len(self.workers) and consumed("results") >= 1
+
+    def client(self):
+        """Cliente HTTP de prueba de query-svc (uno por thread)."""
+        return self.query_svc.app.test_client()
+
+    def stop(self):
+        """Cierra las conexiones: los consumidores terminan y el broker queda vacío."""
+        self.broker.reset()
@@ -0,0 +1,465 @@
+"""Generador de carga del pipeline completo: query-svc → servicios → dashboard.
+
+Envía consultas a ``POST /query`` y sigue sus resultados en ``/api/stream``
+del dashboard, así que mide cuándo se completa cada consulta (respondieron
+todos los servicios esperados) y no solo cuánto tarda la publicación.
+
+- ``--mode closed``: ``--concurrency`` clientes; cada uno espera a que su
+  consulta se complete (o ``--timeout``) antes de enviar la siguiente.
+- ``--mode open``: llegadas a ``--rate`` consultas/s (exponenciales con
+  ``--poisson``), sin esperar respuestas. La latencia se mide desde el
+  instante en que la consulta debía enviarse, así que si el cliente se
+  atrasa se ve en los percentiles (sin omisión coordinada).
+- ``--mode replay``: como ``open``, pero en los instantes ``at`` (segundos
+  desde el inicio) de cada línea de ``--workload``.
+
+``--workload`` es un JSONL con una consulta ``{name, id, phone}`` por línea
+(o ``{"query": {...}, "at": segundos}``); sin él se usan las personas de
+ejemplo de las BD y ids desconocidos. Reporta throughput, percentiles de
+la respuesta HTTP y de la consulta completa, y por servicio la llegada de
+su resultado y sus etapas (``timings`` de ``/api/latency``):
+
+    python bench/loadgen.py --mode closed --concurrency 8 --duration 30
+    python bench/loadgen.py --mode open --rate 200 --poisson --duration 30
+    python bench/loadgen.py --mode replay --workload bench/workloads/sample.jsonl
+
+Con ``--inprocess`` no hacen falta contenedores: query-svc, los servicios y
+el dashboard corren en este proceso sobre el broker en memoria
+(``inprocess.py``):
+
+    python bench/loadgen.py --inprocess --mode open --rate 500 --duration 10
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from common import report
+
+SERVICES = os.environ.get(
+    "EXPECTED_SERVICES",
+    "commercialinfo,socialmedia,officialrecords,financial,travel,creditbank,rh,education",
+).split(",")
+
+# Personas que existen en las BD de ejemplo de los servicios
+KNOWN_PEOPLE = [
+    {"name": "Juan Perez", "id": "12345", "phone": "555-1234"},
+    {"name": "Maria Garcia", "id": "67890", "phone": None},
+    {"name": "Carlos Lopez", "id": "11111", "phone": None},
+    {"name": "Ana Martinez", "id": "22222", "phone": None},
+]
+
+
+def load_workload(path):
+    """Consultas ``(at, query)`` de un JSONL (``at`` es None si la línea no lo trae)."""
+    entries = []
+    with open(path) as workload:
+        for number, line in enumerate(workload, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            query = item.get("query", item)
+            if not isinstance(query, dict) or not (query.get("name") or query.get("id") or query.get("phone")):
+                raise SystemExit(f"{path}:{number}: se esperaba una consulta con name, id o phone")
+            entries.append((item.get("at"), {key: query.get(key) for key in ("name", "id", "phone")}))
+    if not entries:
+        raise SystemExit(f"{path}: no tiene consultas")
+    return entries
+
+
+def synthetic_workload(distinct, seed):
+    """Personas de ejemplo mezcladas con ids desconocidos (``distinct`` consultas distintas)."""
+    rng = random.Random(seed)
+    queries = list(KNOWN_PEOPLE)
+    while len(queries) < distinct:
+        queries.append({"name": None, "id": str(rng.randrange(10**8, 10**9)), "phone": None})
+    rng.shuffle(queries)
+    return [(None, query) for query in queries[:distinct]]
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+    pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)  # noqa: E731
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 3)}
+
+
+class Collector:
+    """Cruza las consultas enviadas con los resultados que llegan del dashboard.
+
+    Un resultado puede llegar antes de que ``sent`` conozca su query_id (el
+    pipeline responde antes que la respuesta HTTP): queda guardado hasta
+    entonces. Varias consultas enviadas pueden compartir query_id cuando
+    query-svc las une a una idéntica en curso.
+    """
+
+    def __init__(self, services):
+        self.services = frozenset(services)
+        self._lock = threading.Lock()
+        # query_id -> {"sent": [instantes], "arrivals": {service: instante}, "done": Event}
+        self._queries = {}
+        self.http = []
+        self.completions = []
+        self.errors = 0
+        self.coalesced = 0
+        self.resyncs = 0
+        self.first_sent = None
+        self.last_done = None
+        self._timings = {}
+
+    def _entry(self, query_id):
+        entry = self._queries.get(query_id)
+        if entry is None:
+            entry = self._queries[query_id] = {"sent": [], "arrivals": {}, "done": threading.Event()}
+        return entry
+
+    def sent(self, query_id, intended, http_seconds, coalesced):
+        with self._lock:
+            if self.first_sent is None or intended < self.first_sent:
+                self.first_sent = intended
+            self.http.append(http_seconds * 1000)
+            self.coalesced += coalesced
+            entry = self._entry(query_id)
+            entry["sent"].append(intended)
+            if entry["done"].is_set():
+                # Se unió a una consulta ya completa: sus resultados están disponibles al responder
+                self.completions.append(http_seconds * 1000)
+            return entry["done"]
+
+    def failed(self):
+        with self._lock:
+            self.errors += 1
+
+    def result(self, query_id, service, arrived, timings):
+        with self._lock:
+            entry = self._entry(query_id)
+            entry["arrivals"].setdefault(service, arrived)
+            if timings:
+                stages = self._timings.setdefault(service, {})
+                for stage, value in timings.items():
+                    stages.setdefault(stage, []).append(value)
+            if not entry["done"].is_set() and self.services <= entry["arrivals"].keys():
+                entry["done"].set()
+                self._complete(entry, entry["sent"])
+
+    def _complete(self, entry, senders):
+        finished = max(entry["arrivals"][service] for service in self.services)
+        for intended in senders:
+            self.completions.append((finished - intended) * 1000)
+        if self.last_done is None or finished > self.last_done:
+            self.last_done = finished
+
+    def resync(self):
+        with self._lock:
+            self.resyncs += 1
+
+    def pending(self):
+        """Consultas enviadas que aún no se completan."""
+        with self._lock:
+            return sum(1 for entry in self._queries.values() if entry["sent"] and not entry["done"].is_set())
+
+    def summary(self):
+        with self._lock:
+            queries = [entry for entry in self._queries.values() if entry["sent"]]
+            # Resultados de consultas que no envió este generador (otro cliente del mismo dashboard)
+            unexpected = len(self._queries) - len(queries)
+            arrivals = {service: [] for service in sorted(self.services)}
+            stragglers = dict.fromkeys(sorted(self.services), 0)
+            missing = dict.fromkeys(sorted(self.services), 0)
+            for entry in queries:
+                first = min(entry["sent"])
+                for service, arrived in entry["arrivals"].items():
+                    if service in arrivals:
+                        arrivals[service].append((arrived - first) * 1000)
+                for service in self.services - entry["arrivals"].keys():
+                    missing[service] += 1
+                if entry["done"].is_set():
+                    stragglers[max(self.services, key=entry["arrivals"].get)] += 1
+            sent = sum(len(entry["sent"]) for entry in queries)
+            return {
+                "sent": sent + self.errors,
+                "errors": self.errors,
+                "coalesced": self.coalesced,
+                "completed": len(self.completions),
+                "incomplete": sent - len(self.completions),
+                "resyncs": self.resyncs,
+                "unexpected": unexpected,
+                "http_ms": percentiles(self.http),
+                "completion_ms": percentiles(self.completions),
+                "services": {
+                    service: {
+                        "arrival_ms": percentiles(arrivals[service]),
+                        "last": stragglers[service],
+                        "missing": missing[service],
+                        "stages_ms": {stage: percentiles(values)
+                                      for stage, values in self._timings.get(service, {}).items()},
+                    }
+                    for service in sorted(self.services)
+                },
+            }
+
+
+class HttpTarget:
+    """query-svc y dashboard-svc por HTTP (contenedores o procesos locales)."""
+
+    def __init__(self, query_url, dashboard_url, wait=None):
+        self.query_url = urlsplit(query_url)
+        self.dashboard_url = urlsplit(dashboard_url)
+        self.wait = wait
+        self._local = threading.local()
+
+    def _connection(self, url, timeout=60):
+        return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+    def check(self):
+        for name, url in (("query-svc", self.query_url), ("dashboard-svc", self.dashboard_url)):
+            try:
+                connection = self._connection(url, timeout=5)
+                connection.request("GET", "/health")
+                ok = connection.getresponse().status == 200
+                connection.close()
+            except OSError:
+                ok = False
+            print(f"   ➜ {name} ({url.geturl()}) {'✓' if ok else '✗'}")
+            if not ok:
+                raise SystemExit(f"{name} no responde en {url.geturl()}/health")
+
+    def send(self, query):
+        """Envía una consulta; retorna ``(query_id, coalesced)``."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connection(self.query_url)
+        path = "/query" if self.wait is None else f"/query?wait={self.wait}"
+        try:
+            connection.request("POST", path, json.dumps(query), {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            payload = json.loads(response.read())
+        except (OSError, http.client.HTTPException):
+            # La conexión keep-alive se cerró: la siguiente consulta abre otra
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"query-svc respondió {response.status}: {payload}")
+        return payload["query_id"], bool(payload.get("coalesced"))
+
+    def subscribe(self, collector, ready):
+        """Lee ``/api/stream`` del dashboard y entrega cada resultado al colector."""
+        connection = self._connection(self.dashboard_url, timeout=None)
+        connection.request("GET", "/api/stream", headers={"Accept": "text/event-stream"})
+        response = connection.getresponse()
+        ready.set()
+        event = None
+        for raw in response:
+            line = raw.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "result":
+                message = json.loads(line[6:])
+                result = message["result"]
+                collector.result(message["query_id"], message["service"], time.perf_counter(),
+                                 result.get("timings"))
+            elif line.startswith("data: ") and event == "resync":
+                # El dashboard descartó eventos porque este cliente no alcanzó a leerlos
+                collector.resync()
+
+
+class InProcessTarget:
+    """Pipeline completo en este proceso sobre el broker en memoria (``inprocess.Pipeline``)."""
+
+    # Cola del suscriptor: el generador lee en el mismo proceso, sin red de por medio
+    STREAM_QUEUE = 65536
+
+    def __init__(self, wait=None):
+        # Elige el transporte en memoria: debe importarse antes que rabbitlab_common
+        from inprocess import Pipeline
+
+        self.pipeline = Pipeline()
+        self.wait = wait
+        self._local = threading.local()
+
+    def check(self):
+        self.pipeline.start()
+        print(f"   ➜ pipeline en proceso (broker en memoria, {len(self.pipeline.workers)} servicios) ✓")
+
+    def send(self, query):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.pipeline.client()
+        path = "/query" if self.wait is None else f"/query?wait={self.wait}"
+        response = client.post(path, json=query)
+        payload = response.get_json()
+        if response.status_code != 200:
+            raise RuntimeError(f"query-svc respondió {response.status_code}: {payload}")
+        return payload["query_id"], bool(payload.get("coalesced"))
+
+    def subscribe(self, collector, ready):
+        """Se suscribe directamente al ``ResultStream`` del dashboard (los mismos eventos de /api/stream)."""
+        dashboard = self.pipeline.dashboard
+        stream = dashboard.result_stream
+        stream.max_queue = max(stream.max_queue, self.STREAM_QUEUE)
+        subscriber = stream.subscribe()
+        ready.set()
+        while True:
+            event = subscriber.events.get()
+            if event is dashboard.RESYNC:
+                collector.resync()
+                continue
+            _, frame = event
+            message = json.loads(frame[frame.index("data: ") + 6:])
+            collector.result(message["query_id"], message["service"], time.perf_counter(),
+                             message["result"].get("timings"))
+
+
+def run_closed(target, collector, workload, args):
+    deadline = time.perf_counter() + args.duration
+    counter = itertools.count()
+
+    def client():
+        while time.perf_counter() < deadline:
+            position = next(counter)
+            if args.requests and position >= args.requests:
+                return
+            query = workload[position % len(workload)][1]
+            started = time.perf_counter()
+            try:
+                query_id, coalesced = target.send(query)
+            except Exception as error:
+                collector.failed()
+                if args.verbose:
+                    print(f"error: {error}", file=sys.stderr)
+                continue
+            done = collector.sent(query_id, started, time.perf_counter() - started, coalesced)
+            done.wait(args.timeout)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open(target, collector, workload, args):
+    rng = random.Random(args.seed)
+    if args.mode == "replay":
+        schedule = [(at or 0.0, query) for at, query in workload]
+    else:
+        total = args.requests or int(args.rate * args.duration)
+        schedule = []
+        at = 0.0
+        for position in range(total):
+            schedule.append((at, workload[position % len(workload)][1]))
+            at += rng.expovariate(args.rate) if args.poisson else 1 / args.rate
+
+    def fire(intended, query):
+        try:
+            query_id, coalesced = target.send(query)
+        except Exception as error:
+            collector.failed()
+            if args.verbose:
+                print(f"error: {error}", file=sys.stderr)
+            return
+        collector.sent(query_id, intended, time.perf_counter() - intended, coalesced)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_outstanding) as pool:
+        for at, query in schedule:
+            intended = start + at
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, intended, query)
+
+
+def print_summary(summary, elapsed):
+    report("consultas enviadas", summary["sent"], elapsed, unit="consultas")
+    if summary["completed"]:
+        report("consultas completas", summary["completed"], elapsed, unit="consultas")
+    print(f"errores={summary['errors']}  incompletas={summary['incomplete']}  "
+          f"unidas a otra={summary['coalesced']}  resyncs={summary['resyncs']}  "
+          f"ajenas={summary['unexpected']}")
+    print(f"{'respuesta HTTP (ms)':<40} {summary['http_ms']}")
+    print(f"{'consulta completa (ms)':<40} {summary['completion_ms']}")
+    print(f"\n{'servicio':<16} {'p50':>9} {'p95':>9} {'p99':>9} {'último':>8} {'faltó':>7}   etapas p95 (ms)")
+    for service, info in summary["services"].items():
+        arrival = info["arrival_ms"]
+        stages = "  ".join(f"{stage}={values['p95']}" for stage, values in info["stages_ms"].items()
+                           if stage != "total")
+        cells = [f"{arrival[key]:>9}" if arrival[key] is not None else f"{'-':>9}" for key in ("p50", "p95", "p99")]
+        print(f"{service:<16} {' '.join(cells)} {info['last']:>8} {info['missing']:>7}   {stages}")
+
+
+def build_target(args):
+    if args.inprocess:
+        return InProcessTarget(wait=args.wait)
+    return HttpTarget(args.query_url, args.dashboard_url, wait=args.wait)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("closed", "open", "replay"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=4, help="clientes en modo closed")
+    parser.add_argument("--rate", type=float, default=50.0, help="consultas/s en modo open")
+    parser.add_argument("--poisson", action="store_true", help="llegadas exponenciales en modo open")
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos enviando consultas")
+    parser.add_argument("--requests", type=int, default=0, help="máximo de consultas (0: según la duración)")
+    parser.add_argument("--workload", help="JSONL de consultas a repetir")
+    parser.add_argument("--distinct", type=int, default=1000, help="consultas distintas sin --workload")
+    parser.add_argument("--services", default=",".join(SERVICES), help="servicios que completan una consulta")
+    parser.add_argument("--wait", type=float, help="usar /query?wait= (la respuesta HTTP trae los resultados)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="espera máxima por consulta en modo closed")
+    parser.add_argument("--drain", type=float, default=3.0, help="segundos esperando resultados al final")
+    parser.add_argument("--max-outstanding", type=int, default=64, help="envíos simultáneos en modo open")
+    parser.add_argument("--inprocess", action="store_true",
+                        help="todos los servicios en este proceso sobre el broker en memoria (sin Docker)")
+    parser.add_argument("--query-url", default="http://localhost:5000")
+    parser.add_argument("--dashboard-url", default="http://localhost:5001")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="guarda el resumen en este archivo")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if args.mode == "replay" and not args.workload:
+        parser.error("--mode replay requiere --workload")
+
+    workload = load_workload(args.workload) if args.workload else synthetic_workload(args.distinct, args.seed)
+    collector = Collector(args.services.split(","))
+    target = build_target(args)
+    target.check()
+
+    ready = threading.Event()
+    threading.Thread(target=target.subscribe, args=(collector, ready), daemon=True).start()
+    if not ready.wait(10):
+        raise SystemExit("No se pudo suscribir a /api/stream del dashboard")
+
+    print(f"\nmodo={args.mode} consultas distintas={len(workload)} servicios={len(collector.services)}")
+    start = time.perf_counter()
+    if args.mode == "closed":
+        run_closed(target, collector, workload, args)
+    else:
+        run_open(target, collector, workload, args)
+    sending = time.perf_counter() - start
+
+    # Esperar los resultados que aún vienen en camino
+    deadline = time.perf_counter() + args.drain
+    while time.perf_counter() < deadline and collector.pending():
+        time.sleep(0.05)
+
+    summary = collector.summary()
+    summary["mode"] = args.mode
+    summary["elapsed_s"] = round(sending, 3)
+    print_summary(summary, sending)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(summary, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
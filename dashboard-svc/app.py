@@ -1,11 +1,19 @@
 import logging
+import queue
 import threading
 import time
-import json
-from collections import defaultdict
 
-import pika
-from flask import Flask, render_template, jsonify
+import os
+
+from flask import Flask, Response, render_template, jsonify, request
+
+from rabbitlab_common import codec
+from rabbitlab_common.connection import connect
+from rabbitlab_common.metrics import CONTENT_TYPE, REGISTRY
+from latency import LatencyTracker, query_breakdown, stage_timings
+from result_log import ResultLog
+from result_store import ResultStore
+from result_stream import RESYNC, ResultStream, sse_frame
 
 app = Flask(__name__)
 
@@ -15,52 +23,193 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
-# Diccionario en memoria para almacenar resultados
-# Estructura: {query_id: {service_name: result_data}}
-results_dict = defaultdict(dict)
+# Registro durable de resultados (SQLite); vacío = solo en memoria
+RESULTS_DB = os.environ.get("RESULTS_DB", "")
+# Segundos máximos que un resultado espera en el lote antes de escribirse
+RESULTS_LOG_FLUSH = float(os.environ.get("RESULTS_LOG_FLUSH", "0.2"))
+results_log = ResultLog(RESULTS_DB) if RESULTS_DB else None
+# Cola durable de resultados con registro durable: los mensajes sin ack y
+# los publicados mientras el dashboard se reinicia se conservan en ella
+RESULTS_QUEUE = os.environ.get("RESULTS_QUEUE", "results.dashboard")
+# Último seq escrito antes de este arranque: los nuevos continúan desde ahí
+start_seq = results_log.last_seq() if results_log is not None else 0
 
-# Lock para acceso thread-safe
-results_lock = threading.Lock()
+# Resultados en memoria, acotados por cantidad, bytes y TTL (thread-safe)
+# Estructura: {query_id: {service_name: result_data}}, donde query_id es el
+# correlation_id asignado por query-svc
+results_store = ResultStore(seq=start_seq)
 
+RESULT_LATENCY = REGISTRY.histogram(
+    "rabbitlab_dashboard_result_latency_seconds",
+    "Latencia extremo a extremo desde que query-svc publicó la consulta hasta recibir el resultado", ["service"])
+PROCESS_SECONDS = REGISTRY.histogram(
+    "rabbitlab_dashboard_process_seconds", "Duración de process_result por mensaje de resultados")
+RESULTS = REGISTRY.counter("rabbitlab_dashboard_results_total", "Resultados recibidos")
+REGISTRY.gauge("rabbitlab_dashboard_store_queries", "Consultas en el almacén en memoria",
+               function=lambda: len(results_store))
+REGISTRY.gauge("rabbitlab_dashboard_store_bytes", "Bytes de resultados en el almacén en memoria",
+               function=lambda: results_store.stats()["bytes"])
+REGISTRY.gauge("rabbitlab_dashboard_stream_clients", "Clientes conectados a /api/stream",
+               function=lambda: result_stream.stats()["clients"])
+REGISTRY.gauge("rabbitlab_dashboard_log_pending", "Resultados aún no escritos en el registro durable",
+               function=lambda: results_log.pending if results_log is not None else 0)
 
-def connect():
-    """Intenta conectar de forma persistente a RabbitMQ."""
-    while True:
-        try:
-            connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-            logging.info("Dashboard conectado a RabbitMQ")
-            return connection
-        except pika.exceptions.AMQPConnectionError:
-            logging.warning("Dashboard esperando conexión con RabbitMQ...")
-            time.sleep(5)
+# Percentiles recientes de latencia por servicio y etapa (/api/latency)
+latency_tracker = LatencyTracker()
+
+# Último mensaje cuyos resultados aún no están en disco (se ackea al escribirse)
+unacked_tag = None
+flush_scheduled = False
+
+# Consultas por página en /viewresults y máximo por página en /api/results
+VIEW_PAGE_SIZE = int(os.environ.get("VIEW_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "1000"))
+
+# Clientes de /api/stream, a los que se empuja cada resultado al recibirlo
+result_stream = ResultStream()
+# Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión
+STREAM_KEEPALIVE = float(os.environ.get("STREAM_KEEPALIVE", "15"))
 
 
 def process_result(ch, method, properties, body):
     """Callback que procesa resultados de los servicios.
     
-    Espera un JSON con: id, status, y datos específicos del servicio.
+    Espera un resultado con: id, status, y datos específicos del servicio,
+    en el formato que indica su ``content_type`` (JSON o msgpack).
     """
+    start = time.perf_counter()
     try:
-        result_msg = json.loads(body.decode('utf-8'))
+        result_msg = codec.decode(body, properties.content_type)
         logging.info(f"Resultado recibido: {result_msg}")
-        
-        # Extraer identificador y servicio origen (del header o del cuerpo)
-        query_id = result_msg.get("id", "unknown")
-        service_name = result_msg.get("service", "unknown")
-        
-        # Almacenar resultado con thread-safety
-        with results_lock:
-            results_dict[query_id][service_name] = result_msg
+        if not isinstance(result_msg, dict):
+            raise ValueError(f"Se esperaba un objeto, no {type(result_msg).__name__}")
+
+        # Los lotes de /query/batch traen varios resultados, cada uno con su
+        # query_id; un resultado individual se agrupa por su correlation_id
+        # (o por el id del cuerpo si no lo trae)
+        if "results" in result_msg:
+            query_ids, results = result_msg.get("query_ids"), result_msg["results"]
+            if not isinstance(query_ids, list) or not isinstance(results, list) or len(query_ids) != len(results):
+                raise ValueError("Lote inválido: 'query_ids' y 'results' deben ser listas del mismo largo")
+            entries = list(zip(query_ids, results))
+        else:
+            entries = [(properties.correlation_id or result_msg.get("id", "unknown"), result_msg)]
+        # Se valida todo el mensaje antes de guardar nada: si una entrada
+        # fallara a mitad del lote, la reentrega duplicaría las anteriores
+        for query_id, result in entries:
+            if not isinstance(result, dict):
+                raise ValueError(f"Resultado inválido para query_id={query_id}: {result!r}")
+        # Tamaño aproximado de cada resultado: su parte del mensaje codificado
+        size = len(body) // max(1, len(entries))
+
+        # Latencia por etapa (query-svc → worker → dashboard) según los
+        # headers de cada salto; "total" es la latencia extremo a extremo
+        now = time.time()
+        timings = stage_timings(properties.headers or {}, now)
+        latency_ms = timings.get("total")
+
+        # Almacenar resultados (el almacén es thread-safe)
+        for query_id, result in entries:
+            service_name = result.get("service", "unknown")
+            if latency_ms is not None:
+                result["latency_ms"] = round(latency_ms, 1)
+                RESULT_LATENCY.labels(service_name).observe(latency_ms / 1000)
+            if timings:
+                result["timings"] = timings
+                latency_tracker.record(service_name, timings)
+            seq = results_store.put(query_id, service_name, result, size)
+            if results_log is not None:
+                results_log.append(seq, query_id, service_name, now, size, result)
+            result_stream.publish(query_id, seq, "result",
+                                  {"query_id": query_id, "seq": seq, "service": service_name, "result": result})
             logging.info(f"Resultado almacenado para query_id={query_id}, service={service_name}")
         
-        # Reconocer mensaje
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+        # Reconocer mensaje (con registro durable, cuando quede en disco)
+        if results_log is None:
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+        else:
+            ack_when_durable(ch, method.delivery_tag)
+        RESULTS.inc(len(entries))
+        PROCESS_SECONDS.observe(time.perf_counter() - start)
         
-    except Exception as e:
+    except ValueError:
+        # Mensaje mal formado: reentregarlo fallaría igual
+        logging.exception("Resultado inválido, descartado")
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+    except Exception:
         logging.exception("Error procesando resultado")
         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
 
 
+def ack_when_durable(ch, delivery_tag):
+    """Ackea los mensajes cuando sus resultados quedan escritos en disco.
+
+    El lote se escribe al llenarse (``RESULTS_LOG_BATCH`` resultados) o tras
+    ``RESULTS_LOG_FLUSH`` segundos, y un solo ``basic_ack(multiple=True)``
+    cubre todos sus mensajes.
+    """
+    global unacked_tag, flush_scheduled
+    unacked_tag = delivery_tag
+    if results_log.pending >= results_log.batch_size and flush_results(ch):
+        return
+    # Si la escritura del lote lleno falló, el flush programado la reintenta:
+    # sin él no llegarían más mensajes (el prefetch está cubierto) y la
+    # ingesta quedaría detenida
+    if not flush_scheduled:
+        flush_scheduled = True
+        ch.connection.call_later(RESULTS_LOG_FLUSH, lambda: timed_flush(ch))
+
+
+def timed_flush(ch):
+    global flush_scheduled
+    flush_scheduled = False
+    if not flush_results(ch) and ch.is_open:
+        # Sin ack los mensajes no se pierden; se reintenta más tarde
+        flush_scheduled = True
+        ch.connection.call_later(RESULTS_LOG_FLUSH, lambda: timed_flush(ch))
+
+
+def flush_results(ch):
+    """Escribe el lote en curso y ackea sus mensajes; retorna False si la escritura falló."""
+    global unacked_tag
+    try:
+        results_log.flush()
+    except Exception:
+        logging.exception("Error escribiendo resultados en %s", results_log.path)
+        return False
+    if unacked_tag is not None and ch.is_open:
+        ch.basic_ack(delivery_tag=unacked_tag, multiple=True)
+        unacked_tag = None
+    return True
+
+
+def restore_results():
+    """Recarga en memoria las consultas más recientes del registro durable.
+
+    Corre en background al arrancar: el consumidor y la API empiezan de
+    inmediato y el historial aparece al terminar (las consultas anteriores
+    ya se encuentran por query_id en el registro).
+    """
+    start = time.perf_counter()
+    since = time.time() - results_store.ttl if results_store.ttl else None
+    try:
+        entries = results_log.recent(results_store.max_entries, start_seq, since)
+        restored = results_store.restore(entries)
+    except Exception:
+        logging.exception("Error recargando resultados de %s", results_log.path)
+        return
+    logging.info(f"{restored} consultas recargadas de {results_log.path} "
+                 f"en {time.perf_counter() - start:.2f}s (seq={start_seq})")
+
+
+def find_results(query_id):
+    """Resultados de ``query_id``: en memoria o, si ya no están, en el registro durable."""
+    results = results_store.get(query_id)
+    if not results and results_log is not None:
+        results = results_log.get(query_id)
+    return results
+
+
 def consumer_thread():
     """Función que corre en un thread separado para consumir resultados."""
     try:
@@ -74,9 +223,15 @@ def consumer_thread():
             durable=True
         )
         
-        # Crear cola temporal (exclusiva para este consumer)
-        result = channel.queue_declare(queue='', exclusive=True)
-        queue_name = result.method.queue
+        if results_log is not None:
+            # Los acks llegan cuando el lote está en disco: la cola debe
+            # sobrevivir al dashboard para no perder los mensajes sin ack
+            queue_name = RESULTS_QUEUE
+            channel.queue_declare(queue=queue_name, durable=True)
+        else:
+            # Crear cola temporal (exclusiva para este consumer)
+            result = channel.queue_declare(queue='', exclusive=True)
+            queue_name = result.method.queue
         
         # Bindear cola al exchange
         channel.queue_bind(
@@ -87,7 +242,8 @@ def consumer_thread():
         logging.info(f"Dashboard escuchando en cola: {queue_name}")
         
         # Configurar callback
-        channel.basic_qos(prefetch_count=1)
+        # Con registro durable los acks llegan por lote: el prefetch debe cubrirlo
+        channel.basic_qos(prefetch_count=results_log.batch_size if results_log is not None else 1)
         channel.basic_consume(
             queue=queue_name,
             on_message_callback=process_result,
@@ -106,34 +262,161 @@ def health():
     return "OK"
 
 
+@app.route("/metrics")
+def metrics():
+    """Métricas en el formato de texto de Prometheus."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 @app.route("/viewresults")
 def view_results():
-    """Renderiza HTML con todas las consultas y resultados almacenados."""
-    with results_lock:
-        # Convertir defaultdict a dict normal para pasar a template
-        results_data = dict(results_dict)
-    
+    """Renderiza HTML con la página más reciente de consultas (``?before=`` para las anteriores)."""
+    page = results_store.page(before=request.args.get("before", type=int), limit=VIEW_PAGE_SIZE)
+    results_data = {query["query_id"]: query["results"] for query in page["queries"]}
+
     logging.info(f"Mostrando {len(results_data)} consultas")
-    return render_template('results.html', results=results_data)
+    return render_template('results.html', results=results_data, total=len(results_store),
+                           next_cursor=page["next_cursor"])
 
 
 @app.route("/api/results")
 def get_results_json():
-    """Endpoint API que retorna los resultados en JSON."""
-    with results_lock:
-        results_data = dict(results_dict)
-    return jsonify(results_data)
+    """Endpoint API que retorna una página de resultados en JSON.
+
+    Parámetros (todos opcionales):
+
+    - ``limit``: consultas por página (100, máximo ``MAX_PAGE_SIZE``).
+    - ``before``: cursor para seguir hacia consultas más antiguas.
+    - ``after``: solo lo actualizado después de ese cursor (de lo más antiguo
+      a lo más reciente); un poller repite con el ``next_cursor`` recibido.
+    - ``service``, ``status``: filtran los resultados.
+    - ``since``, ``until``: filtran por fecha de actualización (timestamp UNIX).
+    """
+    args = request.args
+    try:
+        limit = int(args.get("limit", 100))
+        after = int(args["after"]) if "after" in args else None
+        before = int(args["before"]) if "before" in args else None
+        since = float(args["since"]) if "since" in args else None
+        until = float(args["until"]) if "until" in args else None
+    except ValueError:
+        return jsonify({"error": "'limit', 'after' and 'before' must be integers; 'since' and 'until' numbers"}), 400
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"'limit' must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    if after is not None and before is not None:
+        return jsonify({"error": "Use either 'after' or 'before', not both"}), 400
+
+    return jsonify(results_store.page(
+        after=after, before=before, limit=limit,
+        service=args.get("service"), status=args.get("status"), since=since, until=until,
+    ))
 
 
 @app.route("/api/results/<query_id>")
 def get_result_by_id(query_id):
     """Endpoint API que retorna resultados de una query específica."""
-    with results_lock:
-        result = results_dict.get(query_id, {})
-    return jsonify(result)
+    return jsonify(find_results(query_id))
+
+
+@app.route("/api/stream")
+def stream_results():
+    """Empuja cada resultado al recibirlo, como server-sent events.
+
+    Parámetros (opcionales):
+
+    - ``query_id``: solo los resultados de esa consulta; primero envía los
+      que ya se recibieron.
+    - ``after`` (o la cabecera ``Last-Event-ID`` al reconectar): primero
+      envía lo actualizado después de ese cursor.
+
+    Cada evento ``result`` lleva ``{"query_id", "seq", "service", "result"}``
+    e ``id: <seq>``. Si el cliente no alcanza a leer y se llena su cola, se
+    descartan sus eventos pendientes y recibe un evento ``resync`` con
+    ``{"after": <último seq entregado>}`` para recuperar lo perdido con
+    ``/api/results?after=`` (o ``/api/results/<query_id>``).
+    """
+    query_id = request.args.get("query_id")
+    try:
+        after = request.headers.get("Last-Event-ID") or request.args.get("after")
+        after = int(after) if after else None
+    except ValueError:
+        return jsonify({"error": "'after' and 'Last-Event-ID' must be integers"}), 400
+
+    subscriber = result_stream.subscribe(query_id)
+    if subscriber is None:
+        return jsonify({"error": "Too many stream clients, poll /api/results instead"}), 503
+
+    def events():
+        try:
+            # Suscrito antes de leer el almacén, así que nada se pierde entre
+            # ambos; lo repetido se descarta por seq (o el cliente lo
+            # sobrescribe por servicio)
+            if query_id is not None:
+                for service, result in find_results(query_id).items():
+                    yield sse_frame("result", {"query_id": query_id, "seq": None,
+                                               "service": service, "result": result})
+            elif after is not None:
+                page = results_store.page(after=after, limit=MAX_PAGE_SIZE)
+                for query in page["queries"]:
+                    for service, result in query["results"].items():
+                        yield sse_frame("result", {"query_id": query["query_id"], "seq": query["seq"],
+                                                   "service": service, "result": result}, query["seq"])
+                subscriber.last_seq = page["next_cursor"]
+                if page["has_more"]:
+                    yield sse_frame("resync", {"after": subscriber.last_seq})
+            while True:
+                try:
+                    event = subscriber.events.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    yield sse_frame("resync", {"after": subscriber.last_seq, "dropped": subscriber.dropped})
+                    continue
+                seq, frame = event
+                if subscriber.last_seq is not None and seq <= subscriber.last_seq:
+                    continue
+                subscriber.last_seq = seq
+                yield frame
+        finally:
+            result_stream.unsubscribe(subscriber)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/latency")
+def get_latency():
+    """Desglose de la latencia por servicio y etapa.
+
+    Sin parámetros: p50/p95/p99 de las últimas ``LATENCY_WINDOW`` respuestas
+    de cada servicio por etapa (``queue``, ``lookup``, ``publish``,
+    ``delivery``, ``total``) y el servicio más lento con su etapa más lenta.
+    Con ``?query_id=``: las etapas de cada servicio para esa consulta y el
+    que respondió último (``straggler``).
+    """
+    query_id = request.args.get("query_id")
+    if query_id is None:
+        return jsonify(latency_tracker.summary())
+    results = find_results(query_id)
+    if not results:
+        return jsonify({"error": f"Unknown query_id '{query_id}'"}), 404
+    return jsonify(query_breakdown(query_id, results))
+
+
+@app.route("/api/stats")
+def get_stats():
+    """Ocupación y memoria del almacén de resultados, registro durable y clientes de /api/stream."""
+    stats = dict(results_store.stats(), stream=result_stream.stats())
+    if results_log is not None:
+        stats["log"] = results_log.stats()
+    return jsonify(stats)
 
 
 if __name__ == "__main__":
+    if results_log is not None:
+        threading.Thread(target=restore_results, daemon=True).start()
+
     # Iniciar thread consumer en background
     consumer = threading.Thread(target=consumer_thread, daemon=True)
     consumer.start()
@@ -0,0 +1,104 @@
+"""Desglose de la latencia de cada servicio por etapa, a partir de los headers de los resultados."""
+import os
+import threading
+from collections import deque
+
+# Etapas en orden, con los headers que las delimitan (None = llegada al dashboard)
+STAGES = (
+    ("queue", "x-sent-at", "x-received-at"),
+    ("lookup", "x-received-at", "x-looked-up-at"),
+    ("publish", "x-looked-up-at", "x-published-at"),
+    ("delivery", "x-published-at", None),
+    ("total", "x-sent-at", None),
+)
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+def stage_timings(headers, received_at):
+    """Milisegundos de cada etapa según los headers de un resultado.
+
+    - ``queue``: desde que query-svc publicó hasta que el worker recibió el query.
+    - ``lookup``: la búsqueda (decodificar y buscar) en el worker.
+    - ``publish``: desde que terminó la búsqueda hasta justo antes de que el
+      worker publique (armar el resultado y esperar el turno del canal).
+    - ``delivery``: desde ahí hasta que el dashboard lo recibió (incluye el
+      envío del worker y el paso por el broker).
+    - ``total``: extremo a extremo.
+
+    Las etapas cuyos headers faltan (un worker anterior, por ejemplo) se
+    omiten. Los timestamps vienen de relojes distintos, así que con
+    contenedores en hosts diferentes las etapas incluyen su desfase.
+    """
+    timings = {}
+    for stage, begin, end in STAGES:
+        started = headers.get(begin)
+        finished = headers.get(end) if end is not None else received_at
+        if started is not None and finished is not None:
+            timings[stage] = round((finished - started) * 1000, 3)
+    return timings
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LatencyTracker:
+    """Ventana de las últimas latencias por servicio y etapa, para calcular percentiles.
+
+    Configuración por variables de entorno (los argumentos tienen prioridad):
+
+    - ``LATENCY_WINDOW``: resultados recientes por servicio (10000).
+    """
+
+    def __init__(self, window=None):
+        if window is None:
+            window = int(os.environ.get("LATENCY_WINDOW", "10000"))
+        self.window = window
+        # service -> {etapa: deque de milisegundos}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, service, timings):
+        with self._lock:
+            stages = self._samples.get(service)
+            if stages is None:
+                stages = self._samples[service] = {stage: deque(maxlen=self.window) for stage, _, _ in STAGES}
+            for stage, value in timings.items():
+                stages[stage].append(value)
+
+    def summary(self):
+        """Percentiles por servicio y etapa, y el servicio más lento (por p95 total) con su etapa más lenta."""
+        with self._lock:
+            copies = {service: {stage: list(values) for stage, values in stages.items() if values}
+                      for service, stages in self._samples.items()}
+        services = {}
+        for service, stages in copies.items():
+            breakdown = {}
+            for stage, values in stages.items():
+                values.sort()
+                breakdown[stage] = {name: percentile(values, fraction) for name, fraction in PERCENTILES}
+            services[service] = {"count": max(map(len, stages.values()), default=0), "stages": breakdown}
+        slowest = None
+        ranked = [(info["stages"]["total"]["p95"], service) for service, info in services.items()
+                  if "total" in info["stages"]]
+        if ranked:
+            p95, service = max(ranked)
+            stages = services[service]["stages"]
+            stage = max((stage for stage in stages if stage != "total"), key=lambda stage: stages[stage]["p95"],
+                        default=None)
+            slowest = {"service": service, "total_p95_ms": p95, "stage": stage}
+        return {"window": self.window, "services": services, "slowest": slowest}
+
+
+def query_breakdown(query_id, results):
+    """Etapas de cada servicio para una consulta y el servicio que respondió último."""
+    services = {service: result.get("timings", {}) for service, result in results.items()}
+    totals = [(timings["total"], service) for service, timings in services.items() if "total" in timings]
+    straggler = None
+    if totals:
+        total, service = max(totals)
+        stages = services[service]
+        stage = max((stage for stage in stages if stage != "total"), key=stages.get, default=None)
+        straggler = {"service": service, "total_ms": total, "stage": stage}
+    return {"query_id": query_id, "services": services, "straggler": straggler}
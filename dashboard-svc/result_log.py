@@ -0,0 +1,177 @@
+"""Registro durable de resultados del dashboard (SQLite en modo WAL)."""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    " seq INTEGER PRIMARY KEY, query_id TEXT NOT NULL, service TEXT NOT NULL,"
+    " updated REAL NOT NULL, size INTEGER NOT NULL, result TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS results_query_id ON results (query_id, seq)",
+)
+
+# Filas leídas por consulta de SQLite al reconstruir la vista en memoria
+RESTORE_CHUNK = 5000
+
+
+class ResultLog:
+    """Registro append-only de cada resultado, con índice por query_id.
+
+    Cada resultado que guarda ``ResultStore`` se agrega con su ``seq`` (que
+    es la clave primaria), así que al reiniciar el dashboard el ``seq``
+    continúa desde ``last_seq()`` y los cursores de /api/results siguen
+    siendo válidos. Las escrituras se acumulan en memoria y ``flush`` las
+    guarda en una sola transacción; en modo WAL los lectores no bloquean al
+    escritor. Los threads de Flask leen con un pool acotado de conexiones
+    que se reutilizan entre requests.
+
+    Configuración por variables de entorno (los argumentos tienen prioridad):
+
+    - ``RESULTS_LOG_BATCH``: resultados por transacción (500).
+    - ``RESULTS_LOG_READERS``: conexiones de lectura (4); con más lectores
+      simultáneos, los demás esperan una libre.
+    """
+
+    def __init__(self, path, batch_size=None, max_readers=None):
+        if batch_size is None:
+            batch_size = int(os.environ.get("RESULTS_LOG_BATCH", "500"))
+        if max_readers is None:
+            max_readers = int(os.environ.get("RESULTS_LOG_READERS", "4"))
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.max_readers = max(1, max_readers)
+        self._pending = []
+        # Conexiones libres; el semáforo limita cuántas hay en total
+        self._readers = []
+        self._reader_slots = threading.BoundedSemaphore(self.max_readers)
+        self._opened_readers = 0
+        self._db = self._connect()
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._written = 0
+        self._flushes = 0
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # Con WAL, NORMAL no pierde consistencia ante un corte: a lo sumo las
+        # últimas transacciones, que aún no se ackearon a RabbitMQ
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _reader(self):
+        """Presta una conexión de lectura del pool durante el bloque ``with``."""
+        with self._reader_slots:
+            try:
+                db = self._readers.pop()
+            except IndexError:
+                # El modo WAL ya quedó guardado en el archivo por el escritor
+                db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+                db.execute("PRAGMA query_only=ON")
+                self._opened_readers += 1
+            try:
+                yield db
+            finally:
+                self._readers.append(db)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def append(self, seq, query_id, service, updated, size, result):
+        """Agrega un resultado al lote en curso; retorna True si el lote está lleno."""
+        self._pending.append((seq, query_id, service, updated, size, json.dumps(result)))
+        return len(self._pending) >= self.batch_size
+
+    def flush(self):
+        """Escribe el lote en curso en una transacción (desde el thread consumidor).
+
+        Si falla, el lote sigue pendiente y se reintenta en el próximo ``flush``.
+        """
+        if not self._pending:
+            return
+        rows = self._pending
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+            db.execute("COMMIT")
+        except Exception:
+            # El lote queda pendiente para el siguiente intento
+            db.execute("ROLLBACK")
+            raise
+        self._pending = []
+        self._written += len(rows)
+        self._flushes += 1
+
+    def last_seq(self):
+        """Mayor ``seq`` guardado (0 si el registro está vacío); O(1) por la clave primaria."""
+        with self._reader() as db:
+            return db.execute("SELECT COALESCE(MAX(seq), 0) FROM results").fetchone()[0]
+
+    def get(self, query_id):
+        """Último resultado de cada servicio para ``query_id`` (``{}`` si no hay)."""
+        with self._reader() as db:
+            rows = db.execute(
+                "SELECT service, result FROM results WHERE query_id = ? ORDER BY seq", (query_id,),
+            ).fetchall()
+        return {service: json.loads(result) for service, result in rows}
+
+    def recent(self, max_queries, upto, since=None):
+        """Las ``max_queries`` consultas actualizadas más recientemente, para ``ResultStore.restore``.
+
+        Solo considera resultados con ``seq <= upto`` (los guardados antes de
+        reiniciar) y actualizados desde ``since``. Recorre el registro desde
+        el final hasta reunir ``max_queries`` consultas distintas y luego trae
+        los resultados de cada una por el índice, así que el costo depende de
+        ``max_queries`` y no del tamaño del registro. Retorna tuplas
+        ``(query_id, actualizado, {service: (resultado, bytes)}, seq)`` de la
+        más antigua a la más reciente.
+        """
+        with self._reader() as db:
+            order = []
+            seen = set()
+            before = upto + 1
+            while len(order) < max_queries:
+                rows = db.execute(
+                    "SELECT seq, query_id, updated FROM results WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+                    (before, RESTORE_CHUNK),
+                ).fetchall()
+                for seq, query_id, updated in rows:
+                    if since is not None and updated < since:
+                        rows = []
+                        break
+                    if query_id not in seen:
+                        seen.add(query_id)
+                        order.append(query_id)
+                        if len(order) >= max_queries:
+                            break
+                if len(rows) < RESTORE_CHUNK:
+                    break
+                before = rows[-1][0]
+            entries = []
+            for query_id in reversed(order):
+                results = {}
+                for seq, service, updated, size, result in db.execute(
+                    "SELECT seq, service, updated, size, result FROM results"
+                    " WHERE query_id = ? AND seq <= ? ORDER BY seq",
+                    (query_id, upto),
+                ):
+                    results[service] = (json.loads(result), size)
+                entries.append((query_id, updated, results, seq))
+        return entries
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "last_seq": self.last_seq(),
+            "written": self._written,
+            "flushes": self._flushes,
+            "pending": len(self._pending),
+            "batch_size": self.batch_size,
+            "readers": self._opened_readers,
+            "max_readers": self.max_readers,
+        }
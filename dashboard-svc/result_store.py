@@ -0,0 +1,289 @@
+"""Almacén acotado de resultados del dashboard."""
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Entradas del registro que una página revisa como máximo, por resultado pedido
+SCAN_FACTOR = 10
+
+
+class ResultStore:
+    """Resultados por consulta ``{query_id: {service: resultado}}`` con límites.
+
+    Reemplaza al ``defaultdict`` que crecía sin límite. Las consultas se
+    guardan en orden de última actualización: al superar ``max_entries``
+    consultas o ``max_bytes`` (tamaño aproximado, el de los resultados
+    codificados en JSON) se descartan las actualizadas hace más tiempo, y
+    las que superan ``ttl`` segundos sin actualizarse expiran.
+
+    Cada actualización recibe un número de secuencia creciente (``seq``) que
+    sirve de cursor para ``page``: un registro ordenado ``seq`` → query_id
+    permite ubicar el cursor con búsqueda binaria, así que el costo de una
+    página no depende del total de consultas guardadas.
+
+    Solo ``put`` (el thread consumidor) toma el lock; las lecturas nunca lo
+    toman, así que no bloquean a ``put``. Para eso
+    las entradas son tuplas inmutables que ``put`` reemplaza (copy-on-write)
+    y el registro solo crece hasta que la compactación lo cambia por otro:
+    un lector toma el registro y su largo, y cada consulta se valida contra
+    su entrada vigente por ``seq`` (leer una clave de un dict o el largo de
+    una lista es atómico en CPython).
+
+    Cada entrada guarda además la vista que retornan las lecturas
+    (``{"query_id", "seq", "updated_at", "results"}``), armada por el primer
+    lector que la pide y compartida con los siguientes hasta que ``put``
+    reemplaza la entrada: una página sin filtros solo valida y agrega
+    entradas, así que los lectores le quitan poca CPU al consumidor y
+    ``put`` no paga por ella. Las vistas no deben modificarse.
+
+    Configuración por variables de entorno (los argumentos tienen prioridad):
+
+    - ``RESULTS_MAX_QUERIES``: consultas máximas (10000).
+    - ``RESULTS_MAX_BYTES``: bytes máximos de resultados (64 MB).
+    - ``RESULTS_TTL``: segundos de vida desde la última actualización (3600, 0 desactiva).
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, clock=time.time, seq=0):
+        if max_entries is None:
+            max_entries = int(os.environ.get("RESULTS_MAX_QUERIES", "10000"))
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("RESULTS_MAX_BYTES", str(64 * 2**20)))
+        if ttl is None:
+            ttl = float(os.environ.get("RESULTS_TTL", "3600"))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        # query_id -> (actualizado, bytes, {service: (resultado, bytes)}, seq, [vista o None])
+        self._entries = OrderedDict()
+        # Registro (seqs, query_ids) en orden de seq; las posiciones de
+        # consultas actualizadas de nuevo o descartadas quedan obsoletas hasta
+        # la siguiente compactación, que reemplaza el par completo
+        self._log = ([], [])
+        # Último seq asignado; al reiniciar continúa desde el registro durable
+        self._seq = seq
+        self._bytes = 0
+        self._results = 0
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, query_id, service, result, size):
+        """Guarda el ``result`` de ``service`` para ``query_id`` (``size`` en bytes).
+
+        Retorna el ``seq`` asignado a la actualización.
+        """
+        now = self._clock()
+        with self._lock:
+            self._seq += 1
+            entry = self._entries.get(query_id)
+            if entry is None:
+                total, results = 0, {}
+            else:
+                self._entries.move_to_end(query_id)
+                total, results = entry[1], dict(entry[2])
+            previous = results.get(service)
+            if previous is None:
+                self._results += 1
+            else:
+                total -= previous[1]
+                self._bytes -= previous[1]
+            results[service] = (result, size)
+            self._entries[query_id] = _entry(query_id, now, total + size, results, self._seq)
+            self._bytes += size
+            # Primero la entrada y luego el registro: un lector que ve el seq
+            # en el registro ya encuentra la entrada (con ese seq o uno mayor)
+            seqs, ids = self._log
+            seqs.append(self._seq)
+            ids.append(query_id)
+            self._trim(now)
+            return self._seq
+
+    def restore(self, entries):
+        """Agrega consultas anteriores a todo lo guardado (al reiniciar).
+
+        ``entries`` son tuplas ``(query_id, actualizado, {service: (resultado,
+        bytes)}, seq)`` de la más antigua a la más reciente, con ``seq``
+        menores que los ya asignados (ver ``ResultLog.recent``). Quedan como
+        las menos recientes; de una consulta que ya se actualizó desde el
+        reinicio solo se agregan los servicios que le faltan.
+        """
+        now = self._clock()
+        with self._lock:
+            restored = OrderedDict()
+            seqs, ids = [], []
+            for query_id, updated, results, seq in entries:
+                current = self._entries.get(query_id)
+                if current is not None:
+                    missing = {service: value for service, value in results.items()
+                               if service not in current[2]}
+                    if missing:
+                        size = sum(value[1] for value in missing.values())
+                        self._entries[query_id] = _entry(query_id, current[0], current[1] + size,
+                                                         dict(missing, **current[2]), current[3])
+                        self._bytes += size
+                        self._results += len(missing)
+                    continue
+                size = sum(value[1] for value in results.values())
+                restored[query_id] = _entry(query_id, updated, size, results, seq)
+                seqs.append(seq)
+                ids.append(query_id)
+                self._bytes += size
+                self._results += len(results)
+            restored.update(self._entries)
+            self._entries = restored
+            self._log = (seqs + self._log[0], ids + self._log[1])
+            self._trim(now)
+            return len(ids)
+
+    def _trim(self, now):
+        entries = self._entries
+        while entries:
+            query_id, (updated, size, results, _, _) = next(iter(entries.items()))
+            if self.ttl and updated + self.ttl <= now:
+                self._expired += 1
+            elif len(entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evicted += 1
+            else:
+                break
+            del entries[query_id]
+            self._bytes -= size
+            self._results -= len(results)
+        if len(self._log[1]) > 2 * len(entries) + 1024:
+            # El OrderedDict ya está en orden de actualización, es decir, de
+            # seq; los lectores en curso siguen con el registro anterior
+            self._log = ([entry[3] for entry in entries.values()], list(entries))
+
+    def _live(self, entry, now):
+        return not self.ttl or entry[0] + self.ttl > now
+
+    def get(self, query_id):
+        """Resultados de ``query_id`` por servicio (``{}`` si no hay o expiraron)."""
+        entry = self._entries.get(query_id)
+        if entry is None or not self._live(entry, self._clock()):
+            return {}
+        return _view(query_id, entry)["results"]
+
+    def page(self, after=None, before=None, limit=100, service=None, status=None, since=None, until=None):
+        """Una página de consultas, filtrada y paginada por cursor.
+
+        - Sin ``after``: de la más reciente hacia atrás, empezando antes del
+          cursor ``before`` si se indica.
+        - Con ``after``: las actualizadas después de ese cursor, de la más
+          antigua a la más reciente (para pedir solo lo nuevo).
+        - ``service`` y ``status`` dejan solo los resultados que coinciden (y
+          las consultas que tienen alguno); ``since``/``until`` filtran por la
+          fecha de última actualización (timestamp UNIX).
+
+        Revisa a lo sumo ``limit * SCAN_FACTOR`` entradas del registro por
+        llamada, así que con filtros muy selectivos una página puede traer
+        menos de ``limit`` consultas aunque haya más: se sigue con
+        ``next_cursor``. Retorna ``{"queries", "next_cursor", "has_more",
+        "head"}``, donde ``head`` es el cursor más reciente.
+        """
+        now = self._clock()
+        queries = []
+        seqs, ids = self._log
+        # ``put`` agrega primero a seqs, así que ambos tienen al menos ``end``
+        # posiciones, y asigna el seq antes de agregarlo: ``head`` las cubre
+        end = len(ids)
+        head = self._seq
+        if after is not None:
+            position, step = bisect.bisect_right(seqs, after, 0, end), 1
+        elif before is not None:
+            position, step = bisect.bisect_left(seqs, before, 0, end) - 1, -1
+        else:
+            position, step = end - 1, -1
+        cursor = after
+        budget = limit * SCAN_FACTOR
+        entries = self._entries
+        filtered = service is not None or status is not None
+        while 0 <= position < end and budget and len(queries) < limit:
+            seq, query_id = seqs[position], ids[position]
+            position += step
+            budget -= 1
+            cursor = seq
+            entry = entries.get(query_id)
+            if entry is None or entry[3] != seq or not self._live(entry, now):
+                continue
+            updated = entry[0]
+            if (since is not None and updated < since) or (until is not None and updated > until):
+                continue
+            if not filtered:
+                queries.append(_view(query_id, entry))
+                continue
+            results = {
+                name: result for name, (result, _) in entry[2].items()
+                if (service is None or name == service)
+                and (status is None or result.get("status") == status)
+            }
+            if results:
+                queries.append({"query_id": query_id, "seq": seq, "updated_at": updated,
+                                "results": results})
+        has_more = 0 <= position < end
+        if after is None and not has_more:
+            cursor = None
+        return {"queries": queries, "next_cursor": cursor, "has_more": has_more, "head": head}
+
+    def snapshot(self):
+        """Copia de todas las consultas vigentes, de la más antigua a la más reciente."""
+        now = self._clock()
+        seqs, ids = self._log
+        snapshot = {}
+        for position in range(len(ids)):
+            entry = self._entries.get(ids[position])
+            if entry is not None and entry[3] == seqs[position] and self._live(entry, now):
+                snapshot[ids[position]] = _view(ids[position], entry)["results"]
+        return snapshot
+
+    def stats(self):
+        """Ocupación del almacén y descartes por límite o expiración."""
+        rss = rss_bytes()
+        with self._lock:
+            return {
+                "queries": len(self._entries),
+                "results": self._results,
+                "bytes": self._bytes,
+                "max_queries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "evicted": self._evicted,
+                "expired": self._expired,
+                "rss_bytes": rss,
+            }
+
+
+def _entry(query_id, updated, size, results, seq):
+    """Entrada inmutable del almacén; la vista de las lecturas se arma al pedirla (``_view``)."""
+    return updated, size, results, seq, [None]
+
+
+def _view(query_id, entry):
+    """Vista de ``entry`` para las lecturas, armada una vez y compartida.
+
+    Dos lectores pueden armarla a la vez; ambas son iguales y queda una.
+    """
+    view = entry[4][0]
+    if view is None:
+        view = entry[4][0] = {
+            "query_id": query_id, "seq": entry[3], "updated_at": entry[0],
+            "results": {service: result for service, (result, _) in entry[2].items()},
+        }
+    return view
+
+
+def rss_bytes():
+    """Memoria residente del proceso (Linux; None si no está disponible)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,122 @@
+"""Difusión de resultados en vivo a los clientes de /api/stream (server-sent events)."""
+import json
+import os
+import queue
+import threading
+
+# Evento que reemplaza la cola de un cliente que no alcanzó a leer sus eventos
+RESYNC = object()
+
+
+def sse_frame(event, data, event_id=None):
+    """Un evento en formato ``text/event-stream``."""
+    frame = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return frame if event_id is None else f"id: {event_id}\n{frame}"
+
+
+class Subscriber:
+    """Cola acotada de eventos de un cliente conectado a /api/stream."""
+
+    def __init__(self, query_id, max_queue):
+        self.query_id = query_id
+        self.events = queue.Queue(maxsize=max_queue)
+        # Último seq entregado al cliente: desde ahí se resincroniza
+        self.last_seq = None
+        self.dropped = 0
+
+
+class ResultStream:
+    """Reparte cada resultado recibido entre los clientes suscritos.
+
+    ``publish`` corre en el thread del consumidor de RabbitMQ y nunca se
+    bloquea: cada cliente tiene una cola de a lo sumo ``max_queue`` eventos
+    y, si se llena (cliente lento), se vacía y se reemplaza por un evento
+    ``RESYNC`` para que el cliente recupere lo perdido con
+    ``/api/results?after=<último seq>``. Los clientes filtrados por
+    ``query_id`` se indexan por consulta, así que publicar cuesta lo mismo
+    sin importar cuántos clientes siguen otras consultas.
+
+    Configuración por variables de entorno (los argumentos tienen prioridad):
+
+    - ``STREAM_QUEUE_SIZE``: eventos pendientes por cliente (256).
+    - ``STREAM_MAX_CLIENTS``: clientes conectados a la vez (100).
+    """
+
+    def __init__(self, max_queue=None, max_clients=None):
+        if max_queue is None:
+            max_queue = int(os.environ.get("STREAM_QUEUE_SIZE", "256"))
+        if max_clients is None:
+            max_clients = int(os.environ.get("STREAM_MAX_CLIENTS", "100"))
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self._all = set()
+        self._by_query = {}
+        self._clients = 0
+        self._lock = threading.Lock()
+        self._published = 0
+        self._resyncs = 0
+
+    def subscribe(self, query_id=None):
+        """Registra un cliente; retorna None si ya se alcanzó ``max_clients``."""
+        subscriber = Subscriber(query_id, self.max_queue)
+        with self._lock:
+            if self._clients >= self.max_clients:
+                return None
+            self._clients += 1
+            if query_id is None:
+                self._all.add(subscriber)
+            else:
+                self._by_query.setdefault(query_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._clients -= 1
+            if subscriber.query_id is None:
+                self._all.discard(subscriber)
+            else:
+                followers = self._by_query.get(subscriber.query_id, set())
+                followers.discard(subscriber)
+                if not followers:
+                    self._by_query.pop(subscriber.query_id, None)
+
+    def publish(self, query_id, seq, event, data):
+        """Entrega el evento ``event`` con ``data`` a los clientes de ``query_id``.
+
+        El evento se codifica (``sse_frame``) solo si hay clientes que lo
+        reciben, una sola vez, y se comparte entre todos ellos.
+        """
+        with self._lock:
+            targets = list(self._all)
+            targets.extend(self._by_query.get(query_id, ()))
+            self._published += 1
+        if not targets:
+            return
+        frame = sse_frame(event, data, seq)
+        for subscriber in targets:
+            try:
+                subscriber.events.put_nowait((seq, frame))
+            except queue.Full:
+                self._overflow(subscriber)
+
+    def _overflow(self, subscriber):
+        # Solo este thread agrega eventos, así que tras vaciar la cola hay lugar
+        while True:
+            try:
+                subscriber.events.get_nowait()
+            except queue.Empty:
+                break
+            subscriber.dropped += 1
+        subscriber.events.put_nowait(RESYNC)
+        with self._lock:
+            self._resyncs += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": self._clients,
+                "max_clients": self.max_clients,
+                "queue_size": self.max_queue,
+                "published": self._published,
+                "resyncs": self._resyncs,
+            }
@@ -1,10 +1,19 @@
-from flask import Flask
-import pika
-import json
-import time
+import logging
+import threading
+
+from flask import Flask, Response
+
+from rabbitlab_common import Worker, load_dataset
+from rabbitlab_common.metrics import CONTENT_TYPE, REGISTRY
 
 app = Flask(__name__)
 
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] [%(levelname)s] [Education] %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
 # Información educativa
 education_db = [
     {"id": "12345", "name": "Juan Perez", "university": "Universidad Nacional", "degree": "Ingeniería de Sistemas"},
@@ -13,36 +22,19 @@ education_db = [
     {"id": "22222", "name": "Ana Martinez", "university": "Universidad del Valle", "degree": "Administración"}
 ]
 
-def get_rabbitmq_connection():
-    """Establece conexión con RabbitMQ con reintentos"""
-    max_retries = 30
-    retry_delay = 10
-    
-    for attempt in range(max_retries):
-        try:
-            connection = pika.BlockingConnection(
-                pika.ConnectionParameters(host='rabbitmq', heartbeat=600)
-            )
-            print(f"Conectado a RabbitMQ (intento {attempt + 1})")
-            return connection
-        except pika.exceptions.AMQPConnectionError as e:
-            print(f"Error conectando a RabbitMQ (intento {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-            else:
-                raise
+# Índice por id y nombre normalizado (se construye una vez al arrancar, o se mapea desde DATA_FILE)
+INDEX = load_dataset(education_db, fields=("id", "name"))
 
 def search_education(person_id, name):
     """Busca información educativa en la base de datos"""
-    for record in education_db:
-        if record['id'] == person_id or record['name'].lower() == name.lower():
-            return {
-                "id": person_id,
-                "status": "found",
-                "university": record['university'],
-                "degree": record['degree'],
-                "service": "education"
-            }
+    record = INDEX.lookup(id=person_id, name=name)
+    if record:
+        return {
+            "id": person_id,
+            "status": "found",
+            "university": record['university'],
+            "degree": record['degree'],
+        }
     
     # Si no se encuentra
     return {
@@ -50,70 +42,37 @@ def search_education(person_id, name):
         "status": "not_found",
         "university": None,
         "degree": None,
-        "service": "education"
     }
 
-def callback(ch, method, properties, body):
-    """Procesa mensajes del exchange 'looking-for'"""
-    try:
-        query = json.loads(body)
-        print(f"Recibida consulta: {query}")
-        
-        # Buscar en la base de datos
-        result = search_education(query.get('id'), query.get('name'))
-        print(f"Resultado: {result}")
-        
-        # Publicar resultado en exchange 'results'
-        ch.basic_publish(
-            exchange='results',
-            routing_key='',
-            body=json.dumps(result)
-        )
-        print(f" Resultado publicado en 'results'")
-        
-    except Exception as e:
-        print(f"Error procesando mensaje: {e}")
+def lookup(query):
+    """Procesa un query del exchange 'looking-for'"""
+    return search_education(query.get('id'), query.get('name'))
 
-def start_consumer():
-    """Inicia el consumidor de RabbitMQ"""
-    connection = get_rabbitmq_connection()
-    channel = connection.channel()
-    
-    # Declarar exchanges
-    channel.exchange_declare(exchange='looking-for', exchange_type='fanout', durable=True)
-    channel.exchange_declare(exchange='results', exchange_type='fanout', durable=True)
-    
-    # Crear cola exclusiva y temporal
-    result = channel.queue_declare(queue='', exclusive=True)
-    queue_name = result.method.queue
-    
-    # Vincular cola al exchange 'looking-for'
-    channel.queue_bind(exchange='looking-for', queue=queue_name)
-    
-    print(f"Esperando mensajes en exchange 'looking-for'...")
-    print(f"Cola: {queue_name}")
-    
-    # Consumir mensajes
-    channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=True)
-    
-    try:
-        channel.start_consuming()
-    except KeyboardInterrupt:
-        print("Deteniendo consumidor...")
-        channel.stop_consuming()
-    
-    connection.close()
+def reload():
+    """Recarga la BD (al recibir SIGHUP, por ejemplo tras actualizar DATA_FILE)."""
+    global INDEX
+    INDEX = load_dataset(education_db, fields=("id", "name"))
+
+# Las métricas se sirven en /metrics de Flask, no en un puerto aparte
+worker = Worker("education", lookup, reload=reload, metrics_port=0)
 
 @app.route('/health', methods=['GET'])
 def health():
     """Endpoint de salud"""
     return {"status": "healthy", "service": "education-svc"}, 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas del worker en el formato de texto de Prometheus"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
+    # El consumidor corre en otro thread: SIGHUP se registra desde el principal
+    worker.install_signal_handlers()
+
     # Iniciar consumidor en un thread separado
-    import threading
-    consumer_thread = threading.Thread(target=start_consumer, daemon=True)
+    consumer_thread = threading.Thread(target=worker.run, daemon=True)
     consumer_thread.start()
     
     # Iniciar Flask
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,9 +1,6 @@
 import logging
-import threading
-import time
-import json
 
-import pika
+from rabbitlab_common import Worker, load_dataset
 
 logging.basicConfig(
     level=logging.INFO,
@@ -47,125 +44,58 @@ financial_db = [
     },
 ]
 
-
-def connect():
-    """Intenta conectar de forma persistente a RabbitMQ."""
-    while True:
-        try:
-            connection = pika.BlockingConnection(pika.ConnectionParameters("rabbitmq"))
-            logging.info("Financial service conectado a RabbitMQ")
-            return connection
-        except pika.exceptions.AMQPConnectionError:
-            logging.warning("Financial service esperando conexión con RabbitMQ...")
-            time.sleep(5)
+# Índice por ID (se construye una vez al arrancar, o se mapea desde DATA_FILE)
+INDEX = load_dataset(financial_db, fields=("id",))
 
 
 def search_financial_info(person_id):
     """Busca información financiera en la BD en memoria por ID."""
-    for record in financial_db:
-        if record["id"] == person_id:
-            return record
-    return None
-
-
-def process_query(ch, method, properties, body):
-    """Callback que procesa queries del exchange 'looking-for'."""
-    try:
-        query_msg = json.loads(body.decode("utf-8"))
-        logging.info(f"Query recibida: {query_msg}")
-
-        person_id = query_msg.get("id")
-        name = query_msg.get("name")
-
-        if not person_id:
-            logging.warning("Query sin ID, ignorando")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
-
-        # Buscar en BD
-        result = search_financial_info(person_id)
-
-        if result:
-            response = {
-                "id": person_id,
-                "status": "found",
-                "bank": result["bank"],
-                "account_type": result["account_type"],
-                "credit_score": result["credit_score"],
-                "account_status": result["status"],
-                "service": "financial",
-            }
-            logging.info(
-                f"Información financiera encontrada para ID={person_id}: {result['bank']}"
-            )
-        else:
-            response = {
-                "id": person_id,
-                "status": "not_found",
-                "bank": None,
-                "account_type": None,
-                "credit_score": None,
-                "account_status": None,
-                "service": "financial",
-            }
-            logging.info(f"No se encontró información financiera para ID={person_id}")
-
-        # Publicar resultado en exchange 'results'
-        result_body = json.dumps(response)
-        ch.basic_publish(
-            exchange="results", routing_key="", body=result_body.encode("utf-8")
-        )
-        logging.info(f"Resultado publicado para ID={person_id}")
-
-        # Reconocer mensaje
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+    return INDEX.lookup(id=person_id)
 
-    except Exception as e:
-        logging.exception("Error procesando query")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
 
+def lookup(query):
+    """Arma el resultado financiero del query; los queries sin ID se ignoran."""
+    person_id = query.get("id")
 
-def start_consumer():
-    """Inicia el consumer que escucha queries."""
-    try:
-        connection = connect()
-        channel = connection.channel()
+    if not person_id:
+        logging.warning("Query sin ID, ignorando")
+        return None
 
-        # Declarar exchanges
-        channel.exchange_declare(
-            exchange="looking-for", exchange_type="fanout", durable=True
-        )
+    # Buscar en BD
+    result = search_financial_info(person_id)
 
-        channel.exchange_declare(
-            exchange="results", exchange_type="fanout", durable=True
+    if result:
+        logging.info(
+            f"Información financiera encontrada para ID={person_id}: {result['bank']}"
         )
+        return {
+            "id": person_id,
+            "status": "found",
+            "bank": result["bank"],
+            "account_type": result["account_type"],
+            "credit_score": result["credit_score"],
+            "account_status": result["status"],
+        }
 
-        # Crear cola exclusiva para este consumer
-        result = channel.queue_declare(queue="", exclusive=True)
-        queue_name = result.method.queue
-
-        # Bindear al exchange 'looking-for'
-        channel.queue_bind(exchange="looking-for", queue=queue_name)
+    logging.info(f"No se encontró información financiera para ID={person_id}")
+    return {
+        "id": person_id,
+        "status": "not_found",
+        "bank": None,
+        "account_type": None,
+        "credit_score": None,
+        "account_status": None,
+    }
 
-        logging.info(f"Financial service escuchando en cola: {queue_name}")
 
-        # Configurar callback
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(
-            queue=queue_name, on_message_callback=process_query, auto_ack=False
-        )
+def reload():
+    """Recarga la BD (al recibir SIGHUP, por ejemplo tras actualizar DATA_FILE)."""
+    global INDEX
+    INDEX = load_dataset(financial_db, fields=("id",))
 
-        # Consumir
-        logging.info("Iniciando consumo de mensajes...")
-        channel.start_consuming()
 
-    except KeyboardInterrupt:
-        logging.info("Interrumpido por usuario")
-        channel.stop_consuming()
-        connection.close()
-    except Exception as e:
-        logging.exception("Error en consumer")
+worker = Worker("financial", lookup, reload=reload)
 
 
 if __name__ == "__main__":
-    start_consumer()
+    worker.run()
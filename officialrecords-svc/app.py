@@ -1,8 +1,6 @@
 import logging
-import time
-import json
 
-import pika
+from rabbitlab_common import Worker, load_dataset
 
 
 logging.basicConfig(
@@ -19,17 +17,8 @@ DATABASE = [
     # Ana Martinez no tiene registro oficial disponible
 ]
 
-
-def connect():
-    """Intenta conectar de forma persistente a RabbitMQ."""
-    while True:
-        try:
-            connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-            logging.info("Conectado a RabbitMQ")
-            return connection
-        except pika.exceptions.AMQPConnectionError:
-            logging.warning("Esperando conexión con RabbitMQ...")
-            time.sleep(5)
+# Índice por id, phone y nombre normalizado (se construye una vez al arrancar, o se mapea desde DATA_FILE)
+INDEX = load_dataset(DATABASE)
 
 
 def search_person(name=None, person_id=None, phone=None):
@@ -37,138 +26,41 @@ def search_person(name=None, person_id=None, phone=None):
     
     Retorna el registro si encuentra coincidencia, None si no.
     """
-    for record in DATABASE:
-        if (person_id and record.get("id") == person_id) or \
-           (name and record.get("name").lower() == name.lower()) or \
-           (phone and record.get("phone") == phone):
-            return record
-    return None
+    return INDEX.lookup(id=person_id, name=name, phone=phone)
 
 
-def process_query(ch, method, properties, body):
-    """Callback que procesa un mensaje de query.
-    
-    Espera un JSON con campos: name, id, phone.
-    Busca en la BD y publica el resultado.
-    """
-    try:
-        query_msg = json.loads(body.decode('utf-8'))
-        logging.info(f"Query recibido: {query_msg}")
-        
-        # Extraer datos de la query
-        name = query_msg.get("name")
-        person_id = query_msg.get("id")
-        phone = query_msg.get("phone")
-        
-        # Buscar en BD
-        person = search_person(name=name, person_id=person_id, phone=phone)
-        
-        # Preparar respuesta
-        if person:
-            result = {
-                "id": person.get("id"),
-                "status": "found",
-                "record": person.get("record"),
-                "record_status": person.get("status_record"),
-                "service": "officialrecords"
-            }
-            logging.info(f"Persona encontrada: {result}")
-        else:
-            # Si no hay coincidencia
-            search_id = person_id or phone or name or "unknown"
-            result = {
-                "id": search_id,
-                "status": "not_found",
-                "record": None,
-                "record_status": None,
-                "service": "officialrecords"
-            }
-            logging.info(f"Persona no encontrada: {result}")
-        
-        # Publicar resultado
-        publish_result(result)
-        
-        # Reconocer el mensaje
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
-    except Exception as e:
-        logging.exception("Error procesando query")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-
-
-def publish_result(result):
-    """Publica el resultado en el exchange 'results' (fanout)."""
-    connection = None
-    try:
-        connection = connect()
-        channel = connection.channel()
-        
-        # Declarar exchange de resultados
-        channel.exchange_declare(
-            exchange='results',
-            exchange_type='fanout',
-            durable=True
-        )
-        
-        # Publicar
-        body = json.dumps(result)
-        channel.basic_publish(
-            exchange='results',
-            routing_key='',
-            body=body.encode('utf-8')
-        )
-        logging.info(f"Resultado publicado en 'results': {result}")
-        
-    except Exception as e:
-        logging.exception("Error publicando resultado en RabbitMQ")
-    finally:
-        try:
-            if connection and connection.is_open:
-                connection.close()
-        except Exception:
-            pass
-
-
-def main():
-    """Inicia el consumidor de queries."""
-    connection = connect()
-    channel = connection.channel()
-    
-    # Declarar exchange de queries
-    channel.exchange_declare(
-        exchange='looking-for',
-        exchange_type='fanout',
-        durable=True
-    )
-    
-    # Crear cola temporal (exclusiva para este consumer)
-    result = channel.queue_declare(queue='', exclusive=True)
-    queue_name = result.method.queue
-    
-    # Bindear cola al exchange
-    channel.queue_bind(
-        exchange='looking-for',
-        queue=queue_name
-    )
-    
-    logging.info(f"Esperando mensajes en cola: {queue_name}")
-    
-    # Configurar callback
-    channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(
-        queue=queue_name,
-        on_message_callback=process_query,
-        auto_ack=False
-    )
-    
-    # Consumir
-    try:
-        channel.start_consuming()
-    except KeyboardInterrupt:
-        logging.info("Deteniendo consumer...")
-        channel.stop_consuming()
-        connection.close()
+def lookup(query):
+    """Busca la persona del query ({name, id, phone}) y arma el resultado."""
+    name = query.get("name")
+    person_id = query.get("id")
+    phone = query.get("phone")
+
+    person = search_person(name=name, person_id=person_id, phone=phone)
+    if person:
+        return {
+            "id": person.get("id"),
+            "status": "found",
+            "record": person.get("record"),
+            "record_status": person.get("status_record"),
+        }
+
+    # Si no hay coincidencia
+    return {
+        "id": person_id or phone or name or "unknown",
+        "status": "not_found",
+        "record": None,
+        "record_status": None,
+    }
+
+
+def reload():
+    """Recarga la BD (al recibir SIGHUP, por ejemplo tras actualizar DATA_FILE)."""
+    global INDEX
+    INDEX = load_dataset(DATABASE)
+
+
+worker = Worker("officialrecords", lookup, reload=reload)
 
 
 if __name__ == "__main__":
-    main()
+    worker.run()
@@ -1,12 +1,55 @@
 import logging
+import os
+import queue
+import threading
 import time
 import json
+import uuid
+from contextlib import contextmanager
 
 import pika
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+
+from rabbitlab_common import codec
+from rabbitlab_common.cache import query_key
+from rabbitlab_common.connection import connect
+from rabbitlab_common.metrics import CONTENT_TYPE, REGISTRY
 
 app = Flask(__name__)
 
+RABBITMQ_HOST = os.environ.get("RABBITMQ_HOST", "rabbitmq")
+
+# Servicios que responden a cada consulta (modo síncrono /query?wait=)
+EXPECTED_SERVICES = frozenset(
+    os.environ.get(
+        "EXPECTED_SERVICES",
+        "commercialinfo,socialmedia,officialrecords,financial,travel,creditbank,rh,education",
+    ).split(",")
+)
+# Espera máxima permitida en /query?wait=
+MAX_WAIT_SECONDS = float(os.environ.get("MAX_WAIT_SECONDS", "30"))
+
+# Personas por mensaje en /query/batch
+BATCH_SIZE = int(os.environ.get("QUERY_BATCH_SIZE", "100"))
+
+# Ventana en la que consultas idénticas se unen a la que ya está en curso (0 desactiva)
+COALESCE_WINDOW = float(os.environ.get("COALESCE_WINDOW", "2"))
+
+# Formato de los mensajes publicados ('json' o 'msgpack'); los servicios
+# responden en el mismo formato (content_type) si lo soportan
+MESSAGE_TYPE = codec.resolve(os.environ.get("MESSAGE_FORMAT", "json"))
+
+# Cliente AMQP de publicación: 'blocking' (pool de canales pika) o 'asyncio' (aio-pika)
+QUERY_RUNTIME = os.environ.get("QUERY_RUNTIME", "blocking")
+
+PUBLISH_SECONDS = REGISTRY.histogram(
+    "rabbitlab_query_publish_seconds", "Duración de publicar un mensaje en 'looking-for'", ["endpoint"])
+QUERY_SECONDS = REGISTRY.histogram(
+    "rabbitlab_query_wait_seconds", "Latencia extremo a extremo de las consultas con ?wait=", ["coalesced"])
+REQUESTS = REGISTRY.counter(
+    "rabbitlab_query_requests_total", "Peticiones HTTP por endpoint y código", ["endpoint", "code"])
+IN_FLIGHT = REGISTRY.gauge("rabbitlab_query_requests_in_flight", "Peticiones HTTP en curso")
+
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,18 +58,384 @@ logging.basicConfig(
 )
 
 
-def connect():
-    """Intenta conectar de forma persistente a RabbitMQ (host 'rabbitmq').
+class ChannelPool:
+    """Pool thread-safe de conexiones/canales de publicación a RabbitMQ.
 
-    Devuelve una pika.BlockingConnection cuando esté disponible.
+    Cada elemento del pool es una pareja (conexión, canal) de larga duración
+    que solo un thread de Flask usa a la vez. Los exchanges se declaran una
+    sola vez al arrancar, y si el broker cierra la conexión el elemento se
+    descarta y se abre uno nuevo de forma transparente.
     """
-    while True:
+
+    def __init__(self, max_size=8, exchanges=("looking-for",)):
+        self.max_size = max_size
+        self.exchanges = exchanges
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._declared = False
+        self._stats = {"publishes": 0, "reconnects": 0, "errors": 0}
+
+    def start(self):
+        """Abre la primera conexión y declara los exchanges al arrancar."""
+        with self._lock:
+            self._created += 1
+        self._idle.put(self._open())
+
+    def _open(self):
+        connection = connect(RABBITMQ_HOST)
+        channel = connection.channel()
+        if not self._declared:
+            for exchange in self.exchanges:
+                channel.exchange_declare(exchange=exchange, exchange_type='fanout', durable=True)
+            self._declared = True
+        return connection, channel
+
+    def _discard(self, item):
+        connection, _ = item
+        with self._lock:
+            self._created -= 1
+        try:
+            if connection.is_open:
+                connection.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        while True:
+            try:
+                item = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.max_size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._open()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    item = self._idle.get(timeout=1)
+                except queue.Empty:
+                    continue
+            try:
+                # Atiende heartbeats pendientes de la conexión ociosa
+                item[0].process_data_events(time_limit=0)
+                return item
+            except pika.exceptions.AMQPError:
+                self._discard(item)
+
+    @contextmanager
+    def channel(self):
+        """Presta un canal del pool durante el bloque ``with``."""
+        item = self._checkout()
+        with self._lock:
+            self._in_use += 1
         try:
-            connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-            return connection
-        except pika.exceptions.AMQPConnectionError:
-            logging.warning("Esperando conexión con RabbitMQ...")
-            time.sleep(5)
+            yield item[1]
+        except Exception:
+            self._discard(item)
+            raise
+        else:
+            self._idle.put(item)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+
+    def publish(self, exchange, body, routing_key='', properties=None):
+        """Publica ``body`` reintentando una vez si la conexión se perdió."""
+        for attempt in range(2):
+            try:
+                with self.channel() as channel:
+                    channel.basic_publish(
+                        exchange=exchange,
+                        routing_key=routing_key,
+                        body=body,
+                        properties=properties,
+                    )
+                with self._lock:
+                    self._stats["publishes"] += 1
+                return
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError):
+                with self._lock:
+                    self._stats["errors"] += 1
+                if attempt:
+                    raise
+                with self._lock:
+                    self._stats["reconnects"] += 1
+                logging.warning("Conexión del pool perdida, reconectando...")
+
+    def stats(self):
+        """Tamaño y salud del pool."""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "size": self._created,
+                "idle": self._idle.qsize(),
+                "in_use": self._in_use,
+                "healthy": self._created > 0,
+                **self._stats,
+            }
+
+
+class ReplyConsumer:
+    """Único consumidor de las respuestas de las consultas síncronas (?wait=).
+
+    Tiene su propia conexión y su thread, y consume una cola exclusiva
+    nombrada por el broker a la que los servicios responden. Reparte cada
+    respuesta por ``correlation_id`` a la consulta que la espera. Las
+    consultas se publican por el pool con ``reply_to`` apuntando a esa cola,
+    así que esperar una respuesta no retiene ningún canal del pool.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._queue = None
+        self._stats = {"replies": 0, "late": 0, "invalid": 0, "reconnects": 0}
+
+    def start(self):
+        """Arranca el thread consumidor (o lo reemplaza si terminó)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="reply-consumer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            connection = None
+            try:
+                connection = connect(RABBITMQ_HOST)
+                channel = connection.channel()
+                declared = channel.queue_declare(queue='', exclusive=True)
+                channel.basic_consume(queue=declared.method.queue, on_message_callback=self._on_reply,
+                                      auto_ack=True)
+                self._queue = declared.method.queue
+                self._ready.set()
+                channel.start_consuming()
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError):
+                logging.warning("Conexión del consumidor de respuestas perdida, reconectando...")
+            except Exception:
+                # Nunca dejar ?wait= sin consumidor: se reconecta ante cualquier error
+                logging.exception("Error en el consumidor de respuestas, reconectando...")
+            else:
+                # La conexión se cerró de forma ordenada: el proceso está terminando
+                return
+            finally:
+                # La cola exclusiva muere con la conexión: las consultas en
+                # espera terminan como 'partial' al vencer su plazo
+                self._ready.clear()
+                self._queue = None
+                try:
+                    if connection is not None and connection.is_open:
+                        connection.close()
+                except Exception:
+                    pass
+            with self._lock:
+                self._stats["reconnects"] += 1
+            time.sleep(1)
+
+    def _on_reply(self, ch, method, properties, body):
+        with self._lock:
+            pending = self._pending.get(properties.correlation_id)
+            if pending is None:
+                # Respuesta de una consulta que ya venció
+                self._stats["late"] += 1
+                return
+        try:
+            result = codec.decode(body, properties.content_type)
+            service = result.get("service", "unknown")
+        except Exception:
+            # Una respuesta mal formada se descarta sin tumbar al consumidor
+            logging.exception(f"Respuesta inválida para query {properties.correlation_id}, descartada")
+            with self._lock:
+                self._stats["invalid"] += 1
+            return
+        results, done = pending
+        with self._lock:
+            self._stats["replies"] += 1
+            results[service] = result
+            if EXPECTED_SERVICES <= results.keys():
+                done.set()
+
+    def gather(self, body, query_id, properties, timeout, results=None):
+        """Publica el query por el pool y espera sus respuestas hasta ``timeout``.
+
+        Las respuestas se agregan a ``results`` a medida que llegan (las
+        consultas unidas a esta las leen de ahí); retorna una copia.
+        """
+        deadline = time.monotonic() + timeout
+        self.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("El consumidor de respuestas no está conectado")
+        if results is None:
+            results = {}
+        done = threading.Event()
+        with self._lock:
+            self._pending[query_id] = (results, done)
+        try:
+            properties.reply_to = self._queue
+            publish("query", body, properties)
+            done.wait(max(0.0, deadline - time.monotonic()))
+        finally:
+            with self._lock:
+                del self._pending[query_id]
+                results = dict(results)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"queue": self._queue, "waiting": len(self._pending), **self._stats}
+
+
+if QUERY_RUNTIME == "asyncio":
+    # Un solo event loop publica por todos los threads de Flask y reparte las
+    # respuestas directas de todas las consultas síncronas.
+    from rabbitlab_common.aio import AsyncPublisher
+
+    pool = AsyncPublisher(exchanges=("looking-for",), host=RABBITMQ_HOST)
+else:
+    pool = ChannelPool(max_size=int(os.environ.get("QUERY_POOL_SIZE", "8")))
+    replies = ReplyConsumer()
+
+
+class Flight:
+    """Consulta publicada a la que se unen las consultas idénticas posteriores."""
+
+    def __init__(self, query_id, deadline, expires):
+        self.query_id = query_id
+        # Solo una consulta síncrona recoge las respuestas para quien se una:
+        # hasta ``deadline`` (monotónico), None si es asíncrona
+        self.deadline = deadline
+        self.expires = expires
+        # Respuestas recibidas hasta ahora, actualizadas mientras se recogen
+        self.results = {}
+        self.done = threading.Event()
+
+    def covers(self, deadline):
+        """True si la consulta sigue recogiendo respuestas al menos hasta ``deadline``."""
+        return self.deadline is not None and not self.done.is_set() and self.deadline >= deadline
+
+
+class Coalescer:
+    """Une consultas idénticas (mismo id, nombre normalizado y phone) en curso.
+
+    Durante ``window`` segundos después de publicar una consulta, las
+    idénticas reciben su mismo ``query_id`` en lugar de publicar otro
+    fan-out. Una consulta síncrona solo se une a otra síncrona que sigue
+    recogiendo respuestas al menos hasta su propio plazo (``Flight.covers``),
+    y comparte sus respuestas; si no, publica su propio fan-out.
+    """
+
+    def __init__(self, window, services):
+        self.window = window
+        self.services = services
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._fanouts = 0
+        self._coalesced = 0
+
+    def join(self, key, wait=None):
+        """Retorna ``(flight, nuevo)``; si ``nuevo`` es True el llamador debe publicar.
+
+        ``wait`` es el plazo de una consulta síncrona (None si es asíncrona).
+        """
+        now = time.monotonic()
+        deadline = None if wait is None else now + wait
+        with self._lock:
+            # Las consultas se registran en orden, así que las vencidas están al inicio
+            while self._flights:
+                oldest = next(iter(self._flights))
+                if self._flights[oldest].expires > now:
+                    break
+                del self._flights[oldest]
+            flight = self._flights.get(key)
+            if flight is not None and (deadline is None or flight.covers(deadline)):
+                self._coalesced += 1
+                return flight, False
+            flight = Flight(uuid.uuid4().hex, deadline, now + self.window)
+            self._fanouts += 1
+            if self.window > 0:
+                self._flights.pop(key, None)
+                self._flights[key] = flight
+            return flight, True
+
+    def finish(self, flight):
+        """Marca ``flight`` como terminada: quienes se unieron dejan de esperar."""
+        flight.done.set()
+
+    def abandon(self, key, flight):
+        """Retira una consulta cuya publicación falló."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_seconds": self.window,
+                "in_flight": len(self._flights),
+                "fanouts": self._fanouts,
+                "coalesced": self._coalesced,
+                # Cada consulta unida evita una publicación y un mensaje por servicio
+                "publishes_avoided": self._coalesced,
+                "worker_messages_avoided": self._coalesced * len(self.services),
+            }
+
+
+coalescer = Coalescer(COALESCE_WINDOW, EXPECTED_SERVICES)
+
+REGISTRY.gauge("rabbitlab_query_coalesce_in_flight", "Consultas publicadas a las que aún se pueden unir otras",
+               function=lambda: coalescer.stats()["in_flight"])
+REGISTRY.counter("rabbitlab_query_fanouts_total", "Consultas publicadas a todos los servicios",
+                 function=lambda: coalescer.stats()["fanouts"])
+REGISTRY.counter("rabbitlab_query_coalesced_total", "Consultas unidas a una idéntica en curso",
+                 function=lambda: coalescer.stats()["coalesced"])
+REGISTRY.counter("rabbitlab_query_publish_errors_total", "Errores del pool al publicar",
+                 function=lambda: pool.stats().get("errors", 0))
+
+
+def gather(body, query_id, properties, timeout, results=None):
+    """Publica el query y espera las respuestas de los servicios (scatter-gather).
+
+    Las respuestas llegan al consumidor único de ``replies`` (o al event loop
+    de aio-pika con ``QUERY_RUNTIME=asyncio``), que las reparte por
+    ``correlation_id``, y las van agregando a ``results``. Retorna en cuanto
+    respondieron todos los ``EXPECTED_SERVICES`` o vence ``timeout``.
+    """
+    if QUERY_RUNTIME == "asyncio":
+        return pool.gather(body, query_id, properties, EXPECTED_SERVICES, timeout, results)
+    return replies.gather(body, query_id, properties, timeout, results)
+
+
+@app.before_request
+def count_in_flight():
+    IN_FLIGHT.inc()
+
+
+@app.after_request
+def count_request(response):
+    REQUESTS.labels(request.endpoint, response.status_code).inc()
+    return response
+
+
+@app.teardown_request
+def release_in_flight(exc):
+    IN_FLIGHT.dec()
+
+
+def publish(endpoint, body, properties):
+    """Publica en 'looking-for' por el pool y registra cuánto tardó."""
+    start = time.perf_counter()
+    pool.publish('looking-for', body, properties=properties)
+    PUBLISH_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
 
 
 @app.route("/health")
@@ -34,11 +443,38 @@ def health():
     return "OK"
 
 
+@app.route("/metrics")
+def metrics():
+    """Métricas en el formato de texto de Prometheus."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route("/pool")
+def pool_stats():
+    """Métricas del pool de conexiones de publicación (o del publicador asyncio)."""
+    if QUERY_RUNTIME == "asyncio":
+        return jsonify(pool.stats())
+    return jsonify({**pool.stats(), "replies": replies.stats()})
+
+
+@app.route("/coalesce")
+def coalesce_stats():
+    """Consultas unidas a otra en curso y carga evitada en el broker y los servicios."""
+    return jsonify(coalescer.stats())
+
+
 @app.route("/query", methods=["POST"])
 def index():
     """Recibe un JSON por POST con alguno de los campos: name, id, phone.
 
-    Publica el payload (como JSON) en el exchange 'looking-for' (fanout).
+    Publica el payload (en ``MESSAGE_FORMAT``, JSON por defecto) en el
+    exchange 'looking-for' (fanout).
+    Con ``?wait=<segundos>`` espera las respuestas de los servicios y las
+    retorna agregadas, hasta ese plazo como máximo.
+
+    Si una consulta idéntica se publicó hace menos de ``COALESCE_WINDOW``
+    segundos, se retorna su ``query_id`` (``"coalesced": true``) sin
+    publicar de nuevo.
     """
     data = request.get_json()
     if not data:
@@ -51,38 +487,143 @@ def index():
     if not (name or person_id or phone):
         return jsonify({"error": "At least one of 'name', 'id' or 'phone' must be provided"}), 400
 
+    wait = request.args.get("wait")
+    if wait is not None:
+        try:
+            wait = float(wait)
+        except ValueError:
+            wait = float("nan")
+    # NaN también falla la comparación: 'wait' no numérico es un 400
+    if wait is not None and not 0 < wait <= MAX_WAIT_SECONDS:
+        return jsonify({"error": f"'wait' must be between 0 and {MAX_WAIT_SECONDS} seconds"}), 400
+
     msg = {
         "name": name,
         "id": person_id,
         "phone": phone,
     }
 
-    body = json.dumps(msg)
+    body = codec.encode(msg, MESSAGE_TYPE)
+
+    # Identificador de la consulta: viaja como correlation_id por todos los
+    # servicios y el dashboard agrupa los resultados con él.
+    key = query_key(msg)
+    flight, leader = coalescer.join(key, wait)
+    query_id = flight.query_id
+
+    if not leader:
+        logging.info(f"query {query_id} reutilizado para una consulta idéntica en curso")
+        if wait is None:
+            return jsonify({"status": "Query initiated", "query_id": query_id, "coalesced": True}), 200
+        start = time.monotonic()
+        # La original recoge respuestas al menos hasta este plazo, así que
+        # al vencer (o al terminar ella) flight.results está al día
+        flight.done.wait(wait)
+        QUERY_SECONDS.labels("true").observe(time.monotonic() - start)
+        results = dict(flight.results)
+        missing = sorted(EXPECTED_SERVICES - results.keys())
+        return jsonify({
+            "status": "partial" if missing else "completed",
+            "query_id": query_id,
+            "results": results,
+            "missing": missing,
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+            "coalesced": True,
+        }), 200
+
+    properties = pika.BasicProperties(
+        content_type=MESSAGE_TYPE,
+        correlation_id=query_id,
+        headers={"x-sent-at": time.time()},
+    )
+
+    if wait is not None:
+        start = time.monotonic()
+        try:
+            results = gather(body, query_id, properties, wait, flight.results)
+        except Exception:
+            logging.exception("Error en consulta síncrona")
+            coalescer.abandon(key, flight)
+            return jsonify({"error": "Failed to publish message"}), 500
+        coalescer.finish(flight)
+        QUERY_SECONDS.labels("false").observe(time.monotonic() - start)
+        missing = sorted(EXPECTED_SERVICES - results.keys())
+        logging.info(f"query {query_id} respondido por {len(results)} servicio(s)")
+        return jsonify({
+            "status": "partial" if missing else "completed",
+            "query_id": query_id,
+            "results": results,
+            "missing": missing,
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+        }), 200
 
-    connection = None
     try:
-        connection = connect()
-        channel = connection.channel()
-        # declaramos exchange (fanout) de forma idempotente
-        channel.exchange_declare(exchange='looking-for', exchange_type='fanout', durable=True)
-        channel.basic_publish(
-            exchange='looking-for',
-            routing_key='',
-            body=body.encode('utf-8'),
-        )
-        logging.info(f"query notificó que se debe buscar información de: {name}")
+        publish("query", body, properties)
+        logging.info(f"query {query_id} notificó que se debe buscar información de: {name}")
     except Exception:
         logging.exception("Error publicando en RabbitMQ")
+        coalescer.abandon(key, flight)
         return jsonify({"error": "Failed to publish message"}), 500
-    finally:
+
+    return jsonify({"status": "Query initiated", "query_id": query_id}), 200
+
+
+@app.route("/query/batch", methods=["POST"])
+def batch():
+    """Recibe un arreglo JSON (o NDJSON) de consultas ``{name, id, phone}``.
+
+    Las publica en 'looking-for' agrupadas de a ``QUERY_BATCH_SIZE`` por
+    mensaje; cada servicio las resuelve en una sola pasada y publica un
+    único mensaje de resultados por lote. Retorna el query_id asignado a
+    cada consulta, en el mismo orden de entrada.
+    """
+    if request.mimetype == "application/x-ndjson":
         try:
-            if connection and connection.is_open:
-                connection.close()
-        except Exception:
-            pass
+            items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            return jsonify({"error": "Invalid NDJSON body"}), 400
+    else:
+        items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Invalid request, expected a JSON array or NDJSON body"}), 400
+
+    queries = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not (item.get("name") or item.get("id") or item.get("phone")):
+            return jsonify({
+                "error": f"Item {position}: at least one of 'name', 'id' or 'phone' must be provided"
+            }), 400
+        queries.append({
+            "query_id": uuid.uuid4().hex,
+            "name": item.get("name"),
+            "id": item.get("id"),
+            "phone": item.get("phone"),
+        })
+
+    batch_id = uuid.uuid4().hex
+    try:
+        for start in range(0, len(queries), BATCH_SIZE):
+            chunk = queries[start:start + BATCH_SIZE]
+            properties = pika.BasicProperties(
+                content_type=MESSAGE_TYPE,
+                correlation_id=batch_id,
+                headers={"x-sent-at": time.time(), "x-batch": len(chunk)},
+            )
+            publish("query_batch", codec.encode({"batch": chunk}, MESSAGE_TYPE), properties)
+    except Exception:
+        logging.exception("Error publicando lote en RabbitMQ")
+        return jsonify({"error": "Failed to publish message"}), 500
 
-    return jsonify({"status": "Query initiated"}), 200
+    logging.info(f"lote {batch_id} publicado con {len(queries)} consulta(s)")
+    return jsonify({
+        "status": "Batch initiated",
+        "batch_id": batch_id,
+        "query_ids": [query["query_id"] for query in queries],
+    }), 200
 
 
 if __name__ == "__main__":
+    pool.start()
+    if QUERY_RUNTIME != "asyncio":
+        replies.start()
     app.run(host="0.0.0.0", port=5000)
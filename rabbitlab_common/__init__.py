@@ -0,0 +1,29 @@
+"""Runtime compartido por los microservicios de RabbitLab."""
+from rabbitlab_common.cache import ResultCache
+from rabbitlab_common.connection import (
+    QUERIES_EXCHANGE,
+    RESULTS_EXCHANGE,
+    close_quietly,
+    connect,
+)
+from rabbitlab_common.dataset import MappedDataset, load_dataset, write_dataset
+from rabbitlab_common.index import RecordIndex, index_key, normalize_name
+from rabbitlab_common.store import RecordStore
+from rabbitlab_common.worker import Worker, WorkerStats
+
+__all__ = [
+    "MappedDataset",
+    "QUERIES_EXCHANGE",
+    "RESULTS_EXCHANGE",
+    "RecordIndex",
+    "RecordStore",
+    "ResultCache",
+    "Worker",
+    "WorkerStats",
+    "close_quietly",
+    "connect",
+    "index_key",
+    "load_dataset",
+    "normalize_name",
+    "write_dataset",
+]
@@ -0,0 +1,191 @@
+"""Runtime asyncio (aio-pika) para los workers y la publicación de query-svc.
+
+Con ``WORKER_RUNTIME=asyncio`` el ``Worker`` consume y publica sobre un solo
+event loop: aio-pika despacha cada mensaje como una tarea, así que hay
+tantas consultas en curso como permita el prefetch, y las publicaciones
+(y sus confirmaciones) se solapan en lugar de esperar una a una.
+
+aio-pika es una dependencia opcional: solo se importa al usar este runtime.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from rabbitlab_common import codec
+from rabbitlab_common.connection import QUERIES_EXCHANGE, RABBITMQ_HOST, RESULTS_EXCHANGE, TRANSPORT
+
+try:
+    import aio_pika
+except ImportError:  # pragma: no cover - dependencia opcional
+    aio_pika = None
+
+# Pseudo-cola de RabbitMQ para respuestas directas
+REPLY_TO = 'amq.rabbitmq.reply-to'
+
+
+def _require_aio_pika():
+    if TRANSPORT != "amqp":
+        raise RuntimeError("El runtime asyncio solo funciona con RABBITLAB_TRANSPORT=amqp")
+    if aio_pika is None:
+        raise RuntimeError("El runtime asyncio requiere aio-pika (pip install aio-pika)")
+
+
+async def run_worker(worker, host=None):
+    """Consume 'looking-for' con el ``worker`` dado hasta que se cancele la tarea.
+
+    ``connect_robust`` reconecta y vuelve a declarar la topología si la
+    conexión se pierde.
+    """
+    _require_aio_pika()
+    connection = await aio_pika.connect_robust(host=host or RABBITMQ_HOST)
+    async with connection:
+        channel = await connection.channel(publisher_confirms=worker.publish_confirms)
+        await channel.set_qos(prefetch_count=worker.prefetch_count)
+        queries = await channel.declare_exchange(QUERIES_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True)
+        results = await channel.declare_exchange(RESULTS_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True)
+        if worker.queue:
+            queue = await channel.declare_queue(worker.queue, durable=True)
+        else:
+            queue = await channel.declare_queue(exclusive=True)
+        await queue.bind(queries)
+        loop = asyncio.get_running_loop()
+
+        async def on_message(message):
+            start = time.perf_counter()
+            received_at = time.time()
+            worker.in_flight += 1
+            try:
+                if worker.executor is None:
+                    outcome = worker.process(message.body, message.content_type)
+                else:
+                    # Con WORKER_CONCURRENCY > 1 la búsqueda corre en el pool de threads
+                    outcome = await loop.run_in_executor(worker.executor, worker.process, message.body,
+                                                         message.content_type)
+                content_type = codec.negotiate(message.content_type)
+                looked_up_at = time.time()
+                published = time.perf_counter()
+                for exchange, routing_key, body in worker.replies(outcome, message.reply_to, content_type):
+                    # x-published-at lo más cerca posible del envío (ver Worker.trace_headers)
+                    reply = aio_pika.Message(
+                        body,
+                        content_type=content_type,
+                        correlation_id=message.correlation_id,
+                        headers=worker.trace_headers(message.headers, received_at, looked_up_at),
+                    )
+                    target = results if exchange == RESULTS_EXCHANGE else channel.default_exchange
+                    await target.publish(reply, routing_key=routing_key)
+                worker.publish_seconds.observe(time.perf_counter() - published)
+                worker.log_outcome(outcome, content_type)
+                await message.ack()
+                _, total, found = outcome
+                worker.stats.record(time.perf_counter() - start, len(found), total - len(found))
+            except Exception:
+                logging.exception("Error procesando query")
+                worker.stats.record_error()
+                await message.nack(requeue=not message.redelivered)
+            finally:
+                worker.in_flight -= 1
+
+        await queue.consume(on_message)
+        logging.info(f"{worker.service} esperando mensajes en cola: {queue.name} "
+                     f"(runtime=asyncio, prefetch={worker.prefetch_count})")
+
+        while True:
+            await asyncio.sleep(worker.stats_interval or 3600)
+            if worker.stats_interval:
+                logging.info(f"Métricas {worker.service}: {worker.snapshot()}")
+
+
+class AsyncPublisher:
+    """Publicador de query-svc sobre un event loop propio en un thread de fondo.
+
+    Expone la misma interfaz síncrona que el pool de canales (``publish``)
+    para que los handlers de Flask lo usen sin cambios, y ``gather`` para el
+    modo síncrono: un único consumidor de respuestas directas reparte las
+    respuestas por ``correlation_id`` entre todas las consultas en espera.
+    """
+
+    def __init__(self, exchanges=(QUERIES_EXCHANGE,), host=None):
+        _require_aio_pika()
+        self.exchanges = exchanges
+        self.host = host or RABBITMQ_HOST
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="amqp-publisher", daemon=True)
+        self._pending = {}
+        self._exchanges = {}
+        self._channel = None
+        self._publishes = 0
+
+    def _call(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def start(self):
+        """Arranca el event loop, conecta y declara los exchanges."""
+        self._thread.start()
+        self._call(self._start())
+
+    async def _start(self):
+        connection = await aio_pika.connect_robust(host=self.host)
+        self._channel = await connection.channel()
+        for name in self.exchanges:
+            self._exchanges[name] = await self._channel.declare_exchange(
+                name, aio_pika.ExchangeType.FANOUT, durable=True)
+        replies = await self._channel.get_queue(REPLY_TO, ensure=False)
+        await replies.consume(self._on_reply, no_ack=True)
+
+    async def _on_reply(self, message):
+        pending = self._pending.get(message.correlation_id)
+        if pending is None:
+            return
+        results, expected, done = pending
+        result = codec.decode(message.body, message.content_type)
+        results[result.get("service", "unknown")] = result
+        if expected <= results.keys():
+            done.set()
+
+    @staticmethod
+    def _message(body, properties):
+        return aio_pika.Message(
+            body,
+            content_type=getattr(properties, "content_type", None),
+            correlation_id=getattr(properties, "correlation_id", None),
+            reply_to=getattr(properties, "reply_to", None),
+            headers=getattr(properties, "headers", None),
+        )
+
+    def publish(self, exchange, body, routing_key='', properties=None):
+        """Publica ``body`` desde cualquier thread (bloquea hasta que se envía)."""
+        self._call(self._exchanges[exchange].publish(self._message(body, properties), routing_key=routing_key))
+        self._publishes += 1
+
+    def gather(self, body, query_id, properties, expected, timeout, results=None):
+        """Publica el query con ``reply_to`` y espera las respuestas de ``expected``.
+
+        Las respuestas se agregan a ``results`` a medida que llegan; retorna una copia.
+        """
+        return self._call(self._gather(body, query_id, properties, expected, timeout,
+                                       {} if results is None else results))
+
+    async def _gather(self, body, query_id, properties, expected, timeout, results):
+        done = asyncio.Event()
+        self._pending[query_id] = (results, expected, done)
+        try:
+            properties.reply_to = REPLY_TO
+            await self._exchanges[QUERIES_EXCHANGE].publish(self._message(body, properties), routing_key='')
+            self._publishes += 1
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            del self._pending[query_id]
+        return dict(results)
+
+    def stats(self):
+        return {
+            "runtime": "asyncio",
+            "healthy": self._channel is not None and not self._channel.is_closed,
+            "publishes": self._publishes,
+            "pending_gathers": len(self._pending),
+        }
@@ -0,0 +1,124 @@
+"""Cache de resultados de los workers (LRU con TTL)."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from rabbitlab_common.index import normalize_name
+
+# Valor retornado por ``get`` cuando la clave no está (``None`` es un
+# resultado válido: el servicio ignoró el query)
+MISS = object()
+
+
+def query_key(query):
+    """Clave de cache de un query: ``(id, nombre normalizado, teléfono)``.
+
+    El nombre se normaliza igual que en los índices; id y teléfono se
+    comparan exactos, como en la búsqueda.
+    """
+    name = query.get("name")
+    return (
+        query.get("id") or None,
+        normalize_name(name) if name else None,
+        query.get("phone") or None,
+    )
+
+
+def canonical_query(query):
+    """``query`` con sus campos de búsqueda tal como quedan en ``query_key``.
+
+    Es lo que recibe ``lookup``: todas las variantes de un query (nombres
+    con otras mayúsculas o acentos) comparten una entrada del cache, así que
+    lo que el resultado repite del query (el ``id`` de un not_found) no
+    puede depender de cuál de ellas llegó primero.
+    """
+    person_id, name, phone = query_key(query)
+    return {**query, "id": person_id, "name": name, "phone": phone}
+
+
+class ResultCache:
+    """Cache LRU con TTL de resultados ya codificados, por clave de query.
+
+    Guarda el resultado listo para publicar (``bytes``) o ``None`` si el
+    servicio ignora el query, así que un acierto evita tanto la búsqueda
+    como la serialización. Al superar ``max_entries`` se descarta la
+    entrada usada hace más tiempo. Es thread-safe (lo usan los threads del
+    pool del worker).
+
+    Configuración por variables de entorno (los argumentos tienen prioridad):
+
+    - ``RESULT_CACHE_SIZE``: entradas máximas (10000, 0 desactiva el cache).
+    - ``RESULT_CACHE_TTL``: segundos de vida de cada entrada (60).
+    """
+
+    def __init__(self, max_entries=None, ttl=None, clock=time.monotonic):
+        if max_entries is None:
+            max_entries = int(os.environ.get("RESULT_CACHE_SIZE", "10000"))
+        if ttl is None:
+            ttl = float(os.environ.get("RESULT_CACHE_TTL", "60"))
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Cambia con cada ``clear`` para descartar resultados calculados antes
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Retorna el valor guardado para ``key`` o ``MISS``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return MISS
+
+    def put(self, key, value, generation=None):
+        """Guarda ``value`` para ``key``.
+
+        Si se pasa la ``generation`` leída antes de calcular el valor y el
+        cache se invalidó mientras tanto, el valor se descarta.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Invalida todas las entradas (por ejemplo, al recargar la BD)."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
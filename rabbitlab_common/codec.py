@@ -0,0 +1,114 @@
+"""Codificación de los mensajes de 'looking-for' y 'results'.
+
+El formato viaja en el ``content_type`` de cada mensaje AMQP:
+
+- ``application/json``: el de siempre, y el que se usa si el mensaje no
+  trae ``content_type`` o trae uno desconocido.
+- ``application/msgpack``: binario; las mismas estructuras en menos bytes
+  y más rápido de decodificar.
+
+Quien recibe decodifica según el ``content_type`` del mensaje, y los
+workers responden en el formato del query si lo soportan (``negotiate``).
+Así basta con elegir ``MESSAGE_FORMAT`` en query-svc para que todo el
+camino use ese formato, sin configurar los demás servicios. Comparación de
+bytes y tiempos por servicio: ``python bench/bench_codec.py``.
+
+msgpack es una dependencia opcional: sin ella los servicios siguen usando
+JSON.
+"""
+import json
+import logging
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependencia opcional
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Nombres aceptados en MESSAGE_FORMAT y content types equivalentes
+ALIASES = {
+    "json": JSON,
+    "msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+def _normalize(content_type):
+    if not content_type:
+        return JSON
+    content_type = content_type.split(";")[0].strip().lower()
+    return ALIASES.get(content_type, content_type)
+
+
+def supported(content_type):
+    """True si este proceso puede codificar y decodificar ``content_type``."""
+    content_type = _normalize(content_type)
+    return content_type == JSON or (content_type == MSGPACK and msgpack is not None)
+
+
+def negotiate(content_type):
+    """Formato de la respuesta a un mensaje con ``content_type``: el mismo si se soporta, si no JSON."""
+    content_type = _normalize(content_type)
+    return content_type if supported(content_type) else JSON
+
+
+def resolve(name):
+    """Content type de un formato configurado (``json``, ``msgpack`` o un content type).
+
+    Si el formato no está disponible (msgpack sin instalar) se registra una
+    advertencia y se usa JSON.
+    """
+    content_type = _normalize(name)
+    if content_type not in (JSON, MSGPACK):
+        raise ValueError(f"Formato de mensajes desconocido: '{name}' (json o msgpack)")
+    if not supported(content_type):
+        logging.warning(f"{content_type} requiere msgpack (pip install msgpack); se usa JSON")
+        return JSON
+    return content_type
+
+
+def encode(obj, content_type=JSON):
+    """Codifica ``obj`` en ``content_type`` (bytes)."""
+    if _normalize(content_type) == MSGPACK:
+        return msgpack.packb(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def decode(body, content_type=None):
+    """Decodifica ``body`` según ``content_type``; sin él, o si es desconocido, como JSON."""
+    content_type = _normalize(content_type)
+    if content_type == MSGPACK:
+        if msgpack is None:
+            raise ValueError("Mensaje en msgpack, pero msgpack no está instalado")
+        return msgpack.unpackb(body)
+    return json.loads(body)
+
+
+def encode_batch(query_ids, results, content_type=JSON):
+    """Mensaje de lote ``{"query_ids": [...], "results": [...]}`` a partir de resultados ya codificados.
+
+    Los resultados vienen del cache ya codificados en ``content_type``, así
+    que el lote se arma uniéndolos en lugar de volver a codificarlos.
+    """
+    if _normalize(content_type) == MSGPACK:
+        packer = msgpack.Packer()
+        return b''.join((
+            packer.pack_map_header(2),
+            packer.pack("query_ids"), packer.pack(list(query_ids)),
+            packer.pack("results"), packer.pack_array_header(len(results)),
+            *results,
+        ))
+    return b''.join((
+        b'{"query_ids": ', json.dumps(list(query_ids)).encode('utf-8'),
+        b', "results": [', b', '.join(results), b']}',
+    ))
+
+
+def describe(body, content_type=None):
+    """Texto legible de un mensaje, para los logs."""
+    if _normalize(content_type) == JSON:
+        return body.decode('utf-8')
+    return repr(decode(body, content_type))
@@ -0,0 +1,54 @@
+"""Conexión compartida a RabbitMQ para los servicios de RabbitLab.
+
+``RABBITLAB_TRANSPORT`` elige el transporte: ``amqp`` (RabbitMQ con pika,
+por defecto) o ``memory`` (el broker en memoria del proceso, ver
+``rabbitlab_common.memory``), con la misma API en ambos casos.
+"""
+import logging
+import os
+import time
+
+import pika
+
+RABBITMQ_HOST = os.environ.get("RABBITMQ_HOST", "rabbitmq")
+
+# Transporte de los servicios: 'amqp' (RabbitMQ) o 'memory' (broker en memoria del proceso)
+TRANSPORT = os.environ.get("RABBITLAB_TRANSPORT", "amqp")
+TRANSPORTS = ("amqp", "memory")
+
+# Exchanges (fanout) de la arquitectura
+QUERIES_EXCHANGE = "looking-for"
+RESULTS_EXCHANGE = "results"
+
+
+def connect(host=None, retry_delay=5):
+    """Intenta conectar de forma persistente a RabbitMQ.
+
+    Devuelve una pika.BlockingConnection cuando esté disponible, o con
+    ``RABBITLAB_TRANSPORT=memory`` una conexión al broker en memoria del
+    proceso (siempre disponible).
+    """
+    if TRANSPORT not in TRANSPORTS:
+        raise ValueError(f"RABBITLAB_TRANSPORT debe ser uno de {TRANSPORTS}, no '{TRANSPORT}'")
+    if TRANSPORT == "memory":
+        from rabbitlab_common.memory import BROKER
+
+        logging.info("Conectado al broker en memoria")
+        return BROKER.connect()
+    while True:
+        try:
+            connection = pika.BlockingConnection(pika.ConnectionParameters(host or RABBITMQ_HOST))
+            logging.info("Conectado a RabbitMQ")
+            return connection
+        except pika.exceptions.AMQPConnectionError:
+            logging.warning("Esperando conexión con RabbitMQ...")
+            time.sleep(retry_delay)
+
+
+def close_quietly(connection):
+    """Cierra ``connection`` ignorando errores (p. ej. si ya estaba caída)."""
+    try:
+        if connection and connection.is_open:
+            connection.close()
+    except Exception:
+        pass
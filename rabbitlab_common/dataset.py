@@ -0,0 +1,305 @@
+"""BD de búsqueda en archivos columnares mapeados en memoria (mmap).
+
+Formato ``RLDS1`` (secciones alineadas a 8 bytes, en el orden de bytes de la máquina)::
+
+    magic (8 bytes) | largo del header (uint64) | header JSON | secciones
+
+El header describe cada columna y cada índice:
+
+- columna ``str``: offsets ``uint64[n+1]`` + blob UTF-8 + nulos ``uint8[n]``
+- columna ``int``: valores ``int64[n]`` + nulos ``uint8[n]``
+- columna ``float``: valores ``float64[n]`` + nulos ``uint8[n]``
+- columna ``bool``: valores ``uint8[n]`` + nulos ``uint8[n]``
+- índice: hashes ``uint64[m]`` ordenados + filas ``uint32[m]`` en paralelo
+
+Los índices se construyen con ``index_key``, como los de ``RecordIndex``.
+
+Al abrir el archivo solo se lee el header; las páginas se cargan bajo
+demanda y ``lookup`` decodifica únicamente la fila encontrada, así que una
+BD de millones de registros arranca de inmediato y ocupa una fracción de la
+memoria de una lista de diccionarios.
+
+Para generar un archivo a partir de un JSONL (un registro por línea)::
+
+    python -m rabbitlab_common.dataset travel.jsonl travel.rlds --index id name phone
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from rabbitlab_common.index import RecordIndex, index_key
+from rabbitlab_common.store import RecordStore
+
+MAGIC = b"RLDS1\0\0\0"
+# Columnas de valores de ancho fijo: tipo -> código de ``array``
+_FIXED = {"int": "q", "float": "d", "bool": "B"}
+_HEADER_LEN = struct.Struct("<Q")
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class MappedDataset:
+    """BD de solo lectura respaldada por un archivo ``RLDS1``.
+
+    Expone la misma API de búsqueda que ``RecordIndex`` (``lookup``,
+    ``find``, ``positions``) y ``dataset[i]`` decodifica la fila ``i``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} no es un archivo RLDS1")
+        (header_len,) = _HEADER_LEN.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(self._mmap[start:start + header_len].decode("utf-8"))
+        if header.get("byteorder", "little") != sys.byteorder:
+            self.close()
+            raise ValueError(f"{path} fue generado con otro orden de bytes")
+
+        self.rows = header["rows"]
+        self._view = memoryview(self._mmap)
+        self._columns = {}
+        for column in header["columns"]:
+            nulls = self._view[column["nulls"]:column["nulls"] + self.rows]
+            if column["type"] in _FIXED:
+                values = self._section(column["values"], self.rows, _FIXED[column["type"]])
+                self._columns[column["name"]] = (column["type"], values, None, nulls)
+            else:
+                offsets = self._section(column["offsets"], self.rows + 1, "Q")
+                self._columns[column["name"]] = ("str", offsets, column["data"], nulls)
+        self.fields = tuple(self._columns)
+
+        self._indexes = {}
+        for index in header["indexes"]:
+            hashes = self._section(index["hashes"], index["size"], "Q")
+            rows = self._section(index["rows"], index["size"], "I")
+            self._indexes[index["field"]] = (hashes, rows, index["normalized"])
+        self.indexed_fields = tuple(self._indexes)
+
+    def _section(self, offset, count, typecode):
+        size = array(typecode).itemsize
+        return self._view[offset:offset + count * size].cast(typecode)
+
+    def __len__(self):
+        return self.rows
+
+    def value(self, field, position):
+        """Decodifica un solo valor de la columna ``field``."""
+        kind, values, data, nulls = self._columns[field]
+        if nulls[position]:
+            return None
+        if kind == "bool":
+            return bool(values[position])
+        if kind != "str":
+            return values[position]
+        start, end = values[position], values[position + 1]
+        return self._mmap[data + start:data + end].decode("utf-8")
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.rows:
+            raise IndexError(position)
+        return {field: self.value(field, position) for field in self.fields}
+
+    def positions(self, field, value):
+        """Posiciones de las filas cuyo ``field`` coincide con ``value`` (en orden)."""
+        if not value:
+            return []
+        hashes, rows, normalized = self._indexes[field]
+        key = index_key(value, normalized)
+        found = []
+        target = _hash(key)
+        i = bisect.bisect_left(hashes, target)
+        while i < len(hashes) and hashes[i] == target:
+            stored = self.value(field, rows[i])
+            # Descarta colisiones del hash comparando la clave del valor real
+            if stored is not None and index_key(stored, normalized) == key:
+                found.append(rows[i])
+            i += 1
+        return found
+
+    def find(self, field, value):
+        """Todos los registros cuyo ``field`` coincide con ``value``."""
+        return [self[position] for position in self.positions(field, value)]
+
+    def lookup(self, **criteria):
+        """Retorna el primer registro que coincide con algún criterio, None si no hay."""
+        best = None
+        for field, value in criteria.items():
+            found = self.positions(field, value)
+            if found and (best is None or found[0] < best):
+                best = found[0]
+        return None if best is None else self[best]
+
+    def close(self):
+        for name in ("_columns", "_indexes"):
+            for section in getattr(self, name, {}).values():
+                for view in section:
+                    if isinstance(view, memoryview):
+                        view.release()
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def _column_type(field, values):
+    """Tipo de la columna a partir de sus valores no nulos.
+
+    Enteros y flotantes mezclados se guardan como ``float``; cualquier otra
+    mezcla, o valores que no son escalares (listas, diccionarios), no se
+    pueden guardar sin cambiar su tipo y se rechazan.
+    """
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add("bool")
+        elif isinstance(value, int):
+            kinds.add("int")
+        elif isinstance(value, float):
+            kinds.add("float")
+        elif isinstance(value, str):
+            kinds.add("str")
+        else:
+            raise ValueError(f"Campo '{field}': tipo no soportado {type(value).__name__}")
+    if kinds == {"int", "float"}:
+        return "float"
+    if len(kinds) > 1:
+        raise ValueError(f"Campo '{field}': tipos mezclados ({', '.join(sorted(kinds))})")
+    return kinds.pop() if kinds else "str"
+
+
+def write_dataset(path, records, index_fields=("id", "name", "phone"), normalized=("name",)):
+    """Escribe ``records`` (lista de diccionarios) en ``path`` con formato ``RLDS1``.
+
+    Cada columna conserva su tipo (``str``, ``int``, ``float`` o ``bool``);
+    lanza ``ValueError`` si un campo mezcla tipos o no es escalar.
+    """
+    records = list(records)
+    rows = len(records)
+    fields = []
+    for record in records:
+        for field in record:
+            if field not in fields:
+                fields.append(field)
+
+    # Cada sección se serializa en memoria junto con su tamaño y se ubica
+    # después del header, cuando ya se conoce su largo.
+    sections = []
+    columns = []
+    for field in fields:
+        values = [record.get(field) for record in records]
+        nulls = bytes(value is None for value in values)
+        kind = _column_type(field, values)
+        column = {"name": field, "type": kind}
+        if kind in _FIXED:
+            sections.append((column, "values", array(_FIXED[kind], (v or 0 for v in values)).tobytes()))
+        else:
+            encoded = [b"" if v is None else v.encode("utf-8") for v in values]
+            offsets = array("Q", [0])
+            for item in encoded:
+                offsets.append(offsets[-1] + len(item))
+            sections.append((column, "offsets", offsets.tobytes()))
+            sections.append((column, "data", b"".join(encoded)))
+        sections.append((column, "nulls", nulls))
+        columns.append(column)
+
+    indexes = []
+    for field in index_fields:
+        is_normalized = field in normalized
+        pairs = []
+        for position, record in enumerate(records):
+            value = record.get(field)
+            if value is None:
+                continue
+            pairs.append((_hash(index_key(value, is_normalized)), position))
+        pairs.sort()
+        index = {"field": field, "normalized": is_normalized, "size": len(pairs)}
+        sections.append((index, "hashes", array("Q", (h for h, _ in pairs)).tobytes()))
+        sections.append((index, "rows", array("I", (p for _, p in pairs)).tobytes()))
+        indexes.append(index)
+
+    # El header contiene los offsets de las secciones, que dependen de su
+    # propio largo: se reserva espacio fijo para los números y se recalcula.
+    header = {"rows": rows, "byteorder": sys.byteorder, "columns": columns, "indexes": indexes}
+    for owner, key, _ in sections:
+        owner[key] = 0
+    placeholder = len(json.dumps(header)) + 24 * len(sections)
+    offset = _align(len(MAGIC) + _HEADER_LEN.size + placeholder)
+    for owner, key, data in sections:
+        owner[key] = offset
+        offset = _align(offset + len(data))
+    encoded_header = json.dumps(header).encode("utf-8").ljust(placeholder)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(MAGIC)
+        out.write(_HEADER_LEN.pack(placeholder))
+        out.write(encoded_header)
+        for owner, key, data in sections:
+            out.write(b"\0" * (owner[key] - out.tell()))
+            out.write(data)
+    os.replace(tmp_path, path)
+
+
+def is_dataset_file(path):
+    """Indica si ``path`` es un archivo ``RLDS1``."""
+    with open(path, "rb") as source:
+        return source.read(len(MAGIC)) == MAGIC
+
+
+def load_dataset(records, fields=("id", "name", "phone"), normalized=("name",)):
+    """Retorna el índice de búsqueda del servicio.
+
+    Si la variable ``DATA_FILE`` apunta a un archivo ``RLDS1`` se usa ese
+    archivo mapeado en memoria; si apunta a un JSONL, se carga en un
+    ``RecordStore`` compacto. Sin ``DATA_FILE`` se indexan los ``records``
+    del servicio, también guardados como ``RecordStore``.
+    """
+    path = os.environ.get("DATA_FILE")
+    if not path:
+        return RecordIndex(RecordStore(records), fields=fields, normalized=normalized)
+    if not is_dataset_file(path):
+        return RecordIndex(RecordStore.from_jsonl(path), fields=fields, normalized=normalized)
+    dataset = MappedDataset(path)
+    missing = [field for field in fields if field not in dataset.indexed_fields]
+    if missing:
+        dataset.close()
+        raise ValueError(f"{path} no tiene índice para: {', '.join(missing)}")
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un archivo RLDS1 a partir de un JSONL")
+    parser.add_argument("source", help="archivo JSONL con un registro por línea")
+    parser.add_argument("target", help="archivo RLDS1 a generar")
+    parser.add_argument("--index", nargs="+", default=["id", "name", "phone"],
+                        help="campos a indexar")
+    parser.add_argument("--normalized", nargs="*", default=["name"],
+                        help="campos indexados con normalize_name")
+    args = parser.parse_args()
+
+    with open(args.source, encoding="utf-8") as source:
+        records = [json.loads(line) for line in source if line.strip()]
+    write_dataset(args.target, records, index_fields=args.index, normalized=args.normalized)
+    print(f"{len(records)} registros escritos en {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Índices hash en memoria para las búsquedas de personas."""
+import unicodedata
+
+
+def normalize_name(name):
+    """Normaliza un nombre para compararlo: sin acentos, casefold y espacios colapsados."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def index_key(value, normalized=False):
+    """Clave con la que se indexa y se busca ``value`` (nunca None).
+
+    Todos los backends (``RecordIndex`` y ``MappedDataset``) comparan los
+    valores como ``str``, así que ``{"id": 12345}`` y ``{"id": "12345"}``
+    encuentran el mismo registro sin importar cómo esté guardado el id.
+    Los campos normalizados pasan además por ``normalize_name``.
+    """
+    value = str(value)
+    return normalize_name(value) if normalized else value
+
+
+class RecordIndex:
+    """Índice de una BD de registros por uno o varios campos.
+
+    Se construye una sola vez al arrancar y reemplaza el recorrido lineal de
+    la BD: cada campo indexado es un ``dict`` valor → posiciones, así que
+    ``lookup`` cuesta O(1) sin importar el tamaño de la BD. Las claves son
+    las de ``index_key``: los campos en ``normalized`` (por defecto
+    ``name``) se indexan con ``normalize_name``.
+
+    ``lookup`` conserva la semántica del recorrido original: retorna el
+    primer registro (en orden de la BD) que coincide con cualquiera de los
+    criterios.
+    """
+
+    def __init__(self, records, fields=("id", "name", "phone"), normalized=("name",)):
+        self.records = records
+        self.fields = tuple(fields)
+        self.normalized = frozenset(normalized)
+        self._indexes = {field: self._build(field) for field in self.fields}
+
+    def __len__(self):
+        return len(self.records)
+
+    def _key(self, field, value):
+        return index_key(value, field in self.normalized)
+
+    def _build(self, field):
+        column = getattr(self.records, "column", None)
+        if column is not None and field in self.records.fields:
+            values = column(field)
+        else:
+            values = (record.get(field) for record in self.records)
+        index = {}
+        for position, value in enumerate(values):
+            if value is None:
+                continue
+            # Solo los campos normalizados (nombres) suelen repetirse; el
+            # resto guarda directamente la primera posición.
+            if field in self.normalized:
+                index.setdefault(index_key(value, True), []).append(position)
+            else:
+                index.setdefault(index_key(value), position)
+        return index
+
+    def positions(self, field, value):
+        """Posiciones de los registros cuyo ``field`` coincide con ``value``."""
+        if not value:
+            return []
+        found = self._indexes[field].get(self._key(field, value))
+        if found is None:
+            return []
+        return found if field in self.normalized else [found]
+
+    def find(self, field, value):
+        """Todos los registros cuyo ``field`` coincide con ``value``."""
+        return [self.records[position] for position in self.positions(field, value)]
+
+    def lookup(self, **criteria):
+        """Retorna el primer registro que coincide con algún criterio, None si no hay."""
+        best = None
+        for field, value in criteria.items():
+            found = self.positions(field, value)
+            if found and (best is None or found[0] < best):
+                best = found[0]
+        return None if best is None else self.records[best]
@@ -0,0 +1,478 @@
+"""Broker AMQP en memoria para correr el pipeline completo en un solo proceso.
+
+Con ``RABBITLAB_TRANSPORT=memory``, ``connect()`` retorna una conexión a
+``BROKER`` en lugar de una ``pika.BlockingConnection``. Imita la parte de
+la API de pika que usan los servicios: exchanges fanout, colas durables,
+exclusivas y la pseudo-cola de respuestas directas, ``basic_publish``,
+``basic_consume`` con prefetch, ``basic_ack``/``basic_nack`` con
+reentrega, y el ciclo de eventos de la conexión (``start_consuming``,
+``process_data_events``, ``call_later``, ``add_callback_threadsafe``).
+
+Como con pika, los callbacks de una conexión corren en el thread que la
+atiende, así que los servicios no cambian. Sin red ni contenedores, sirve
+para pruebas y benchmarks deterministas (``bench/bench_pipeline.py``,
+``bench/loadgen.py --inprocess``). Los mensajes no sobreviven al proceso.
+"""
+import copy
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import pika
+
+# Pseudo-cola de respuestas directas de RabbitMQ
+REPLY_TO = "amq.rabbitmq.reply-to"
+
+# Despierta a un thread bloqueado en process_data_events al cerrar la conexión
+_WAKE = object()
+
+
+class _Message:
+    __slots__ = ("exchange", "routing_key", "body", "properties", "redelivered")
+
+    def __init__(self, exchange, routing_key, body, properties, redelivered=False):
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.body = body
+        self.properties = properties
+        self.redelivered = redelivered
+
+
+class _Queue:
+    def __init__(self, name, durable, owner):
+        self.name = name
+        self.durable = durable
+        # Conexión dueña de una cola exclusiva (se borra al cerrarla)
+        self.owner = owner
+        self.messages = deque()
+        self.consumers = []
+        self.cursor = 0
+
+
+class _Consumer:
+    __slots__ = ("tag", "channel", "queue", "callback", "auto_ack")
+
+    def __init__(self, tag, channel, queue, callback, auto_ack):
+        self.tag = tag
+        self.channel = channel
+        self.queue = queue
+        self.callback = callback
+        self.auto_ack = auto_ack
+
+
+class MemoryBroker:
+    """Exchanges fanout y colas de un proceso, compartidos por todas sus conexiones.
+
+    Un solo lock protege la topología y los mensajes; las entregas se
+    encolan en la conexión del consumidor y su callback corre en el thread
+    que la atiende.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # exchange -> colas bindeadas
+        self._exchanges = {}
+        self._queues = {}
+        self._connections = set()
+        self._names = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+
+    def connect(self):
+        connection = MemoryConnection(self)
+        with self._lock:
+            self._connections.add(connection)
+        return connection
+
+    def close(self):
+        """Cierra todas las conexiones (sus ``start_consuming`` retornan)."""
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.close()
+
+    def reset(self):
+        """Cierra las conexiones y borra exchanges, colas y mensajes."""
+        self.close()
+        with self._lock:
+            self._exchanges.clear()
+            self._queues.clear()
+            self.published = 0
+            self.delivered = 0
+
+    def stats(self):
+        """Mensajes en espera y consumidores por cola, y totales publicados/entregados."""
+        with self._lock:
+            return {
+                "connections": len(self._connections),
+                "exchanges": {name: list(queues) for name, queues in self._exchanges.items()},
+                "queues": {
+                    name: {"messages": len(q.messages), "consumers": len(q.consumers)}
+                    for name, q in self._queues.items()
+                },
+                "published": self.published,
+                "delivered": self.delivered,
+            }
+
+    # -- Operaciones de los canales (con el lock tomado) ---------------------
+
+    def _declare_queue(self, name, durable, exclusive, connection):
+        if not name:
+            name = f"amq.gen-{next(self._names)}"
+        existing = self._queues.get(name)
+        if existing is None:
+            self._queues[name] = _Queue(name, durable, connection if exclusive else None)
+        elif existing.owner is not None and existing.owner is not connection:
+            raise pika.exceptions.ChannelClosedByBroker(405, f"RESOURCE_LOCKED - cola exclusiva '{name}'")
+        return name
+
+    def _delete_queue(self, name):
+        q = self._queues.pop(name, None)
+        if q is None:
+            return
+        for bound in self._exchanges.values():
+            if name in bound:
+                bound.remove(name)
+
+    def _publish(self, exchange, routing_key, body, properties):
+        if exchange:
+            targets = self._exchanges.get(exchange)
+            if targets is None:
+                raise pika.exceptions.ChannelClosedByBroker(404, f"NOT_FOUND - no exchange '{exchange}'")
+        else:
+            # Exchange por defecto: directo a la cola con ese nombre (si no existe, se descarta)
+            targets = (routing_key,)
+        self.published += 1
+        for name in targets:
+            q = self._queues.get(name)
+            if q is not None:
+                q.messages.append(_Message(exchange, routing_key, body, properties))
+                self._dispatch(q)
+
+    def _dispatch(self, q):
+        """Entrega mensajes de ``q`` a sus consumidores por turnos, respetando el prefetch."""
+        consumers = q.consumers
+        while q.messages and consumers:
+            for _ in range(len(consumers)):
+                consumer = consumers[q.cursor % len(consumers)]
+                q.cursor += 1
+                if consumer.auto_ack or consumer.channel._has_capacity():
+                    break
+            else:
+                return
+            consumer.channel._deliver(consumer, q, q.messages.popleft())
+            self.delivered += 1
+
+
+class MemoryConnection:
+    """Conexión al broker en memoria con el ciclo de eventos de ``BlockingConnection``.
+
+    Las entregas, los callbacks de ``add_callback_threadsafe`` y los timers
+    de ``call_later`` corren en el thread que llama a ``process_data_events``
+    o ``start_consuming``. ``call_later`` (como en pika) solo se usa desde
+    ese thread.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+        self._events = queue.SimpleQueue()
+        self._timers = []
+        self._timer_ids = itertools.count(1)
+        self._channels = []
+        self._channel_numbers = itertools.count(1)
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    def channel(self, channel_number=None):
+        self._check_open()
+        channel = MemoryChannel(self, channel_number or next(self._channel_numbers))
+        self._channels.append(channel)
+        return channel
+
+    def add_callback_threadsafe(self, callback):
+        self._check_open()
+        self._events.put(callback)
+
+    def call_later(self, delay, callback):
+        timer_id = next(self._timer_ids)
+        heapq.heappush(self._timers, (time.monotonic() + delay, timer_id, callback))
+        return timer_id
+
+    def remove_timeout(self, timeout_id):
+        self._timers = [timer for timer in self._timers if timer[1] != timeout_id]
+        heapq.heapify(self._timers)
+
+    def process_data_events(self, time_limit=0):
+        """Espera eventos hasta ``time_limit`` segundos (None: sin límite) y atiende los pendientes.
+
+        Como en pika, retorna en cuanto atendió algún evento o timer.
+        """
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        while self.is_open:
+            handled = self._run_timers()
+            for _ in range(self._events.qsize()):
+                handled = self._run(self._events.get_nowait()) or handled
+            if handled:
+                return
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return
+            limits = [limit for limit in (deadline, self._timers[0][0] if self._timers else None)
+                      if limit is not None]
+            try:
+                event = self._events.get(timeout=max(0.0, min(limits) - now) if limits else None)
+            except queue.Empty:
+                continue
+            if self._run(event):
+                return
+
+    def _run(self, event):
+        if event is _WAKE:
+            return False
+        event()
+        return True
+
+    def _run_timers(self):
+        handled = False
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, callback = heapq.heappop(self._timers)
+            callback()
+            handled = True
+        return handled
+
+    def sleep(self, duration):
+        deadline = time.monotonic() + duration
+        while self.is_open and time.monotonic() < deadline:
+            self.process_data_events(time_limit=deadline - time.monotonic())
+
+    def close(self):
+        if not self.is_open:
+            return
+        for channel in list(self._channels):
+            channel.close()
+        self.is_open = False
+        broker = self.broker
+        with broker._lock:
+            broker._connections.discard(self)
+            for name in [name for name, q in broker._queues.items() if q.owner is self]:
+                broker._delete_queue(name)
+        self._events.put(_WAKE)
+
+    def _check_open(self):
+        if not self.is_open:
+            raise pika.exceptions.ConnectionWrongStateError("Conexión cerrada")
+
+
+class MemoryChannel:
+    """Canal de una ``MemoryConnection`` con la API de ``BlockingChannel`` que usan los servicios."""
+
+    def __init__(self, connection, channel_number):
+        self.connection = connection
+        self.channel_number = channel_number
+        self.is_open = True
+        self._broker = connection.broker
+        self._prefetch = 0
+        self._tags = itertools.count(1)
+        # delivery_tag -> (cola, mensaje), en orden de entrega
+        self._unacked = {}
+        self._consumers = {}
+        self._reply_queue = None
+        self._consuming = False
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    # -- Topología -------------------------------------------------------
+
+    def exchange_declare(self, exchange, exchange_type="direct", passive=False, durable=False,
+                         auto_delete=False, internal=False, arguments=None):
+        exchange_type = getattr(exchange_type, "value", exchange_type)
+        if exchange_type != "fanout":
+            raise ValueError(f"El broker en memoria solo soporta exchanges fanout, no '{exchange_type}'")
+        with self._broker._lock:
+            self._check_open()
+            self._broker._exchanges.setdefault(exchange, [])
+
+    def queue_declare(self, queue, passive=False, durable=False, exclusive=False, auto_delete=False,
+                      arguments=None):
+        broker = self._broker
+        with broker._lock:
+            self._check_open()
+            name = broker._declare_queue(queue, durable, exclusive, self.connection)
+            q = broker._queues[name]
+            # Misma forma que el frame de pika: result.method.queue
+            return SimpleNamespace(method=SimpleNamespace(
+                queue=name, message_count=len(q.messages), consumer_count=len(q.consumers)))
+
+    def queue_bind(self, queue, exchange, routing_key=None, arguments=None):
+        broker = self._broker
+        with broker._lock:
+            self._check_open()
+            if exchange not in broker._exchanges:
+                raise pika.exceptions.ChannelClosedByBroker(404, f"NOT_FOUND - no exchange '{exchange}'")
+            if queue not in broker._queues:
+                raise pika.exceptions.ChannelClosedByBroker(404, f"NOT_FOUND - no queue '{queue}'")
+            bound = broker._exchanges[exchange]
+            if queue not in bound:
+                bound.append(queue)
+
+    def basic_qos(self, prefetch_size=0, prefetch_count=0, global_qos=False):
+        self._prefetch = prefetch_count
+
+    def confirm_delivery(self):
+        # La publicación es síncrona: al retornar el mensaje ya está en sus colas
+        pass
+
+    # -- Publicación y consumo --------------------------------------------
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if properties is not None and properties.reply_to == REPLY_TO:
+            if self._reply_queue is None:
+                raise pika.exceptions.ChannelClosedByBroker(
+                    406, "PRECONDITION_FAILED - fast reply consumer does not exist")
+            # Como RabbitMQ, reply_to identifica a este canal
+            properties = copy.copy(properties)
+            properties.reply_to = self._reply_queue
+        with self._broker._lock:
+            self._check_open()
+            self._broker._publish(exchange, routing_key, body, properties)
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False, exclusive=False, consumer_tag=None,
+                      arguments=None):
+        broker = self._broker
+        with broker._lock:
+            self._check_open()
+            if queue == REPLY_TO:
+                if not auto_ack:
+                    raise pika.exceptions.ChannelClosedByBroker(
+                        406, "PRECONDITION_FAILED - reply consumer cannot acknowledge")
+                self._reply_queue = broker._declare_queue(
+                    f"{REPLY_TO}.{id(self):x}", False, True, self.connection)
+                queue = self._reply_queue
+            q = broker._queues.get(queue)
+            if q is None:
+                raise pika.exceptions.ChannelClosedByBroker(404, f"NOT_FOUND - no queue '{queue}'")
+            tag = consumer_tag or f"ctag{self.channel_number}.{next(broker._names)}"
+            consumer = _Consumer(tag, self, q, on_message_callback, auto_ack)
+            self._consumers[tag] = consumer
+            q.consumers.append(consumer)
+            broker._dispatch(q)
+            return tag
+
+    def basic_cancel(self, consumer_tag):
+        broker = self._broker
+        with broker._lock:
+            consumer = self._consumers.pop(consumer_tag, None)
+            if consumer is None:
+                return []
+            consumer.queue.consumers.remove(consumer)
+            if consumer.queue.name == self._reply_queue:
+                # Las respuestas que lleguen después se descartan, como en RabbitMQ
+                broker._delete_queue(self._reply_queue)
+                self._reply_queue = None
+        return []
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        with self._broker._lock:
+            self._check_open()
+            queues = {q for q, _ in self._settle(delivery_tag, multiple)}
+            for q in queues:
+                self._broker._dispatch(q)
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        with self._broker._lock:
+            self._check_open()
+            settled = self._settle(delivery_tag, multiple)
+            for q, message in reversed(settled):
+                if requeue and q.name in self._broker._queues:
+                    message.redelivered = True
+                    q.messages.appendleft(message)
+            for q in {q for q, _ in settled}:
+                self._broker._dispatch(q)
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        self.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+
+    def start_consuming(self):
+        """Atiende los eventos de la conexión hasta ``stop_consuming`` o hasta cerrarla."""
+        self._consuming = True
+        while self._consuming and self.is_open and self.connection.is_open:
+            self.connection.process_data_events(time_limit=None)
+
+    def stop_consuming(self):
+        self._consuming = False
+        for tag in list(self._consumers):
+            self.basic_cancel(tag)
+
+    def close(self):
+        """Cierra el canal: sus mensajes sin ack vuelven a la cola marcados como reentregados."""
+        broker = self._broker
+        with broker._lock:
+            if not self.is_open:
+                return
+            self.is_open = False
+            self._consuming = False
+            for consumer in self._consumers.values():
+                consumer.queue.consumers.remove(consumer)
+            self._consumers.clear()
+            if self._reply_queue is not None:
+                broker._delete_queue(self._reply_queue)
+            settled = list(self._unacked.values())
+            self._unacked.clear()
+            for q, message in reversed(settled):
+                if q.name in broker._queues:
+                    message.redelivered = True
+                    q.messages.appendleft(message)
+            for q in {q for q, _ in settled}:
+                broker._dispatch(q)
+        if self in self.connection._channels:
+            self.connection._channels.remove(self)
+
+    # -- Internos (con el lock del broker tomado) --------------------------
+
+    def _has_capacity(self):
+        return not self._prefetch or len(self._unacked) < self._prefetch
+
+    def _deliver(self, consumer, q, message):
+        tag = next(self._tags)
+        if not consumer.auto_ack:
+            self._unacked[tag] = (q, message)
+        method = pika.spec.Basic.Deliver(consumer_tag=consumer.tag, delivery_tag=tag,
+                                         redelivered=message.redelivered, exchange=message.exchange,
+                                         routing_key=message.routing_key)
+        self.connection._events.put(
+            lambda: self._invoke(consumer, method, message.properties, message.body))
+
+    def _invoke(self, consumer, method, properties, body):
+        # Entregas que quedaron en la cola de eventos de un canal ya cerrado
+        # se descartan: el cierre las devolvió a su cola
+        if self.is_open:
+            consumer.callback(self, method, properties or pika.BasicProperties(), body)
+
+    def _settle(self, delivery_tag, multiple):
+        """Retira del registro sin ack la entrega ``delivery_tag`` (y las anteriores con ``multiple``)."""
+        if multiple:
+            tags = [tag for tag in self._unacked if tag <= delivery_tag] if delivery_tag else list(self._unacked)
+        elif delivery_tag in self._unacked:
+            tags = [delivery_tag]
+        else:
+            raise pika.exceptions.ChannelClosedByBroker(
+                406, f"PRECONDITION_FAILED - unknown delivery tag {delivery_tag}")
+        return [self._unacked.pop(tag) for tag in tags]
+
+    def _check_open(self):
+        if not self.is_open:
+            raise pika.exceptions.ChannelWrongStateError("Canal cerrado")
+
+
+# Broker del proceso al que se conectan los servicios con RABBITLAB_TRANSPORT=memory
+BROKER = MemoryBroker()
@@ -0,0 +1,64 @@
+"""Almacenamiento compacto (columnar) de registros en memoria."""
+import json
+from array import array
+
+
+class RecordStore:
+    """Lista de registros guardada como columnas en lugar de un dict por fila.
+
+    Cada campo es una lista con un valor por fila (o un ``array('q')`` si
+    la columna es entera y sin nulos), y los valores de texto repetidos
+    (``visa_status``, ``bank``, ``account_type``...) comparten un único
+    objeto. Así se ahorra el diccionario por fila y las copias de los
+    valores repetidos. ``store[i]`` arma el dict de la fila ``i`` bajo
+    demanda, por lo que se usa igual que la lista original (por ejemplo
+    dentro de un ``RecordIndex``).
+    """
+
+    def __init__(self, records=(), fields=None):
+        self.fields = list(fields or [])
+        self._columns = {field: [] for field in self.fields}
+        self._rows = 0
+        interned = {}
+        for record in records:
+            self._append(record, interned)
+        self._compact()
+
+    @classmethod
+    def from_jsonl(cls, path):
+        """Carga un archivo JSONL (un registro por línea) sin materializar la lista de dicts."""
+        with open(path, encoding="utf-8") as source:
+            return cls(json.loads(line) for line in source if line.strip())
+
+    def _append(self, record, interned):
+        for field in record:
+            if field not in self._columns:
+                self.fields.append(field)
+                self._columns[field] = [None] * self._rows
+        for field, column in self._columns.items():
+            value = record.get(field)
+            if isinstance(value, str):
+                value = interned.setdefault(value, value)
+            column.append(value)
+        self._rows += 1
+
+    def _compact(self):
+        for field, column in self._columns.items():
+            if column and all(type(value) is int for value in column):
+                self._columns[field] = array("q", column)
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._rows:
+            raise IndexError(position)
+        return {field: column[position] for field, column in self._columns.items()}
+
+    def __iter__(self):
+        for position in range(self._rows):
+            yield self[position]
+
+    def column(self, field):
+        """Valores de la columna ``field`` (secuencia indexable por fila)."""
+        return self._columns[field]
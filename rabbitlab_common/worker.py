@@ -0,0 +1,572 @@
+"""Runtime común de los servicios de búsqueda (consumidores de 'looking-for').
+
+Cada servicio solo aporta su base de datos y una función ``lookup(query)``
+que recibe el query ``{name, id, phone}`` y retorna el diccionario de
+resultado (o ``None`` para ignorar el query). El runtime se encarga de la
+conexión, la topología, el prefetch, el agrupamiento de acks, la
+publicación en 'results' y las métricas.
+"""
+import asyncio
+import functools
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pika
+
+from rabbitlab_common import codec
+from rabbitlab_common.cache import MISS, ResultCache, canonical_query, query_key
+from rabbitlab_common.connection import (
+    QUERIES_EXCHANGE,
+    RESULTS_EXCHANGE,
+    TRANSPORT,
+    close_quietly,
+    connect,
+)
+from rabbitlab_common.metrics import REGISTRY, start_http_server
+
+# Tiempo máximo que un ack agrupado puede esperar antes de enviarse
+ACK_FLUSH_SECONDS = 0.05
+
+# Intervalo con el que el supervisor revisa sus procesos consumidores
+SUPERVISE_SECONDS = 1.0
+
+PROCESS_SECONDS = REGISTRY.histogram(
+    "rabbitlab_worker_process_seconds", "Duración de process() por mensaje (decodificar y buscar)", ["service"])
+PUBLISH_SECONDS = REGISTRY.histogram(
+    "rabbitlab_worker_publish_seconds", "Duración de publicar los resultados de un mensaje", ["service"])
+QUERIES = REGISTRY.counter(
+    "rabbitlab_worker_queries_total", "Queries recibidos, por resultado", ["service", "outcome"])
+IN_FLIGHT = REGISTRY.gauge(
+    "rabbitlab_worker_in_flight", "Mensajes recibidos que aún no se publican ni rechazan", ["service"])
+CACHE_LOOKUPS = REGISTRY.counter(
+    "rabbitlab_worker_cache_lookups_total", "Consultas al cache de resultados", ["service", "result"])
+CACHE_ENTRIES = REGISTRY.gauge(
+    "rabbitlab_worker_cache_entries", "Resultados guardados en el cache", ["service"])
+
+
+class WorkerStats:
+    """Contadores de procesamiento de un worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.received = 0
+        self.published = 0
+        self.ignored = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def record(self, seconds, published, ignored):
+        with self._lock:
+            self.received += published + ignored
+            self.busy_seconds += seconds
+            self.published += published
+            self.ignored += ignored
+
+    def record_error(self):
+        with self._lock:
+            self.received += 1
+            self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            processed = self.published + self.ignored
+            return {
+                "received": self.received,
+                "published": self.published,
+                "ignored": self.ignored,
+                "errors": self.errors,
+                "avg_ms": round(1000 * self.busy_seconds / processed, 3) if processed else 0.0,
+            }
+
+
+class Worker:
+    """Consumidor de queries que busca en la BD del servicio y publica el resultado.
+
+    Configuración por variables de entorno (los argumentos tienen prioridad):
+
+    - ``WORKER_CONCURRENCY``: búsquedas simultáneas en un pool de threads (1).
+    - ``PREFETCH_COUNT``: mensajes sin ack que el broker entrega a la vez
+      (1, o el doble de la concurrencia si es mayor que 1).
+    - ``ACK_BATCH``: acks agrupados en un solo ``basic_ack(multiple=True)``
+      (1; solo aplica sin concurrencia, ya que los mensajes terminan en
+      desorden).
+    - ``PUBLISH_CONFIRMS``: ``1`` para esperar confirmación de cada resultado.
+    - ``STATS_INTERVAL``: segundos entre cada log de métricas (60, 0 desactiva).
+    - ``WORKER_RUNTIME``: ``blocking`` (pika, por defecto) o ``asyncio``
+      (aio-pika, ver ``rabbitlab_common.aio``).
+    - ``WORKER_PROCESSES``: procesos consumidores (1). Con más de uno, un
+      supervisor los crea con ``fork`` después de cargar la BD (que queda
+      compartida, ver ``run``) y los reinicia si terminan.
+    - ``WORKER_QUEUE``: cola durable del servicio, bindeada a 'looking-for'
+      (``looking-for.<servicio>``). Todas las réplicas y procesos del
+      servicio compiten por sus mensajes, así que cada query se procesa una
+      sola vez por servicio. Vacía, cada consumidor usa una cola exclusiva y
+      recibe todos los queries.
+    - ``RESULT_CACHE_SIZE`` / ``RESULT_CACHE_TTL``: cache de resultados ya
+      codificados por query (ver ``ResultCache``).
+    - ``METRICS_PORT``: puerto de ``/metrics`` (9100; con varios procesos,
+      el proceso ``i`` usa ``METRICS_PORT + i``; 0 desactiva).
+
+    ``reload`` es una función opcional que recarga la BD del servicio; se
+    ejecuta al recibir ``SIGHUP`` y después se invalida el cache.
+    """
+
+    def __init__(self, service, lookup, concurrency=None, prefetch_count=None, ack_batch=None,
+                 publish_confirms=None, stats_interval=None, runtime=None, processes=None, queue=None, cache=None,
+                 reload=None, metrics_port=None):
+        self.service = service
+        self.lookup = lookup
+        self.reload = reload
+        if queue is None:
+            queue = os.environ.get("WORKER_QUEUE", f"{QUERIES_EXCHANGE}.{service}")
+        self.queue = queue
+        self.processes = max(1, processes or int(os.environ.get("WORKER_PROCESSES", "1")))
+        if self.processes > 1 and not self.queue:
+            raise ValueError("WORKER_PROCESSES > 1 requiere una cola compartida (WORKER_QUEUE)")
+        if self.processes > 1 and TRANSPORT == "memory":
+            # Cada proceso tendría su propia copia del broker
+            raise ValueError("WORKER_PROCESSES > 1 no funciona con RABBITLAB_TRANSPORT=memory")
+        self.concurrency = max(1, concurrency or int(os.environ.get("WORKER_CONCURRENCY", "1")))
+        default_prefetch = 1 if self.concurrency == 1 else 2 * self.concurrency
+        self.prefetch_count = prefetch_count or int(os.environ.get("PREFETCH_COUNT", default_prefetch))
+        if self.concurrency > 1:
+            self.ack_batch = 1
+        else:
+            self.ack_batch = max(1, min(ack_batch or int(os.environ.get("ACK_BATCH", "1")),
+                                        self.prefetch_count))
+        if publish_confirms is None:
+            publish_confirms = os.environ.get("PUBLISH_CONFIRMS", "0") == "1"
+        self.publish_confirms = publish_confirms
+        if stats_interval is None:
+            stats_interval = float(os.environ.get("STATS_INTERVAL", "60"))
+        self.stats_interval = stats_interval
+        self.runtime = runtime or os.environ.get("WORKER_RUNTIME", "blocking")
+        self.stats = WorkerStats()
+        if cache is None:
+            cache = ResultCache()
+        self.cache = cache if cache.max_entries > 0 else None
+        # Los threads del pool se crean bajo demanda, al llegar el primer mensaje
+        self.executor = None
+        if self.concurrency > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                thread_name_prefix=f"{service}-lookup")
+        if metrics_port is None:
+            metrics_port = int(os.environ.get("METRICS_PORT", "9100"))
+        self.metrics_port = metrics_port
+        # Series de métricas y mensajes en curso (públicos: el runtime de
+        # asyncio también los actualiza)
+        self.process_seconds = PROCESS_SECONDS.labels(service)
+        self.publish_seconds = PUBLISH_SECONDS.labels(service)
+        self.in_flight = 0
+        self._register_metrics()
+        self._connection = None
+        self._last_tag = None
+        self._unacked = 0
+        self._flush_scheduled = False
+
+    def _register_metrics(self):
+        # Se leen en cada scrape: el camino caliente no los actualiza dos veces
+        stats = self.stats
+        QUERIES.labels(self.service, "published").set_function(lambda: stats.published)
+        QUERIES.labels(self.service, "ignored").set_function(lambda: stats.ignored)
+        QUERIES.labels(self.service, "error").set_function(lambda: stats.errors)
+        IN_FLIGHT.labels(self.service).set_function(lambda: self.in_flight)
+        CACHE_LOOKUPS.labels(self.service, "hit").set_function(lambda: self.cache.hits if self.cache else 0)
+        CACHE_LOOKUPS.labels(self.service, "miss").set_function(lambda: self.cache.misses if self.cache else 0)
+        CACHE_ENTRIES.labels(self.service).set_function(lambda: len(self.cache) if self.cache else 0)
+
+    # -- Procesamiento -----------------------------------------------------
+
+    def handle(self, query, content_type=codec.JSON):
+        """Ejecuta la búsqueda y retorna el resultado (con el servicio) codificado en ``content_type``.
+
+        Retorna ``None`` si el servicio ignora el query. Los queries repetidos
+        se responden desde el cache sin buscar ni serializar de nuevo (el
+        formato es parte de la clave). ``lookup`` recibe el query canónico
+        (``canonical_query``, con el nombre normalizado), así que el resultado
+        es el mismo para todas las variantes que comparten la entrada.
+        """
+        if self.cache is not None:
+            key = (*query_key(query), content_type)
+            encoded = self.cache.get(key)
+            if encoded is not MISS:
+                return encoded
+            generation = self.cache.generation
+        result = self.lookup(canonical_query(query))
+        encoded = None
+        if result is not None:
+            result["service"] = self.service
+            encoded = codec.encode(result, content_type)
+        if self.cache is not None:
+            self.cache.put(key, encoded, generation)
+        return encoded
+
+    def process(self, body, content_type=None):
+        """Decodifica el mensaje y ejecuta las búsquedas (no toca el canal).
+
+        Retorna ``(es_lote, consultas, resultados)``, donde ``resultados`` es
+        una lista de parejas ``(query_id, resultado codificado)`` sin los
+        ignorados. Un lote ``{"batch": [{query_id, name, id, phone}, ...]}``
+        de /query/batch se resuelve en una sola pasada. El mensaje se
+        decodifica según su ``content_type`` y los resultados se codifican en
+        el formato que indica ``codec.negotiate``.
+        """
+        start = time.perf_counter()
+        query = codec.decode(body, content_type)
+        result_type = codec.negotiate(content_type)
+        if "batch" in query:
+            queries = query["batch"]
+            results = [(q.get("query_id"), self.handle(q, result_type)) for q in queries]
+            outcome = True, len(queries), [(qid, r) for qid, r in results if r is not None]
+        else:
+            logging.info(f"Query recibido: {query}")
+            result = self.handle(query, result_type)
+            outcome = False, 1, [] if result is None else [(None, result)]
+        self.process_seconds.observe(time.perf_counter() - start)
+        return outcome
+
+    def replies(self, outcome, reply_to=None, content_type=codec.JSON):
+        """Mensajes a publicar para el resultado de ``process``.
+
+        Retorna una lista de ``(exchange, routing_key, body)``: el resultado
+        (o el lote ``{"query_ids": [...], "results": [...]}``) va al exchange
+        'results', y si el query trae ``reply_to`` también directamente a esa
+        cola. Si el servicio ignora un query con ``reply_to`` responde solo a
+        esa cola ``{"service", "status": "not_applicable"}``, para que quien
+        espera no aguarde hasta el plazo por un servicio que no va a
+        responder. Lo usan tanto el runtime bloqueante como el de asyncio.
+        """
+        is_batch, _, results = outcome
+        if not results:
+            if reply_to and not is_batch:
+                body = codec.encode({"service": self.service, "status": "not_applicable"}, content_type)
+                return [('', reply_to, body)]
+            return []
+        if is_batch:
+            # Los resultados ya vienen codificados: el lote se arma uniéndolos
+            body = codec.encode_batch([qid for qid, _ in results], [result for _, result in results], content_type)
+            return [(RESULTS_EXCHANGE, '', body)]
+        body = results[0][1]
+        replies = [(RESULTS_EXCHANGE, '', body)]
+        if reply_to:
+            replies.append(('', reply_to, body))
+        return replies
+
+    def log_outcome(self, outcome, content_type=codec.JSON):
+        is_batch, total, results = outcome
+        if is_batch:
+            logging.info(f"Lote procesado: {len(results)}/{total} resultado(s)")
+        elif results and logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info(f"Resultado publicado en 'results': {codec.describe(results[0][1], content_type)}")
+        else:
+            logging.info("Query ignorado por el servicio")
+
+    def trace_headers(self, headers, received_at, looked_up_at):
+        """Headers de los resultados: los del query más las marcas de tiempo de este worker.
+
+        Junto con ``x-sent-at`` (query-svc) permiten al dashboard separar la
+        latencia de cada servicio por etapa: ``x-received-at`` (el worker
+        recibió el query), ``x-looked-up-at`` (terminó la búsqueda) y
+        ``x-published-at``. Son timestamps UNIX. Los headers viajan en el
+        mensaje, así que ``x-published-at`` no puede medir el envío: se marca
+        aquí, y los runtimes llaman a este método con los mensajes ya armados,
+        justo antes de ``basic_publish``. El envío cuenta en la etapa
+        siguiente (``delivery`` en el dashboard).
+        """
+        headers = dict(headers) if headers else {}
+        headers["x-received-at"] = received_at
+        headers["x-looked-up-at"] = looked_up_at
+        headers["x-published-at"] = time.time()
+        return headers
+
+    def deliver(self, ch, method, properties, outcome, start, received_at, looked_up_at):
+        """Publica los resultados de ``process`` y reconoce el mensaje.
+
+        Los resultados conservan el ``correlation_id`` y los headers del
+        query para que el dashboard los agrupe por consulta, y agregan las
+        marcas de tiempo de ``trace_headers``. Van en el formato del query
+        (``codec.negotiate``).
+        """
+        content_type = codec.negotiate(properties.content_type if properties else None)
+        published = time.perf_counter()
+        replies = self.replies(outcome, properties.reply_to if properties else None, content_type)
+        # Los headers se arman al final, con los mensajes listos: x-published-at
+        # queda lo más cerca posible de basic_publish
+        reply_properties = pika.BasicProperties(
+            content_type=content_type,
+            correlation_id=properties.correlation_id if properties else None,
+            headers=self.trace_headers(properties.headers if properties else None, received_at, looked_up_at),
+        )
+        for exchange, routing_key, body in replies:
+            ch.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=reply_properties)
+        self.publish_seconds.observe(time.perf_counter() - published)
+        self.log_outcome(outcome, content_type)
+
+        _, total, results = outcome
+        self._ack(ch, method.delivery_tag)
+        self.stats.record(time.perf_counter() - start, len(results), total - len(results))
+        self.in_flight -= 1
+
+    def fail(self, ch, method):
+        """Rechaza un mensaje cuyo procesamiento falló.
+
+        El mensaje se reencola una vez; si ya había sido reentregado se
+        descarta para no bloquear la cola.
+        """
+        self.stats.record_error()
+        self.in_flight -= 1
+        self._flush_acks(ch)
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=not method.redelivered)
+
+    def on_message(self, ch, method, properties, body):
+        """Callback que procesa un mensaje de query.
+
+        Sin concurrencia el mensaje se procesa en el thread de I/O de pika.
+        Con ``WORKER_CONCURRENCY`` > 1 la búsqueda corre en el pool de
+        threads y la publicación y el ack vuelven al thread de I/O con
+        ``add_callback_threadsafe`` (los canales de pika no son thread-safe).
+        """
+        start = time.perf_counter()
+        received_at = time.time()
+        self.in_flight += 1
+        if self.executor is None:
+            try:
+                outcome = self.process(body, properties.content_type if properties else None)
+                self.deliver(ch, method, properties, outcome, start, received_at, time.time())
+            except Exception:
+                logging.exception("Error procesando query")
+                self.fail(ch, method)
+            return
+        self.executor.submit(self._process_in_thread, self._connection, ch, method, properties, body,
+                             start, received_at)
+
+    def _process_in_thread(self, connection, ch, method, properties, body, start, received_at):
+        try:
+            outcome = self.process(body, properties.content_type if properties else None)
+        except Exception:
+            logging.exception("Error procesando query")
+            callback = functools.partial(self.fail, ch, method)
+        else:
+            callback = functools.partial(self._deliver_or_fail, ch, method, properties, outcome,
+                                         start, received_at, time.time())
+        try:
+            connection.add_callback_threadsafe(callback)
+        except Exception:
+            # La conexión se cerró: el broker reentregará el mensaje
+            logging.warning("Conexión cerrada, se descarta el resultado en curso")
+
+    def _deliver_or_fail(self, ch, method, properties, outcome, start, received_at, looked_up_at):
+        try:
+            self.deliver(ch, method, properties, outcome, start, received_at, looked_up_at)
+        except Exception:
+            logging.exception("Error publicando resultado")
+            self.fail(ch, method)
+
+    # -- Acks agrupados ----------------------------------------------------
+
+    def _ack(self, channel, delivery_tag):
+        self._last_tag = delivery_tag
+        self._unacked += 1
+        if self._unacked >= self.ack_batch:
+            self._flush_acks(channel)
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._connection.call_later(ACK_FLUSH_SECONDS, lambda: self._timed_flush(channel))
+
+    def _timed_flush(self, channel):
+        self._flush_scheduled = False
+        if channel.is_open:
+            self._flush_acks(channel)
+
+    def _flush_acks(self, channel):
+        if self._unacked:
+            channel.basic_ack(delivery_tag=self._last_tag, multiple=self._unacked > 1)
+            self._unacked = 0
+
+    # -- Ciclo de vida -----------------------------------------------------
+
+    def snapshot(self):
+        """Métricas de procesamiento y del cache de resultados."""
+        snapshot = self.stats.snapshot()
+        if self.cache is not None:
+            snapshot["cache"] = self.cache.stats()
+        return snapshot
+
+    def reload_dataset(self):
+        """Recarga la BD del servicio (si tiene ``reload``) e invalida el cache."""
+        try:
+            if self.reload is not None:
+                self.reload()
+        except Exception:
+            logging.exception("Error recargando la BD")
+            return
+        if self.cache is not None:
+            self.cache.clear()
+        logging.info(f"BD de {self.service} recargada, cache invalidado")
+
+    def install_signal_handlers(self):
+        """Recarga la BD con ``SIGHUP``; debe llamarse desde el thread principal.
+
+        ``run`` lo hace solo si corre en el thread principal.
+        """
+        signal.signal(signal.SIGHUP, self._on_sighup)
+
+    def _on_sighup(self, signum, frame):
+        # Se recarga fuera del handler: el thread principal puede estar en
+        # medio de una búsqueda o con el lock del cache tomado
+        threading.Thread(target=self.reload_dataset, name=f"{self.service}-reload").start()
+
+    def _log_stats(self):
+        logging.info(f"Métricas {self.service}: {self.snapshot()}")
+        self._connection.call_later(self.stats_interval, self._log_stats)
+
+    def consume(self, connection):
+        """Declara la topología sobre ``connection`` y consume hasta que se cierre."""
+        self._connection = connection
+        self._unacked = 0
+        # Lo que quedó en curso con la conexión anterior lo reentrega el broker
+        self.in_flight = 0
+        self._flush_scheduled = False
+        channel = connection.channel()
+
+        # Declarar exchanges de queries y de resultados
+        channel.exchange_declare(exchange=QUERIES_EXCHANGE, exchange_type='fanout', durable=True)
+        channel.exchange_declare(exchange=RESULTS_EXCHANGE, exchange_type='fanout', durable=True)
+
+        # Confirmaciones del broker para los resultados publicados (opcional)
+        if self.publish_confirms:
+            channel.confirm_delivery()
+
+        if self.queue:
+            # Cola durable del servicio: réplicas y procesos compiten por ella
+            # y los queries se conservan mientras no haya consumidores
+            queue_name = self.queue
+            channel.queue_declare(queue=queue_name, durable=True)
+        else:
+            # Crear cola temporal (exclusiva para este consumer) y bindearla
+            result = channel.queue_declare(queue='', exclusive=True)
+            queue_name = result.method.queue
+        channel.queue_bind(exchange=QUERIES_EXCHANGE, queue=queue_name)
+
+        logging.info(f"{self.service} esperando mensajes en cola: {queue_name} "
+                     f"(concurrency={self.concurrency}, prefetch={self.prefetch_count}, "
+                     f"ack_batch={self.ack_batch})")
+
+        channel.basic_qos(prefetch_count=self.prefetch_count)
+        channel.basic_consume(queue=queue_name, on_message_callback=self.on_message, auto_ack=False)
+
+        if self.stats_interval > 0:
+            connection.call_later(self.stats_interval, self._log_stats)
+
+        channel.start_consuming()
+
+    def run(self):
+        """Inicia el consumidor; si la conexión se pierde, reconecta y vuelve a consumir.
+
+        Con ``WORKER_PROCESSES`` > 1 el proceso actual queda como supervisor
+        de los consumidores. Se crean con ``fork``, así que la BD ya cargada
+        no se copia: un ``MappedDataset`` comparte las páginas del archivo y
+        un índice en memoria se comparte copy-on-write (``gc.freeze`` evita
+        que el recolector de basura toque esas páginas).
+        """
+        if self.processes > 1:
+            self._supervise()
+            return
+        self._consume_forever()
+
+    def serve_metrics(self, slot=0):
+        """Expone ``/metrics`` por HTTP en ``metrics_port`` (más ``slot`` con varios procesos).
+
+        Los servicios que ya tienen Flask pasan ``metrics_port=0`` y sirven
+        ``/metrics`` ellos mismos.
+        """
+        if not self.metrics_port:
+            return
+        try:
+            start_http_server(self.metrics_port + slot)
+        except OSError:
+            logging.warning(f"No se pudo exponer /metrics en el puerto {self.metrics_port + slot}")
+            return
+        logging.info(f"Métricas de {self.service} en :{self.metrics_port + slot}/metrics")
+
+    def _consume_forever(self, slot=0):
+        self.serve_metrics(slot)
+        if threading.current_thread() is threading.main_thread():
+            self.install_signal_handlers()
+        if self.runtime == "asyncio":
+            self._run_asyncio()
+            return
+        while True:
+            connection = connect()
+            try:
+                self.consume(connection)
+                return
+            except KeyboardInterrupt:
+                logging.info("Deteniendo consumer...")
+                close_quietly(connection)
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False)
+                return
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError):
+                logging.warning("Conexión con RabbitMQ perdida, reconectando...")
+                close_quietly(connection)
+
+    def _run_asyncio(self):
+        from rabbitlab_common.aio import run_worker
+
+        try:
+            asyncio.run(run_worker(self))
+        except KeyboardInterrupt:
+            logging.info("Deteniendo consumer...")
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+
+    def _supervise(self):
+        context = multiprocessing.get_context("fork")
+        children = {}
+
+        def forward_sighup(signum, frame):
+            # Cada proceso recarga su propia BD
+            for process in children.values():
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGHUP)
+
+        if threading.current_thread() is threading.main_thread():
+            # docker stop envía SIGTERM: supervisor y procesos se detienen como con Ctrl+C
+            signal.signal(signal.SIGTERM, _interrupt)
+            signal.signal(signal.SIGHUP, forward_sighup)
+        gc.freeze()
+
+        def spawn(slot):
+            process = context.Process(target=self._consume_forever, args=(slot,), name=f"{self.service}-{slot}")
+            process.start()
+            children[slot] = process
+
+        for slot in range(self.processes):
+            spawn(slot)
+        logging.info(f"{self.service} supervisando {self.processes} procesos en la cola {self.queue}")
+        try:
+            while True:
+                time.sleep(SUPERVISE_SECONDS)
+                for slot, process in list(children.items()):
+                    if not process.is_alive():
+                        logging.warning(f"Proceso {process.name} terminó (código {process.exitcode}), "
+                                        "reiniciando...")
+                        spawn(slot)
+        except KeyboardInterrupt:
+            logging.info("Deteniendo procesos...")
+            for process in children.values():
+                process.terminate()
+            for process in children.values():
+                process.join(timeout=5)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
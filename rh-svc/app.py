@@ -1,11 +1,10 @@
 import logging
-import time
-import json
-import pika
+
+from rabbitlab_common import Worker, load_dataset
 
 logging.basicConfig(
     level=logging.INFO,
-    format='[%(asctime)s] [%(levelname)s] [CommercialInfo] %(message)s',
+    format='[%(asctime)s] [%(levelname)s] [RH] %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
@@ -16,151 +15,49 @@ DATABASE = [
     {"id": "66666", "name": "Alejandra", "contract_type": "indefinido", "salary": "1000", "user_state":"Activo"},
 ]
 
-def connect():
-    """Intenta conectar de forma persistente a RabbitMQ."""
-    while True:
-        try:
-            connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-            logging.info("Conectado a RabbitMQ RH SERVICE")
-            return connection
-        except pika.exceptions.AMQPConnectionError:
-            logging.warning("Esperando conexión con RabbitMQ... RH SERVICE")
-            time.sleep(5)
+# Índice por id y nombre normalizado (se construye una vez al arrancar, o se mapea desde DATA_FILE)
+INDEX = load_dataset(DATABASE, fields=("id", "name"))
+
 
 def search_person(name=None, person_id=None):
     """Busca una persona en la BD por name o id.
     
     Retorna el registro si encuentra coincidencia, None si no.
     """
-    for record in DATABASE:
-        if (person_id and record.get("id") == person_id) or \
-           (name and record.get("name").lower() == name.lower()):
-            return record
-    return None
-
-def process_query(ch, method, properties, body):
-    """Callback que procesa un mensaje de query.
-    
-    Espera un JSON con campos: name, id, phone.
-    Busca en la BD y publica el resultado.
-    """
-    try:
-        query_msg = json.loads(body.decode('utf-8'))
-        logging.info(f"RH SERVICE Query recibido: {query_msg}")
-        
-        # Extraer datos de la query
-        name = query_msg.get("name")
-        person_id = query_msg.get("id")
-        
-        # Buscar en BD
-        person = search_person(name=name, person_id=person_id)
-        
-        # Preparar respuesta
-        if person:
-            result = {
-                "id": person.get("id"),
-                "name": person.get("name"),
-                "contract_type": person.get("contract_type"),
-                "salary": person.get("salary"),
-                "user_state" : person.get("user_state"),
-                "service": "rh",
-            }
-
-            logging.info(f"RH SERVICE Persona encontrada: {result}")
-        else:
-            # Si no hay coincidencia, al menos devolvemos el id si lo tenemos
-            search_id = person_id or name or "unknown"
-            result = {
-                "id": search_id,
-                "status": "not found",
-                "description": "User not found db rh",
-                "service": "rh",
-            }
-            logging.info(f"RH SERVICE Persona no encontrada: {result}")
-        
-        # Publicar resultado
-        publish_result(result)
-
-        # Reconocer el mensaje
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
-    except Exception as e:
-        logging.exception("Error procesando query")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-
-
-def publish_result(result):
-    """Publica el resultado en el exchange 'results' (fanout)."""
-    connection = None
-    try:
-        connection = connect()
-        channel = connection.channel()
-        
-        # Declarar exchange de resultados
-        channel.exchange_declare(
-            exchange='results',
-            exchange_type='fanout',
-            durable=True
-        )
-        
-        # Publicar
-        body = json.dumps(result)
-        channel.basic_publish(
-            exchange='results',
-            routing_key='',
-            body=body.encode('utf-8')
-        )
-        logging.info(f"RH SERVICE Resultado publicado en 'results': {result}")
-        
-    except Exception as e:
-        logging.exception("RH SERVICE Error publicando resultado en RabbitMQ")
-    finally:
-        try:
-            if connection and connection.is_open:
-                connection.close()
-        except Exception:
-            pass
-
-def main():
-    """Inicia el consumidor de queries RH SERVICE."""
-    connection = connect()
-    channel = connection.channel()
-    
-    # Declarar exchange de queries
-    channel.exchange_declare(
-        exchange='looking-for',
-        exchange_type='fanout',
-        durable=True
-    )
-    
-    # Crear cola temporal (exclusiva para este consumer)
-    result = channel.queue_declare(queue='', exclusive=True)
-    queue_name = result.method.queue
-    
-    # Bindear cola al exchange
-    channel.queue_bind(
-        exchange='looking-for',
-        queue=queue_name
-    )
-    
-    logging.info(f"RH SERVICE Esperando mensajes en cola: {queue_name}")
-    
-    # Configurar callback
-    channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(
-        queue=queue_name,
-        on_message_callback=process_query,
-        auto_ack=False
-    )
-    
-    # Consumir
-    try:
-        channel.start_consuming()
-    except KeyboardInterrupt:
-        logging.info("RH SERVICE Deteniendo consumer...")
-        channel.stop_consuming()
-        connection.close()
+    return INDEX.lookup(id=person_id, name=name)
+
+
+def lookup(query):
+    """Busca la persona del query ({name, id, phone}) y arma el resultado."""
+    name = query.get("name")
+    person_id = query.get("id")
+
+    person = search_person(name=name, person_id=person_id)
+    if person:
+        return {
+            "id": person.get("id"),
+            "name": person.get("name"),
+            "contract_type": person.get("contract_type"),
+            "salary": person.get("salary"),
+            "user_state": person.get("user_state"),
+        }
+
+    # Si no hay coincidencia, al menos devolvemos el id si lo tenemos
+    return {
+        "id": person_id or name or "unknown",
+        "status": "not found",
+        "description": "User not found db rh",
+    }
+
+
+def reload():
+    """Recarga la BD (al recibir SIGHUP, por ejemplo tras actualizar DATA_FILE)."""
+    global INDEX
+    INDEX = load_dataset(DATABASE, fields=("id", "name"))
+
+
+worker = Worker("rh", lookup, reload=reload)
 
 
 if __name__ == "__main__":
-    main()
+    worker.run()
@@ -1,58 +1,31 @@
 #!/bin/bash
 
 # Script de prueba rápida del sistema RabbitLab
+#
+# Sin argumentos envía una consulta y espera a que respondan todos los
+# servicios; con argumentos es el generador de carga (bench/loadgen.py):
+#   ./test.sh --mode open --rate 200 --duration 30
+
+cd "$(dirname "$0")"
 
 echo "🚀 RabbitLab - Script de Prueba"
 echo "================================"
 echo ""
 
-# Verificar que los servicios están levantados
-echo "1️⃣ Verificando salud de servicios..."
-echo ""
-
-echo "   ➜ query-svc..."
-curl -s http://localhost:5000/health && echo " ✓" || echo " ✗"
-
-echo "   ➜ dashboard-svc..."
-curl -s http://localhost:5001/health && echo " ✓" || echo " ✗"
-
-echo ""
-echo "2️⃣ Enviando consulta de prueba..."
-echo ""
-
-QUERY=$(cat <<EOF
-{
-  "name": "Juan Perez",
-  "id": "12345",
-  "phone": "555-1234"
-}
-EOF
-)
-
-echo "   Enviando: $QUERY"
-echo ""
+if [ $# -gt 0 ]; then
+  exec python3 bench/loadgen.py "$@"
+fi
 
-curl -X POST http://localhost:5000/query \
-  -H "Content-Type: application/json" \
-  -d "$QUERY" \
-  -s
+python3 bench/loadgen.py --requests 1 --concurrency 1 --drain 0 || exit 1
 
 echo ""
+echo "Resultados en JSON:"
 echo ""
-echo "3️⃣ Esperando respuestas de servicios (3 segundos)..."
-sleep 3
 
-echo ""
-echo "4️⃣ Resultados en JSON:"
-echo ""
-
-curl -s http://localhost:5001/api/results | jq . 2>/dev/null || curl -s http://localhost:5001/api/results
+curl -s "http://localhost:5001/api/results?limit=1" | jq . 2>/dev/null || curl -s "http://localhost:5001/api/results?limit=1"
 
 echo ""
 echo ""
-echo "5️⃣ Para ver visualización HTML:"
-echo "   📊 Abre: http://localhost:5001/viewresults"
-echo ""
-echo "6️⃣ Para ver RabbitMQ Management:"
-echo "   🐰 Abre: http://localhost:15672 (guest/guest)"
+echo "📊 Visualización HTML: http://localhost:5001/viewresults"
+echo "🐰 RabbitMQ Management: http://localhost:15672 (guest/guest)"
 echo ""